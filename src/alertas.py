@@ -67,18 +67,7 @@ class MotorAlertas:
         # Usar lógica de patrones activos del día (HU-027)
         resultados_dia = []
         if self.data.dias:
-            dia_analisis = self.data.dias[-1]
-            for hora in self.data.horas:
-                key = (dia_analisis, hora)
-                if key in self.data.tabla:
-                    val = self.data.tabla[key]
-                    num = None
-                    for k, v in ANIMALITOS.items():
-                        if val.startswith(f"{k} ") or val == k or v in val:
-                            num = k
-                            break
-                    if num:
-                        resultados_dia.append((hora, num))
+            resultados_dia = self.data.indice.del_dia(self.data.dias[-1])
         
         estados = self.gestor_patrones.procesar_dia(resultados_dia)
         
@@ -7,17 +7,20 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import streamlit as st
 import pandas as pd
 import time
-from datetime import date, timedelta, datetime
+from datetime import timedelta, datetime
 from collections import Counter, defaultdict
 import logging
 import pytz
 
-from src.date_utils import clamp_date, to_date
+from src.date_utils import ahora_local, clamp_date, hoy_local, to_date
 
-from src.config import LOTERIAS
-from src.historial_client import HistorialClient
+from src.config import LOTERIAS, POLL_UI_SEGUNDOS
+from src.historial_cache import HistorialCache
+from src.ingesta import Ingestor
+from src.poller import leer_estado, poller_activo
 from src.model import MarkovModel
-from src.constantes import ANIMALITOS, COLORES, SECTORES
+from src.codigos import decodificar
+from src.constantes import ANIMALITOS, COLORES, SECTORES, NUMERO_POR_CODIGO, NOMBRE_POR_CODIGO
 from src.exceptions import PredictorError
 from src.atrasos import AnalizadorAtrasos
 from src.tablero import TableroAnalizer
@@ -76,6 +79,28 @@ st.markdown(
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@st.cache_resource
+def get_ingestor() -> Ingestor:
+    """Orquestador de ingesta compartido entre sesiones (todas las loterías en paralelo)."""
+    return Ingestor(cache=HistorialCache())
+
+
+@st.fragment(run_every=POLL_UI_SEGUNDOS)
+def vigilar_tiempo_real(loteria: str, refresh_rate: int, dormido: bool) -> None:
+    """
+    Se re-ejecuta sola cada POLL_UI_SEGUNDOS sin bloquear el script. Con el
+    poller activo solo lee su estado (un JSON pequeño) y relanza la app si
+    publicó sorteos nuevos; sin poller, la relanza cuando vence el intervalo
+    de sondeo propio.
+    """
+    estado = leer_estado(loteria)
+    if poller_activo(estado):
+        if st.session_state.get('poller_version', {}).get(loteria) != estado.get("version", 0):
+            st.rerun(scope="app")
+    elif not dormido and time.time() - st.session_state.get('last_update', 0) > refresh_rate:
+        st.rerun(scope="app")
+
 def get_color_intensity(count: int, max_count: int) -> str:
     """
     Devuelve un color hexadecimal basado en la intensidad (frecuencia).
@@ -456,7 +481,9 @@ def render_backtest_tab(data, start_date, end_date):
     if st.button("🚀 Ejecutar Backtest", type="primary"):
         with st.spinner("Ejecutando simulación histórica... Esto puede tardar unos segundos."):
             gestor = st.session_state['gestor_patrones']
-            backtester = Backtester(data, gestor)
+            # Con el archivo, los procesos del backtest abren su copia mapeada en vez de recibir el historial
+            archivo = get_ingestor().archivo(st.session_state['selected_loteria'])
+            backtester = Backtester(data, gestor, archivo=archivo)
             
             models_cfg = {
                 "Markov": use_markov,
@@ -464,11 +491,14 @@ def render_backtest_tab(data, start_date, end_date):
                 "Recomendador": use_rec
             }
             
-            bt_results = backtester.run(
+            barra = st.progress(0.0, text="Simulando tramos...")
+            bt_results = backtester.run_parallel(
                 bt_start_date.strftime("%Y-%m-%d"),
                 bt_end_date.strftime("%Y-%m-%d"),
-                models_cfg
+                models_cfg,
+                progress=lambda hechas, total: barra.progress(hechas / total, text=f"Tramos completados: {hechas}/{total}"),
             )
+            barra.empty()
             
             summary = bt_results["summary"]
             raw = bt_results["raw"]
@@ -607,7 +637,8 @@ def main():
         
         if selected_loteria != st.session_state['prev_selected_loteria']:
             st.session_state['prev_selected_loteria'] = selected_loteria
-            # Limpiar historial para forzar recarga con la nueva lotería
+            # Soltar el historial de la lotería anterior; si el ingestor ya tiene
+            # el de la nueva se toma de memoria sin descargar nada
             if 'historial' in st.session_state:
                 del st.session_state['historial']
             if 'ml_predictor' in st.session_state:
@@ -618,7 +649,7 @@ def main():
         st.session_state['selected_loteria'] = selected_loteria
         st.session_state['loteria_config'] = loteria_config
         
-        today = date.today()
+        today = ahora_local().date()
         start_date = st.date_input(
             "Fecha Inicio",
             today - timedelta(days=7)
@@ -665,42 +696,46 @@ def main():
         
         # Lógica de carga INICIAL o MANUAL (Carga completa del rango)
         # Se ejecuta si se presiona el botón O si no hay datos en sesión
+        ingestor = get_ingestor()
+        rango_str = (start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"))
+
+        # Cambio de lotería: si el ingestor ya la tiene cargada con este rango es instantáneo
+        if not trigger_load and 'historial' not in st.session_state:
+            precargado = ingestor.get(selected_loteria)
+            if precargado is not None and ingestor.rango(selected_loteria) == rango_str:
+                st.session_state['historial'] = precargado
+                st.session_state['fecha_fin'] = rango_str[1]
+                st.session_state['last_update'] = time.time()
+
         if trigger_load or 'historial' not in st.session_state:
             if start_date > end_date:
                 st.error("La fecha de inicio no puede ser mayor a la fecha fin.")
             else:
                 with st.spinner("Cargando historial completo..."):
                     try:
-                        client = HistorialClient(base_url=loteria_config['historial'])
-                        data = client.fetch_historial(
-                            start_date.strftime("%Y-%m-%d"),
-                            end_date.strftime("%Y-%m-%d")
-                        )
-                        
-                        # Intentar complementar con resultados en vivo si el rango incluye hoy
-                        today_str = date.today().strftime("%Y-%m-%d")
-                        if start_date <= date.today() <= end_date:
-                            try:
-                                if 'resultados' in loteria_config:
-                                    live_data = client.fetch_resultados_envivo(loteria_config['resultados'])
-                                    merged_count = data.merge(live_data)
-                                    if merged_count > 0:
-                                        st.toast(f"Se integraron {merged_count} resultados en vivo.", icon="📡")
-                            except Exception as e:
-                                logger.warning(f"No se pudieron obtener resultados en vivo: {e}")
-                        
+                        # Las demás loterías se cargan en segundo plano, cada una por su lado
+                        otras = [
+                            nombre for nombre in LOTERIAS
+                            if nombre != selected_loteria and (trigger_load or ingestor.rango(nombre) != rango_str)
+                        ]
+                        ingestor.submit_all(*rango_str, loterias=otras)
+
+                        # La seleccionada se espera: archivo local + delta remoto + resultados en vivo
+                        resultado = ingestor.submit(selected_loteria, *rango_str).result()
+                        if not resultado.ok:
+                            raise PredictorError(resultado.error)
+                        data = ingestor.get(selected_loteria)
+                        if resultado.envivo > 0:
+                            st.toast(f"Se integraron {resultado.envivo} resultados en vivo.", icon="📡")
+
                         # Guardar en BD (HU-028)
                         if engine:
                             try:
-                                rows = []
-                                for (d, h), val in data.tabla.items():
-                                    num = None
-                                    for k, v in ANIMALITOS.items():
-                                        if val.startswith(f"{k} ") or val == k or v in val:
-                                            num = k
-                                            break
-                                    if num:
-                                        rows.append({"fecha": d, "hora": h, "numero": num, "loteria": selected_loteria})
+                                rows = [
+                                    {"fecha": d, "hora": h, "numero": num, "loteria": selected_loteria}
+                                    for (d, h), num in zip(data.indice.claves, data.indice.numeros)
+                                    if num is not None
+                                ]
                                 
                                 if rows:
                                     df_db = pd.DataFrame(rows)
@@ -720,8 +755,26 @@ def main():
                     except Exception as e:
                         st.error(f"Error inesperado: {e}")
 
-        # Lógica de ACTUALIZACIÓN INCREMENTAL (Solo hoy)
-        if auto_update and not is_sleeping and 'historial' in st.session_state:
+        # Poller en segundo plano (python -m src.poller): si está vivo la UI no
+        # scrapea, solo recoge del archivo local lo que el poller publicó
+        estado_poller = leer_estado(selected_loteria)
+        usa_poller = auto_update and poller_activo(estado_poller)
+        if usa_poller and 'historial' in st.session_state:
+            st.caption("📡 Poller en segundo plano activo")
+            versiones = st.session_state.setdefault('poller_version', {})
+            version = estado_poller.get("version", 0)
+            if versiones.get(selected_loteria) != version:
+                versiones[selected_loteria] = version
+                today_str = hoy_local()
+                archivo = ingestor.archivo(selected_loteria)
+                nuevos = st.session_state['historial'].merge(archivo.leer(today_str, today_str))
+                st.session_state['last_update'] = time.time()
+                if nuevos > 0:
+                    st.toast(f"🎉 ¡{nuevos} nuevos resultados recibidos!", icon="🔔")
+                    st.session_state['fecha_fin'] = today_str
+
+        # Lógica de ACTUALIZACIÓN INCREMENTAL (Solo hoy), si no hay poller
+        if auto_update and not is_sleeping and not usa_poller and 'historial' in st.session_state:
             last_upd = st.session_state.get('last_update', 0)
             if time.time() - last_upd > refresh_rate:
                 # Ejecutar actualización en segundo plano (visual)
@@ -729,8 +782,8 @@ def main():
                 status_placeholder.info("🔄 Buscando nuevos resultados...")
                 
                 try:
-                    client = HistorialClient(base_url=loteria_config['historial'])
-                    today_str = date.today().strftime("%Y-%m-%d")
+                    client = ingestor.cliente(selected_loteria)
+                    today_str = hoy_local()
                     
                     # Intentar descargar desde la página de RESULTADOS en vivo primero (más actualizada)
                     new_data = None
@@ -747,15 +800,11 @@ def main():
                     # Guardar en BD (HU-028)
                     if engine and new_data.total_sorteos > 0:
                         try:
-                            rows = []
-                            for (d, h), val in new_data.tabla.items():
-                                num = None
-                                for k, v in ANIMALITOS.items():
-                                    if val.startswith(f"{k} ") or val == k or v in val:
-                                        num = k
-                                        break
-                                if num:
-                                    rows.append({"fecha": d, "hora": h, "numero": num, "loteria": selected_loteria})
+                            rows = [
+                                {"fecha": d, "hora": h, "numero": num, "loteria": selected_loteria}
+                                for (d, h), num in zip(new_data.indice.claves, new_data.indice.numeros)
+                                if num is not None
+                            ]
                             
                             if rows:
                                 df_db = pd.DataFrame(rows)
@@ -768,6 +817,11 @@ def main():
                     
                     # Fusionar
                     nuevos = st.session_state['historial'].merge(new_data)
+                    try:
+                        # Si el archivo no llega hasta ayer se sincroniza antes, sin dejar huecos
+                        ingestor.archivo(selected_loteria).append_en_vivo(new_data, client)
+                    except Exception as e:
+                        logger.warning(f"No se pudo actualizar el archivo local: {e}")
                     st.session_state['last_update'] = time.time()
                     
                     status_placeholder.empty()
@@ -1006,13 +1060,10 @@ def main():
 
             # Preparar datos para Historial
             historial_rows = []
-            # data.tabla es {(fecha, hora): animal}
-            # Necesitamos ordenarlo
-            sorted_keys = sorted(data.tabla.keys(), reverse=True)
-            for (fecha, hora) in sorted_keys:
-                animal = data.tabla[(fecha, hora)]
-                # Buscar numero
-                num = next((k for k, v in ANIMALITOS.items() if v == animal), "?")
+            # Del más reciente al más antiguo, según el índice cronológico
+            indice = data.indice
+            for (fecha, hora), animal, num in zip(reversed(indice.claves), reversed(indice.valores), reversed(indice.numeros)):
+                num = num or "?"
                 historial_rows.append({
                     "Fecha": fecha,
                     "Hora": hora,
@@ -1057,68 +1108,32 @@ def main():
                     pass
 
     with tab0:
-        st.subheader(f"📅 Resultados del Día ({date.today().strftime('%d-%m-%Y')})")
+        hoy = ahora_local()
+        today_str = hoy.strftime("%Y-%m-%d")
+        st.subheader(f"📅 Resultados del Día ({hoy.strftime('%d-%m-%Y')})")
         
         # Filtrar resultados de hoy
-        today_str = date.today().strftime("%Y-%m-%d")
         resultados_hoy = []
         
-        # Buscar en data.tabla las claves que coincidan con hoy
-        # data.tabla es Dict[(fecha, hora), animal]
-        # Pero HistorialData tiene listas dias y horas.
-        # Iteramos sobre las horas conocidas para hoy
-        
-        # Ordenar horas cronológicamente si es posible (asumimos formato HH:MM AM/PM o similar)
-        # El scraper guarda horas como strings.
-        
-        # Recopilar
-        for (fecha, hora), animal in data.tabla.items():
-            if fecha == today_str:
-                resultados_hoy.append({"Hora": hora, "Animalito": animal})
+        # Los sorteos de hoy ya vienen en orden cronológico en el índice
+        inicio, fin = data.indice.rango_dia(today_str)
+        for hora, animal in zip(data.indice.horas[inicio:fin], data.indice.valores[inicio:fin]):
+            resultados_hoy.append({"Hora": hora, "Animalito": animal})
         
         if not resultados_hoy:
             st.info("No hay resultados registrados para el día de hoy todavía.")
         else:
-            # Ordenar por hora (simple string sort por ahora, idealmente parsear hora)
-            # Asumimos formato "09:00 AM", "10:00 AM", etc.
-            # Un sort simple funciona razonablemente bien para AM/PM si el formato es consistente 01-12
-            # Pero "12:00 PM" va antes de "01:00 PM".
-            
-            def hora_sort_key(x):
-                h_str = x["Hora"]
-                try:
-                    return datetime.strptime(h_str, "%I:%M %p")
-                except:
-                    return datetime.min
-            
-            resultados_hoy.sort(key=hora_sort_key)
-            
             # Mostrar como tarjetas o tabla
             cols = st.columns(4)
             for idx, res in enumerate(resultados_hoy):
                 animal_full = res["Animalito"] # "24 Iguana" o solo "Iguana"
                 
-                # Separar numero y nombre si es posible
-                parts = animal_full.split()
-                num = "?"
-                nombre = animal_full
-
-                if parts and parts[0].isdigit():
-                    num = parts[0]
-                    nombre = " ".join(parts[1:])
+                # Número y nombre oficial, si el texto se reconoce
+                codigo = decodificar(animal_full)
+                if codigo is not None:
+                    num, nombre = NUMERO_POR_CODIGO[codigo], NOMBRE_POR_CODIGO[codigo]
                 else:
-                    # Intentar buscar el número por el nombre en ANIMALITOS
-                    # animal_full es solo el nombre (ej. "Perico")
-                    import unicodedata
-                    def normalize(text):
-                        return ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn').lower()
-
-                    for k, v in ANIMALITOS.items():
-                        # Comparación insensible a mayúsculas/tildes básica
-                        if normalize(v) == normalize(animal_full):
-                            num = k
-                            nombre = v
-                            break
+                    num, nombre = "?", animal_full
                 
                 with cols[idx % 4]:
                     st.metric(label=res["Hora"], value=num, delta=nombre)
@@ -1361,26 +1376,8 @@ def main():
             dia_analisis = data.dias[-1]
             st.caption(f"Analizando patrones para el día: **{dia_analisis}**")
             
-            # Extraer resultados cronológicos del día
-            horas_dia = [h for (d, h) in data.tabla.keys() if d == dia_analisis]
-            # Ordenar horas
-            def hora_key(h_str):
-                try:
-                    return datetime.strptime(h_str, "%I:%M %p")
-                except:
-                    return datetime.min
-            horas_dia.sort(key=hora_key)
-            
-            for h in horas_dia:
-                val = data.tabla[(dia_analisis, h)]
-                # Extraer número
-                num = None
-                for k, v in ANIMALITOS.items():
-                    if val.startswith(f"{k} ") or val == k or v in val:
-                        num = k
-                        break
-                if num:
-                    resultados_dia.append((h, num))
+            # Resultados cronológicos del día
+            resultados_dia = data.indice.del_dia(dia_analisis)
         
         if not resultados_dia:
             st.warning("No hay datos para el día actual.")
@@ -1607,18 +1604,9 @@ def main():
             csv_recom = Exporter.to_csv(df_data)
             st.download_button("📥 Descargar Ranking (CSV)", data=csv_recom, file_name="recomendaciones.csv", mime="text/csv")
 
-    # Auto-refresh trigger al final
+    # Auto-refresh: vigilancia periódica sin bloquear el script
     if auto_update:
-        # Calcular tiempo restante para el próximo refresh
-        elapsed = time.time() - st.session_state.get('last_update', 0)
-        remaining = refresh_rate - elapsed
-        
-        if remaining > 0:
-            # Dormir hasta que toque actualizar
-            # Streamlit interrumpirá este sleep si el usuario interactúa con la UI
-            time.sleep(remaining)
-        
-        st.rerun()
+        vigilar_tiempo_real(selected_loteria, refresh_rate, is_sleeping)
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,11 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
 from .historial_client import HistorialData
 from .constantes import ANIMALITOS
+from .date_utils import fecha_a_ordinal
 
 @dataclass
 class AtrasoInfo:
@@ -38,40 +39,35 @@ class AnalizadorAtrasos:
             data: Datos del historial.
             fecha_fin: Fecha de referencia para calcular días de atraso (YYYY-MM-DD).
         """
-        # 1. Aplanar el historial cronológicamente
-        # Lista de tuplas (fecha, hora, animal)
-        sorteos_cronologicos = []
-        for dia in data.dias:
-            for hora in data.horas:
-                key = (dia, hora)
-                if key in data.tabla:
-                    sorteos_cronologicos.append({
-                        "fecha": dia,
-                        "hora": hora,
-                        "animal": data.tabla[key]
-                    })
-        
-        total_sorteos = len(sorteos_cronologicos)
-        fecha_ref = datetime.strptime(fecha_fin, "%Y-%m-%d")
-        
+        # 1. Secuencia cronológica (índice del historial) y última aparición de cada valor
+        indice = data.indice
+
+        ultima_posicion: Dict[str, int] = {}
+        for i, animal in enumerate(indice.valores):
+            ultima_posicion[animal] = i
+
+        ultimas = {animal: (i, indice.fechas[i]) for animal, i in ultima_posicion.items()}
+        return AnalizadorAtrasos.desde_ultimas(ultimas, len(indice), fecha_fin)
+
+    @staticmethod
+    def desde_ultimas(
+        ultimas: Dict[str, Tuple[int, str]], total_sorteos: int, fecha_fin: str
+    ) -> List[AtrasoInfo]:
+        """
+        Atrasos a partir de la última aparición de cada valor
+        ({animal: (posición cronológica, fecha)}), sin recorrer el historial.
+        Lo usan quienes mantienen esas posiciones en línea (walk-forward).
+        """
+        ordinal_ref = fecha_a_ordinal(fecha_fin)
         resultados = []
         
         # 2. Calcular métricas para cada animalito (0-36)
         for num, nombre in ANIMALITOS.items():
-            # Buscar última aparición
-            ultima_aparicion_idx = -1
-            ultima_fecha_str = None
-            
-            # Recorrer de atrás hacia adelante para encontrar el último
-            for i in range(total_sorteos - 1, -1, -1):
-                if sorteos_cronologicos[i]["animal"] == nombre:
-                    ultima_aparicion_idx = i
-                    ultima_fecha_str = sorteos_cronologicos[i]["fecha"]
-                    break
+            ultima_aparicion_idx, ultima_fecha_str = ultimas.get(nombre, (-1, None))
             
             if ultima_aparicion_idx != -1:
                 # Salió al menos una vez
-                dias_sin_salir = (fecha_ref - datetime.strptime(ultima_fecha_str, "%Y-%m-%d")).days
+                dias_sin_salir = ordinal_ref - fecha_a_ordinal(ultima_fecha_str)
                 sorteos_sin_salir = total_sorteos - 1 - ultima_aparicion_idx
                 nunca_salio = False
             else:
@@ -1,45 +1,109 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Tuple
-from datetime import datetime
+from typing import List, Dict, Any, Tuple, Optional, Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+import multiprocessing
+import os
+import numpy as np
 import pandas as pd
 from collections import defaultdict
 
-from .historial_client import HistorialData
+from .date_utils import ordinal_a_fecha
+from .historial_archivo import HistorialArchivo
+from .historial_client import HistorialData, HistorialView
+from .horas import tabla_minutos
 from .model import MarkovModel
 from .ml_model import MLPredictor, HAS_ML
-from .recomendador import Recomendador
+from .recomendador import RecomendadorIncremental
 from .patrones import GestorPatrones
-from .constantes import ANIMALITOS
+from .codigos import numero_de
+from .config import BACKTEST_WORKERS, BACKTEST_TRAMO_DIAS
+
+# Orden fijo de los modelos en cada paso (también al combinar tareas en paralelo)
+MODELOS = ("Markov", "ML", "Recomendador")
+
+# Estado de cada proceso del pool: el historial se carga una sola vez, al iniciarlo
+_backtester_trabajador: Optional["Backtester"] = None
+
+# Origen del historial en el almacén mapeado: (lotería, directorio, desde, hasta, días, horas, huella)
+OrigenMapeado = Tuple[str, str, str, str, List[str], List[str], str]
+
+
+class _AlmacenCambiado(RuntimeError):
+    """El almacén mapeado ya no coincide con el historial del proceso principal."""
+
+
+def _huella(data: HistorialData) -> str:
+    """Resumen de las columnas, comparable entre procesos (usa el minuto, no el slot local)."""
+    h = hashlib.blake2b(digest_size=16)
+    for columna in (data.dia_ordinal, tabla_minutos()[data.slot], data.codigos):
+        h.update(np.ascontiguousarray(columna, dtype=np.int64).tobytes())
+    h.update("\x1f".join(data.extras).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _iniciar_trabajador(
+    data: Optional[HistorialData], gestor_patrones: GestorPatrones, origen: Optional[OrigenMapeado] = None
+) -> None:
+    """
+    Con `origen` el historial se lee del almacén mapeado del archivo (páginas
+    compartidas con los demás procesos, nada viaja por el pipe); si no, llega
+    serializado en `data`.
+    """
+    global _backtester_trabajador
+    _backtester_trabajador = None
+    if origen is not None:
+        loteria, directorio, desde, hasta, dias, horas, huella = origen
+        mapa = HistorialArchivo(loteria, directorio).mapeado()
+        if mapa is None:
+            return
+        leido = mapa.leer(desde, hasta)
+        # Mismo vocabulario de días y horas que el historial del proceso principal
+        data = HistorialData.from_arrays(dias, horas, leido.dia_ordinal, leido.slot, leido.codigos, leido.extras)
+        if _huella(data) != huella:
+            return
+    _backtester_trabajador = Backtester(data, gestor_patrones)
+
+
+def _ejecutar_tarea(modelo: str, inicio: int, fin: int, ml_params: Dict[str, Any], ml_desde: int):
+    if _backtester_trabajador is None:
+        raise _AlmacenCambiado("El almacén mapeado cambió antes de iniciar el proceso")
+    return _backtester_trabajador._tarea(modelo, inicio, fin, ml_params, ml_desde)
+
 
 class Backtester:
-    def __init__(self, data: HistorialData, gestor_patrones: GestorPatrones):
+    def __init__(
+        self, data: HistorialData, gestor_patrones: GestorPatrones, archivo: Optional[HistorialArchivo] = None
+    ):
         self.full_data = data
         self.gestor_patrones = gestor_patrones
+        # Archivo del que salió `data`: los procesos de `run_parallel` leen su copia mapeada
+        self.archivo = archivo
         
-        # Ordenar claves cronológicamente para iterar
-        # Clave: (fecha, hora)
-        # Ordenamos por fecha y luego por hora (parseando AM/PM)
-        self.sorted_keys = sorted(
-            data.tabla.keys(), 
-            key=lambda x: (x[0], datetime.strptime(x[1], "%I:%M %p") if "M" in x[1] else x[1])
-        )
+        # Claves (fecha, hora) en orden cronológico, tomadas del índice del historial
+        self.sorted_keys = data.indice.claves
 
-    def _slice_data(self, up_to_index: int) -> HistorialData:
+    def _slice_data(self, up_to_index: int) -> HistorialView:
         """
-        Crea un HistorialData con los datos hasta el índice (exclusivo).
+        Vista del historial con los datos hasta el índice (exclusivo), sin copiarlos.
         Esto simula el estado del historial en ese momento del tiempo.
         """
-        keys_slice = self.sorted_keys[:up_to_index]
-        
-        # Reconstruir tabla
-        new_tabla = {k: self.full_data.tabla[k] for k in keys_slice}
-        
-        # Reconstruir dias y horas
-        # Optimización: usar sets para velocidad
-        new_dias = sorted(list(set(k[0] for k in keys_slice)))
-        new_horas = sorted(list(set(k[1] for k in keys_slice)))
-        
-        return HistorialData(dias=new_dias, horas=new_horas, tabla=new_tabla)
+        return HistorialView(self.full_data, upto=up_to_index)
+
+    def _rango(self, start_date: str, end_date: str) -> Tuple[int, int]:
+        """Índices [inicio, fin) de los sorteos a simular."""
+        # Buscar primer índice que cumpla fecha >= start_date
+        start_idx = 0
+        for i, (fecha, hora) in enumerate(self.sorted_keys):
+            if fecha >= start_date:
+                start_idx = i
+                break
+
+        # Si nos pasamos de la fecha fin, terminamos
+        end_idx = start_idx
+        while end_idx < len(self.sorted_keys) and self.sorted_keys[end_idx][0] <= end_date:
+            end_idx += 1
+        return start_idx, end_idx
 
     def run(self, start_date: str, end_date: str, models_config: Dict[str, bool], ml_params: Dict[str, Any] = None) -> Dict[str, Any]:
         """
@@ -47,80 +111,178 @@ class Backtester:
         models_config: {'Markov': True, 'ML': True, 'Recomendador': True}
         ml_params: Hiperparámetros opcionales para el modelo ML.
         """
-        results = []
-        
-        # Encontrar índices de inicio y fin en la lista ordenada
-        start_idx = 0
-        
-        # Buscar primer índice que cumpla fecha >= start_date
-        for i, (fecha, hora) in enumerate(self.sorted_keys):
-            if fecha >= start_date:
-                start_idx = i
-                break
-        
+        inicio, fin = self._rango(start_date, end_date)
+        return self._combinar(inicio, fin, self._predecir(inicio, fin, models_config, ml_params))
+
+    def run_parallel(
+        self,
+        start_date: str,
+        end_date: str,
+        models_config: Dict[str, bool],
+        ml_params: Dict[str, Any] = None,
+        workers: Optional[int] = None,
+        tramo_dias: Optional[int] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Igual que `run`, repartiendo el trabajo en un pool de procesos.
+
+        Cada modelo se simula por separado y el rango se corta en tramos de
+        `tramo_dias` días; cada tramo arranca con el estado construido con
+        todo lo anterior (su calentamiento). Márkov se resuelve vectorizado y
+        el ML se entrena una sola vez con lo anterior a start_date, así que
+        cada uno va en una única tarea. Los pasos se combinan por índice, de
+        modo que el resultado es el mismo que el de `run` sin importar el
+        orden en que terminen las tareas.
+        `progress(hechas, total)` se llama cada vez que termina una tarea.
+
+        Los procesos se crean con "spawn" (no "fork"): quien llama suele ser
+        un servidor con varios hilos. Si el historial coincide con la copia
+        mapeada del archivo (`archivo.mapeado()`), cada proceso la abre en
+        solo lectura; si no, o si cambió mientras arrancaban, el historial
+        viaja serializado por `initargs`. Nunca se usan más procesos que CPU
+        ni que tareas.
+        """
+        workers = BACKTEST_WORKERS if workers is None else workers
+        tramo_dias = tramo_dias or BACKTEST_TRAMO_DIAS
+        inicio, fin = self._rango(start_date, end_date)
+
+        tareas = []
+        for modelo in MODELOS:
+            if not models_config.get(modelo):
+                continue
+            # Márkov (vectorizado) y ML (entrenado una vez) no ganan nada al trocearse
+            tramos = self._tramos(inicio, fin, tramo_dias) if modelo == "Recomendador" else [(inicio, fin)]
+            tareas.extend((modelo, a, b, ml_params, inicio) for a, b in tramos)
+
+        predicciones: Dict[str, Dict[int, List[str]]] = {}
+        total = len(tareas)
+        workers = max(1, min(workers or 1, os.cpu_count() or 1, total))
+        if workers == 1:
+            for hechas, tarea in enumerate(tareas, start=1):
+                self._acumular(predicciones, self._tarea(*tarea))
+                if progress:
+                    progress(hechas, total)
+        else:
+            origen = self._origen_mapeado()
+            try:
+                if origen is None:
+                    raise _AlmacenCambiado("Historial sin copia mapeada equivalente")
+                predicciones = self._en_pool(tareas, workers, (None, self.gestor_patrones, origen), progress)
+            except _AlmacenCambiado:
+                predicciones = self._en_pool(tareas, workers, (self.full_data, self.gestor_patrones), progress)
+        return self._combinar(inicio, fin, predicciones)
+
+    @staticmethod
+    def _en_pool(
+        tareas: List[tuple], workers: int, initargs: tuple, progress: Optional[Callable[[int, int], None]]
+    ) -> Dict[str, Dict[int, List[str]]]:
+        predicciones: Dict[str, Dict[int, List[str]]] = {}
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_iniciar_trabajador,
+            initargs=initargs,
+        ) as pool:
+            futuros = [pool.submit(_ejecutar_tarea, *tarea) for tarea in tareas]
+            for hechas, futuro in enumerate(as_completed(futuros), start=1):
+                Backtester._acumular(predicciones, futuro.result())
+                if progress:
+                    progress(hechas, len(tareas))
+        return predicciones
+
+    def _origen_mapeado(self) -> Optional[OrigenMapeado]:
+        """Cómo abrir el historial desde la copia mapeada del archivo, o None si no la hay o no coincide."""
+        data = self.full_data
+        if self.archivo is None or data.total_sorteos == 0:
+            return None
+        mapa = self.archivo.mapeado()
+        if mapa is None:
+            return None
+        desde = ordinal_a_fecha(int(data.dia_ordinal[0]))
+        hasta = ordinal_a_fecha(int(data.dia_ordinal[-1]))
+        huella = _huella(data)
+        if _huella(mapa.leer(desde, hasta)) != huella:
+            return None
+        return (
+            self.archivo.loteria, str(self.archivo.ruta.parent), desde, hasta,
+            list(data.dias), list(data.horas), huella,
+        )
+
+    def _tramos(self, inicio: int, fin: int, tramo_dias: int) -> List[Tuple[int, int]]:
+        """Corta [inicio, fin) en tramos de `tramo_dias` días, siempre en cambio de día."""
+        if fin <= inicio:
+            return []
+        ordinales = self.full_data.dia_ordinal[inicio:fin]
+        bloque = (ordinales - ordinales[0]) // max(1, tramo_dias)
+        cortes = [inicio] + (inicio + np.flatnonzero(np.diff(bloque)) + 1).tolist() + [fin]
+        return list(zip(cortes[:-1], cortes[1:]))
+
+    def _tarea(self, modelo: str, inicio: int, fin: int, ml_params: Dict[str, Any], ml_desde: int):
+        """Predicciones de un solo modelo en [inicio, fin)."""
+        predicciones = self._predecir(inicio, fin, {modelo: True}, ml_params, ml_desde)
+        return modelo, predicciones.get(modelo, {})
+
+    @staticmethod
+    def _acumular(predicciones: Dict[str, Dict[int, List[str]]], resultado) -> None:
+        modelo, preds = resultado
+        predicciones.setdefault(modelo, {}).update(preds)
+
+    def _predecir(
+        self,
+        inicio: int,
+        fin: int,
+        models_config: Dict[str, bool],
+        ml_params: Dict[str, Any] = None,
+        ml_desde: Optional[int] = None,
+    ) -> Dict[str, Dict[int, List[str]]]:
+        """
+        Predicciones por modelo para cada sorteo de [inicio, fin):
+        {modelo: {índice: [números]}}. El estado se construye con lo anterior
+        a `inicio`; el ML se entrena con lo anterior a `ml_desde` (por
+        defecto, `inicio`).
+        """
+        predicciones: Dict[str, Dict[int, List[str]]] = {m: {} for m in MODELOS if models_config.get(m)}
+
         # Entrenar ML una vez al principio si está activo (Static Training)
         # Se entrena con TODO lo anterior a start_date
         ml_predictor = None
         if models_config.get("ML") and HAS_ML:
             # Datos de entrenamiento iniciales
-            initial_train_data = self._slice_data(start_idx)
+            initial_train_data = self._slice_data(inicio if ml_desde is None else ml_desde)
             if initial_train_data.total_sorteos > 20: # Mínimo razonable
                 ml_predictor = MLPredictor(initial_train_data, params=ml_params)
                 ml_predictor.train()
-        
+
+        # 1. Markov: todo el rango de una sola pasada (sin recorrer sorteo a sorteo)
+        if models_config.get("Markov"):
+            predicciones["Markov"] = self._markov_vectorizado(inicio, fin)[0]
+
+        # Walk-forward: el estado (conteos, últimas apariciones, ventana de
+        # sectores) se construye una vez con lo anterior a inicio y avanza un
+        # sorteo por paso.
+        recomendador = None
+        if models_config.get("Recomendador"):
+            recomendador = RecomendadorIncremental(self.full_data, self.gestor_patrones, upto=inicio)
+        if recomendador is None and ml_predictor is None:
+            return predicciones
+
         # Loop de simulación
         # Iteramos sorteo a sorteo dentro del rango
-        for i in range(start_idx, len(self.sorted_keys)):
-            fecha, hora = self.sorted_keys[i]
-            
-            # Si nos pasamos de la fecha fin, terminamos
-            if fecha > end_date:
-                break
-                
-            real_animal_nombre = self.full_data.tabla[(fecha, hora)]
-            # Buscar numero real
-            real_numero = next((k for k, v in ANIMALITOS.items() if v == real_animal_nombre), "?")
-            
-            # Datos disponibles hasta este momento (sin incluir el actual)
+        for i in range(inicio, fin):
+            if i > inicio and recomendador is not None:
+                recomendador.avanzar()
+
+            # El estado solo contiene los sorteos anteriores a i (sin incluir el actual)
             # Esto garantiza RN-001: No ver el futuro
-            current_history = self._slice_data(i)
-            
-            if current_history.total_sorteos < 10:
+            if i < 10:
                 continue
 
-            step_result = {
-                "fecha": fecha,
-                "hora": hora,
-                "real": f"{real_numero} - {real_animal_nombre}",
-                "real_num": real_numero,
-                "preds": {}
-            }
-
-            # 1. Markov
-            if models_config.get("Markov"):
-                try:
-                    # Markov necesita el último resultado para predecir
-                    last_key = self.sorted_keys[i-1]
-                    last_animal = current_history.tabla[last_key]
-                    
-                    model = MarkovModel.from_historial(current_history)
-                    probs = model.next_probs(last_animal)
-                    # Top 5
-                    top_markov = sorted(probs.items(), key=lambda x: x[1], reverse=True)[:5]
-                    step_result["preds"]["Markov"] = [
-                        next((k for k, v in ANIMALITOS.items() if v == name), "?") for name, _ in top_markov
-                    ]
-                except Exception:
-                    step_result["preds"]["Markov"] = []
-
             # 2. ML (IA)
             if models_config.get("ML") and ml_predictor and ml_predictor.is_trained:
                 try:
                     # Necesita últimos 3 resultados
                     if i >= 3:
-                        last_3_keys = self.sorted_keys[i-3:i]
-                        last_3_names = [self.full_data.tabla[k] for k in last_3_keys]
-                        
                         # Para backtesting, necesitamos simular el estado en ese momento.
                         # El nuevo predict() usa FeatureEngineer sobre self.data.
                         # Si ml_predictor.data apunta a self.full_data, usará datos futuros (leakage).
@@ -134,29 +296,77 @@ class Backtester:
                         # Esto es complejo de arreglar perfectamente sin refactorizar FeatureEngineer.
                         # Solución temporal: Llamar a predict() sin argumentos (usará últimos datos disponibles en el objeto predictor).
                         # Esto NO es correcto para backtesting histórico (usará datos del final del dataset).
-                        
+
                         # Opción B: Re-implementar lógica simple aquí o en MLPredictor para backtesting.
                         # Dado que el error es AttributeError, el método no existe.
                         # Vamos a usar predict() genérico, sabiendo que en backtesting puede no ser exacto temporalmente
                         # hasta que FeatureEngineer soporte "as_of_date".
-                        
+
                         preds = ml_predictor.predict(top_n=5)
-                        step_result["preds"]["ML"] = [p.numero for p in preds[:5]]
+                        predicciones["ML"][i] = [p.numero for p in preds[:5]]
                     else:
-                        step_result["preds"]["ML"] = []
+                        predicciones["ML"][i] = []
                 except Exception:
-                    step_result["preds"]["ML"] = []
+                    predicciones["ML"][i] = []
 
             # 3. Recomendador
             if models_config.get("Recomendador"):
                 try:
-                    # El recomendador es más pesado, recalcula todo.
-                    # Puede tardar si el historial es grande.
-                    rec = Recomendador(current_history, self.gestor_patrones)
-                    scores = rec.calcular_scores() # Usa pesos default
-                    step_result["preds"]["Recomendador"] = [s.numero for s in scores[:5]]
+                    scores = recomendador.calcular_scores() # Usa pesos default
+                    predicciones["Recomendador"][i] = [s.numero for s in scores[:5]]
                 except Exception:
-                    step_result["preds"]["Recomendador"] = []
+                    predicciones["Recomendador"][i] = []
+
+        return predicciones
+
+    def _markov_vectorizado(self, inicio: int, fin: int) -> Tuple[Dict[int, List[str]], Dict[str, np.ndarray]]:
+        """
+        Predicciones y aciertos de Márkov para los pasos de [inicio, fin)
+        (desde el sorteo 10), calculados sobre conteos acumulados en NumPy
+        (ver `MarkovModel.top_por_paso`). Devuelve ({índice: [números]},
+        {"Top1"/"Top3"/"Top5": vector bool por paso}).
+        """
+        inicio = max(inicio, 10)
+        fin = max(inicio, min(fin, len(self.sorted_keys)))
+        top = MarkovModel.top_por_paso(self.full_data, inicio, fin, n=5)
+
+        # Se compara por número, igual que en `_combinar`: estados distintos
+        # pueden dar el mismo número (o "?")
+        numeros = [numero_de(e) or "?" for e in MarkovModel._estados_de(self.full_data)]
+        reales = [n or "?" for n in self.full_data.indice.numeros[inicio:fin]]
+        id_numero = {n: i for i, n in enumerate(dict.fromkeys(numeros + reales))}
+        ids = np.array([id_numero[n] for n in numeros] + [-1])  # el relleno -1 queda en -1
+        iguales = ids[top] == np.array([id_numero[n] for n in reales], dtype=np.intp)[:, None]
+        aciertos = {"Top1": iguales[:, 0], "Top3": iguales[:, :3].any(axis=1), "Top5": iguales.any(axis=1)}
+
+        preds = {
+            i: [numeros[c] for c in fila if c >= 0]
+            for i, fila in zip(range(inicio, fin), top.tolist())
+        }
+        return preds, aciertos
+
+    def aciertos_markov(self, start_date: str, end_date: str) -> Dict[str, np.ndarray]:
+        """Vectores de acierto Top1/Top3/Top5 de Márkov, un elemento por paso de `run`."""
+        return self._markov_vectorizado(*self._rango(start_date, end_date))[1]
+
+    def _combinar(self, inicio: int, fin: int, predicciones: Dict[str, Dict[int, List[str]]]) -> Dict[str, Any]:
+        """Arma los pasos de [inicio, fin) con las predicciones de cada modelo y los evalúa."""
+        results = []
+        for i in range(max(inicio, 10), fin):
+            fecha, hora = self.sorted_keys[i]
+            real_animal_nombre = self.full_data.indice.valores[i]
+            real_numero = self.full_data.indice.numeros[i] or "?"
+
+            step_result = {
+                "fecha": fecha,
+                "hora": hora,
+                "real": f"{real_numero} - {real_animal_nombre}",
+                "real_num": real_numero,
+                "preds": {}
+            }
+            for modelo in MODELOS:
+                if i in predicciones.get(modelo, ()):
+                    step_result["preds"][modelo] = predicciones[modelo][i]
 
             # Evaluar aciertos
             aciertos = {}
@@ -165,10 +375,10 @@ class Backtester:
                 is_top3 = real_numero in preds[:3]
                 is_top5 = real_numero in preds[:5]
                 aciertos[model_name] = {"Top1": is_top1, "Top3": is_top3, "Top5": is_top5}
-            
+
             step_result["aciertos"] = aciertos
             results.append(step_result)
-            
+
         return self._aggregate_results(results)
 
     def _aggregate_results(self, raw_results: List[Dict]) -> Dict[str, Any]:
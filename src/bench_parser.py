@@ -0,0 +1,50 @@
+"""
+Benchmark de los backends de parseo del historial.
+
+Uso:
+    python -m src.bench_parser [--repeticiones 200]
+
+Mide páginas/segundo de cada backend sobre las páginas guardadas en
+tests/fixtures/historial.
+"""
+import argparse
+import time
+from pathlib import Path
+
+from src.historial_parser import PARSERS
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "historial"
+
+
+def medir(parser, paginas, repeticiones: int) -> float:
+    """Retorna páginas por segundo."""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for html in paginas:
+            parser(html)
+    elapsed = time.perf_counter() - inicio
+    return (repeticiones * len(paginas)) / elapsed if elapsed > 0 else float("inf")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compara backends de parseo del historial.")
+    ap.add_argument("--repeticiones", type=int, default=200)
+    args = ap.parse_args()
+
+    paginas = [p.read_text(encoding="utf-8") for p in sorted(FIXTURES.glob("*.html"))]
+    if not paginas:
+        print(f"No hay fixtures en {FIXTURES}")
+        return
+
+    resultados = {}
+    for nombre, parser in PARSERS.items():
+        parser(paginas[0])  # calentamiento
+        resultados[nombre] = medir(parser, paginas, args.repeticiones)
+        print(f"{nombre:>5}: {resultados[nombre]:10.1f} páginas/s")
+
+    if "lxml" in resultados and "bs4" in resultados:
+        print(f"Aceleración lxml vs bs4: x{resultados['lxml'] / resultados['bs4']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
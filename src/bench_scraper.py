@@ -0,0 +1,91 @@
+"""
+Benchmark de extremo a extremo de HistorialClient contra el servidor local de replay.
+
+Uso:
+    python -m src.bench_scraper [--corpus DIR] [--start 2025-01-01 --end 2025-06-30]
+                                [--latencia 0.05] [--errores 0.05] [--workers 4] [--repeticiones 3]
+
+Sin --corpus se genera un corpus sintético temporal para el rango. Mide
+páginas/s y sorteos/s de fetch_historial (secuencial y concurrente) y de
+fetch_resultados_envivo.
+"""
+import argparse
+import logging
+import tempfile
+import time
+
+from src.config import LOTERIAS
+from src.historial_client import HistorialClient
+from src.http_transport import HttpTransport
+from src.replay import Corpus, ServidorReplay, generar_sintetico
+
+
+def medir(nombre, fn, transport: HttpTransport, repeticiones: int) -> None:
+    transport.reset_stats()
+    sorteos = 0
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        sorteos += fn().total_sorteos
+    elapsed = time.perf_counter() - inicio
+    paginas = sum(st.peticiones for st in transport.stats().values())
+    print(
+        f"{nombre:>24}: {paginas / elapsed:8.1f} páginas/s  {sorteos / elapsed:10.1f} sorteos/s  "
+        f"({paginas} peticiones, {elapsed:.2f}s)"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark del scraper contra el servidor de replay.")
+    ap.add_argument("--corpus", help="Corpus grabado con `python -m src.replay grabar`")
+    ap.add_argument("--loteria", default="La Granjita", choices=list(LOTERIAS))
+    ap.add_argument("--start", default="2025-01-01")
+    ap.add_argument("--end", default="2025-06-30")
+    ap.add_argument("--latencia", type=float, default=0.02)
+    ap.add_argument("--jitter", type=float, default=0.0)
+    ap.add_argument("--errores", type=float, default=0.0, help="Probabilidad de responder 503")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--repeticiones", type=int, default=3)
+    args = ap.parse_args()
+    # Los avisos de reintento ensuciarían la tabla
+    logging.basicConfig(level=logging.ERROR)
+
+    tmp = None
+    if args.corpus:
+        corpus = Corpus(args.corpus)
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        corpus = Corpus(tmp.name)
+        generar_sintetico(corpus, args.loteria, args.start, args.end)
+
+    cfg = LOTERIAS[args.loteria]
+    # Sin límite de tasa: se mide el cliente, no la cortesía con el sitio
+    transport = HttpTransport(rate=0, backoff_base=0.01)
+    try:
+        with ServidorReplay(corpus, args.latencia, args.jitter, args.errores, semilla=0) as servidor:
+            client = HistorialClient(base_url=servidor.url(cfg["historial"]), transport=transport)
+            print(f"Corpus: {len(corpus)} páginas | latencia {args.latencia}s | errores {args.errores:.0%}")
+            medir(
+                "historial secuencial",
+                lambda: client.fetch_historial(args.start, args.end),
+                transport, args.repeticiones,
+            )
+            medir(
+                f"historial concurrente x{args.workers}",
+                lambda: client.fetch_historial(args.start, args.end, concurrent=True, max_workers=args.workers),
+                transport, args.repeticiones,
+            )
+            if cfg.get("resultados"):
+                url = servidor.url(cfg["resultados"])
+                medir(
+                    "resultados en vivo",
+                    lambda: client.fetch_resultados_envivo(url),
+                    transport, args.repeticiones * 10,
+                )
+    finally:
+        transport.close()
+        if tmp is not None:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
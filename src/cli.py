@@ -7,6 +7,8 @@ from rich.console import Console
 from rich.table import Table
 
 from .historial_client import HistorialClient
+from .historial_cache import HistorialCache
+from .historial_archivo import HistorialArchivo
 from .model import MarkovModel
 
 from datetime import datetime
@@ -82,15 +84,23 @@ def main() -> None:
         default="sequential",
         help="Modo de análisis: 'sequential' (siguiente sorteo) o 'same_hour' (misma hora día siguiente). Default: sequential",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignora la caché y el archivo local; descarga todo desde Lotoven.",
+    )
     args = parser.parse_args()
 
     try:
         validate_dates(args.start, args.end)
 
-        client = HistorialClient()
+        if args.no_cache:
+            client = HistorialClient()
+        else:
+            client = HistorialClient(cache=HistorialCache(), archivo=HistorialArchivo("La Granjita"))
         
         with console.status("[bold green]Cargando historial desde Lotoven...[/bold green]", spinner="dots"):
-            data = client.fetch_historial(args.start, args.end)
+            data = client.fetch_historial(args.start, args.end, concurrent=True)
 
         if data.total_sorteos == 0:
             console.print("[yellow]No se encontraron resultados para La Granjita en el rango seleccionado.[/yellow]")
@@ -0,0 +1,62 @@
+"""
+Decodificación única de los valores de sorteo a códigos canónicos.
+
+El código canónico es el de `constantes` (0..36 el número del animalito,
+37 para "00"). Cada texto distinto se interpreta una sola vez y queda
+memorizado; las tablas código <-> número <-> nombre <-> etiqueta son de
+acceso directo (NUMERO_POR_CODIGO, NOMBRE_POR_CODIGO, ETIQUETA_POR_CODIGO,
+CODIGO_POR_NUMERO, CODIGO_POR_NOMBRE en `constantes`).
+
+Se aceptan las formas que entrega el sitio o que usa la app: "Iguana",
+"IGUANA", "24", "24 Iguana", "24 - Iguana". No se buscan subcadenas: "Rana"
+no se confunde con "Iguana".
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Optional
+
+from .constantes import (
+    CODIGO_POR_NOMBRE,
+    CODIGO_POR_NUMERO,
+    NOMBRE_POR_CODIGO,
+    NUMERO_POR_CODIGO,
+)
+from .historial_parser import normalize_str
+
+_CODIGO_POR_NOMBRE_NORM = {normalize_str(nombre): c for nombre, c in CODIGO_POR_NOMBRE.items()}
+
+
+@lru_cache(maxsize=4096)
+def decodificar(valor: str) -> Optional[int]:
+    """Código canónico de un texto de sorteo, o None si no se reconoce."""
+    codigo = CODIGO_POR_NOMBRE.get(valor)
+    if codigo is not None:
+        return codigo
+
+    partes = valor.replace("-", " ").split()
+    if not partes:
+        return None
+    if partes[0].isdigit():
+        # "24 Iguana" / "03" / "00": manda el número
+        numero = "00" if partes[0] == "00" else str(int(partes[0]))
+        return CODIGO_POR_NUMERO.get(numero)
+
+    codigo = _CODIGO_POR_NOMBRE_NORM.get(normalize_str(" ".join(partes)))
+    if codigo is not None:
+        return codigo
+    # Nombre como palabra completa dentro del texto ("Sale Iguana"), si es el único
+    encontrados = {_CODIGO_POR_NOMBRE_NORM.get(normalize_str(p)) for p in partes} - {None}
+    return encontrados.pop() if len(encontrados) == 1 else None
+
+
+def numero_de(valor: str) -> Optional[str]:
+    """Número ("0".."36", "00") de un texto de sorteo."""
+    codigo = decodificar(valor)
+    return None if codigo is None else NUMERO_POR_CODIGO[codigo]
+
+
+def nombre_de(valor: str) -> Optional[str]:
+    """Nombre oficial del animalito de un texto de sorteo."""
+    codigo = decodificar(valor)
+    return None if codigo is None else NOMBRE_POR_CODIGO[codigo]
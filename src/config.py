@@ -51,3 +51,43 @@ USER_AGENT = (
     "Chrome/120.0 Safari/537.36"
 )
 TIMEOUT = 20
+
+# Descarga concurrente del historial (ventanas semanales)
+FETCH_MAX_WORKERS = 4
+FETCH_RATE_LIMIT = 4.0  # peticiones por segundo, compartido entre hilos y loterías
+
+# Transporte HTTP compartido (sesión keep-alive, reintentos y cubeta de fichas)
+HTTP_POOL_SIZE = 16  # conexiones reutilizables por host
+HTTP_RATE_BURST = 4  # ráfaga máxima de la cubeta de fichas
+HTTP_RETRIES = 3  # reintentos ante 5xx, timeouts o errores de conexión
+HTTP_BACKOFF_BASE = 0.5  # segundos; se duplica en cada reintento
+HTTP_BACKOFF_MAX = 8.0
+
+# Caché en disco de semanas del historial
+CACHE_DIR = ".cache/historial"
+CACHE_TTL_SEMANA_ACTUAL = 600  # segundos; las semanas cerradas no vencen
+CACHE_GRACIA_DIAS = 1  # días tras el fin de la semana en que aún se revalida (sorteos publicados tarde)
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Archivo local persistente del historial (un .npz por lotería)
+ARCHIVO_DIR = "data/historial"
+ARCHIVO_DELTA_MAX = 2000  # filas del registro de cambios (.delta) antes de compactar el .npz
+
+# Horario de sorteos (hora de Caracas). Cada lotería puede tener su propia grilla
+ZONA_HORARIA = "America/Caracas"
+HORARIO_SORTEOS = [
+    "08:00 AM", "09:00 AM", "10:00 AM", "11:00 AM", "12:00 PM", "01:00 PM",
+    "02:00 PM", "03:00 PM", "04:00 PM", "05:00 PM", "06:00 PM", "07:00 PM",
+]
+HORARIOS_POR_LOTERIA = {}  # nombre -> lista de horas, si difiere de HORARIO_SORTEOS
+
+# Sondeo en segundo plano (python -m src.poller)
+POLL_DEMORA_PUBLICACION = 60  # segundos tras el sorteo antes del primer intento
+POLL_VENTANA_POST_SORTEO = 15 * 60  # durante cuánto se insiste tras cada sorteo
+POLL_INTERVALO_RAPIDO = 30  # segundos entre intentos dentro de la ventana
+POLL_ESPERA_MAXIMA = 15 * 60  # tope de espera fuera de las ventanas
+POLL_UI_SEGUNDOS = 15  # cada cuánto la UI mira si el poller publicó cambios
+
+# Backtesting en paralelo (procesos)
+BACKTEST_WORKERS = 4  # procesos por corrida como máximo (cada uno recibe una copia del historial)
+BACKTEST_TRAMO_DIAS = 30  # días por tramo; cada tramo reconstruye su estado con lo anterior
@@ -73,3 +73,13 @@ COLUMNAS = {
     "Columna 2": [str(i) for i in range(2, 37, 3)], # 2, 5, 8...
     "Columna 3": [str(i) for i in range(3, 37, 3)]  # 3, 6, 9...
 }
+
+# Códigos compactos de sorteo (int8): el número del animalito (0..36) y 37 para "00"
+CODIGO_00 = 37
+NUM_CODIGOS = 38
+NUMERO_POR_CODIGO = [str(i) for i in range(37)] + ["00"]
+NOMBRE_POR_CODIGO = [ANIMALITOS[n] for n in NUMERO_POR_CODIGO]
+CODIGO_POR_NUMERO = {n: i for i, n in enumerate(NUMERO_POR_CODIGO)}
+CODIGO_POR_NOMBRE = {nombre: i for i, nombre in enumerate(NOMBRE_POR_CODIGO)}
+ETIQUETA_POR_CODIGO = [f"{n} - {nombre}" for n, nombre in zip(NUMERO_POR_CODIGO, NOMBRE_POR_CODIGO)]
+NUMERO_POR_NOMBRE = {nombre: n for n, nombre in ANIMALITOS.items()}
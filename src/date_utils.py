@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 from datetime import date, datetime
+from functools import lru_cache
 from typing import Union
 
+import pytz
+
+from .config import ZONA_HORARIA
+
 DateLike = Union[date, datetime]
 
 
@@ -35,3 +40,25 @@ def clamp_date(value: DateLike, min_value: DateLike, max_value: DateLike) -> dat
     if v > mx:
         return mx
     return v
+
+
+def ahora_local() -> datetime:
+    """Fecha y hora actuales (con zona) en la zona horaria de los sorteos."""
+    return datetime.now(pytz.timezone(ZONA_HORARIA))
+
+
+def hoy_local() -> str:
+    """'YYYY-MM-DD' de hoy en la zona de los sorteos, no en la del servidor."""
+    return ahora_local().strftime("%Y-%m-%d")
+
+
+@lru_cache(maxsize=None)
+def fecha_a_ordinal(fecha: str) -> int:
+    """'YYYY-MM-DD' -> ordinal del día (date.toordinal). Memoizado."""
+    return datetime.strptime(fecha, "%Y-%m-%d").toordinal()
+
+
+@lru_cache(maxsize=None)
+def ordinal_a_fecha(ordinal: int) -> str:
+    """Inverso de fecha_a_ordinal."""
+    return date.fromordinal(ordinal).strftime("%Y-%m-%d")
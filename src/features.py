@@ -6,6 +6,7 @@ from collections import Counter
 from datetime import datetime
 
 from src.historial_client import HistorialData
+from src.codigos import numero_de
 from src.constantes import ANIMALITOS, SECTORES, COLORES, DOCENAS, COLUMNAS
 from src.atrasos import AnalizadorAtrasos
 from src.model import MarkovModel
@@ -84,31 +85,18 @@ class FeatureEngineer:
         
         # Atrasos actuales
         atrasos_actuales = self.atrasos_analyzer.calcular_atrasos()
-        atrasos_dict = {a.animal: a.dias_sin_salir for a in atrasos_actuales} # Ojo: atrasos usa nombre animal, necesitamos numero
-        # Mapear nombre animal a numero
-        name_to_num = {v: k for k, v in ANIMALITOS.items()}
+        # Ojo: atrasos usa la etiqueta "24 - Iguana", necesitamos el numero
         atrasos_num = {}
         for a in atrasos_actuales:
-            if a.animal in name_to_num:
-                atrasos_num[name_to_num[a.animal]] = a.dias_sin_salir
+            num = numero_de(a.animal)
+            if num is not None:
+                atrasos_num[num] = a.dias_sin_salir
         
         # --- Preparar Patrones Activos del Día (HU-027) ---
         resultados_dia = []
         if self.historial.dias:
             # Usamos el último día registrado como "hoy" para el contexto de features
-            dia_actual = self.historial.dias[-1]
-            for hora in self.historial.horas:
-                key = (dia_actual, hora)
-                if key in self.historial.tabla:
-                    val = self.historial.tabla[key]
-                    # Extraer número
-                    num = None
-                    for k, v in ANIMALITOS.items():
-                        if val.startswith(f"{k} ") or val == k or v in val:
-                            num = k
-                            break
-                    if num:
-                        resultados_dia.append((hora, num))
+            resultados_dia = self.historial.indice.del_dia(self.historial.dias[-1])
         
         # Actualizar estado del gestor
         self.gestor_patrones.procesar_dia(resultados_dia)
@@ -144,8 +132,7 @@ class FeatureEngineer:
                 # MarkovModel usa nombres de animales, convertir
                 last_animal = ANIMALITOS.get(last_num)
                 curr_animal = ANIMALITOS.get(num_str)
-                # El método correcto en MarkovModel es next_probs(actual)
-                prob = self.markov_model.next_probs(last_animal).get(curr_animal, 0.0)
+                prob = self.markov_model.prob(last_animal, curr_animal)
                 f['prob_markov'] = prob
             else:
                 f['prob_markov'] = 0.0
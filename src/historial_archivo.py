@@ -0,0 +1,404 @@
+from __future__ import annotations
+
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+import numpy as np
+
+from .config import ARCHIVO_DIR, ARCHIVO_DELTA_MAX
+from .constantes import CODIGO_POR_NOMBRE, NUM_CODIGOS
+from .date_utils import fecha_a_ordinal, hoy_local, ordinal_a_fecha
+from .historial_client import HistorialData, normalize_str
+from .historial_mmap import HistorialMapeado
+from .horas import hora_de, slot_de
+
+if TYPE_CHECKING:
+    from .historial_client import HistorialClient
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:  # Windows
+    import msvcrt
+    HAS_FCNTL = False
+
+logger = logging.getLogger(__name__)
+
+
+def _bloquear(f) -> None:
+    if HAS_FCNTL:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _desbloquear(f) -> None:
+    if HAS_FCNTL:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _slug(loteria: str) -> str:
+    """'Guácharo Activo' -> 'guacharo_activo'"""
+    return re.sub(r"[^a-z0-9]+", "_", normalize_str(loteria).lower()).strip("_")
+
+
+class HistorialArchivo:
+    """
+    Archivo local y persistente del historial de una lotería.
+
+    Se guarda en formato columnar comprimido (.npz):
+    - fecha: int32 (ordinal del día)
+    - hora:  int16 (índice en el vocabulario `horas`)
+    - animal: int16 (índice en el vocabulario `animales`)
+
+    Normalmente el archivo solo crece por los extremos, pero un lote suelto
+    (p.ej. los resultados en vivo de hoy) puede dejar un hueco: `faltantes`
+    busca también los días sin sorteos dentro del rango archivado, y
+    `append_en_vivo` sincroniza antes de agregar para no abrirlo.
+
+    `append` no reescribe el .npz: agrega las filas del lote a un registro
+    de cambios (`<slug>.delta`, texto "fecha\thora\tanimal" por línea, gana
+    la última) que se aplica al leer. Cuando el registro supera
+    ARCHIVO_DELTA_MAX filas se compacta en el .npz.
+
+    La copia mapeable (`<slug>.grid`, ver `HistorialMapeado`) que otros
+    procesos abren en solo lectura con `mapeado()` se actualiza en sitio
+    para los días tocados; solo se reescribe entera al compactar o cuando
+    el lote no cabe en la rejilla (p.ej. un día nuevo).
+
+    Varios procesos (la UI y el poller) escriben el mismo archivo: la
+    lectura, fusión y escritura ocurren bajo un bloqueo del sistema operativo
+    (`<slug>.lock`), y la copia en memoria se descarta sola si otro proceso
+    cambió los archivos.
+    """
+
+    def __init__(self, loteria: str, directorio: str = ARCHIVO_DIR) -> None:
+        self.loteria = loteria
+        self.ruta = Path(directorio) / f"{_slug(loteria)}.npz"
+        self.ruta_delta = self.ruta.with_suffix(".delta")
+        self.ruta_mapeada = self.ruta.with_suffix(".grid")
+        self.ruta_bloqueo = self.ruta.with_suffix(".lock")
+        self._data: Optional[HistorialData] = None
+        self._firma: Optional[tuple] = None
+        self._filas_delta = 0
+        self._mapeado: Optional[HistorialMapeado] = None
+        self._lock = threading.RLock()
+        self._bloqueos = 0
+
+    @contextmanager
+    def _bloqueo(self):
+        """Bloqueo exclusivo entre hilos y procesos; reentrante dentro del mismo objeto."""
+        with self._lock:
+            if self._bloqueos:
+                self._bloqueos += 1
+                try:
+                    yield
+                finally:
+                    self._bloqueos -= 1
+                return
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.ruta_bloqueo, "a+b") as f:
+                _bloquear(f)
+                self._bloqueos = 1
+                try:
+                    yield
+                finally:
+                    self._bloqueos = 0
+                    _desbloquear(f)
+
+    # --- Lectura ---
+
+    def load(self) -> HistorialData:
+        """
+        Devuelve todo el historial archivado (vacío si aún no existe). Si otro
+        proceso cambió los archivos desde la última lectura se vuelve a disco.
+        El objeto devuelto no cambia después: `append` publica uno nuevo.
+        """
+        with self._lock:
+            return self._vigente()
+
+    def invalidar(self) -> None:
+        """Descarta la copia en memoria; la próxima lectura vuelve a disco."""
+        with self._lock:
+            self._data = None
+
+    def _firma_disco(self) -> tuple:
+        firma = []
+        for ruta in (self.ruta, self.ruta_delta):
+            try:
+                st = os.stat(ruta)
+                firma.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except OSError:
+                firma.append(None)
+        return tuple(firma)
+
+    def _vigente(self) -> HistorialData:
+        """Copia en memoria, releída si los archivos cambiaron (llamar con `_lock`)."""
+        if self._data is not None and self._firma_disco() == self._firma:
+            return self._data
+        if not self.ruta.exists() and not self.ruta_delta.exists():
+            self._data, self._firma, self._filas_delta = HistorialData(dias=[], horas=[], tabla={}), self._firma_disco(), 0
+            return self._data
+        with self._bloqueo():
+            self._data = self._leer_disco()
+            self._firma = self._firma_disco()
+        return self._data
+
+    def _leer_disco(self) -> HistorialData:
+        data = self._leer_base()
+        self._filas_delta = 0
+        if self.ruta_delta.exists():
+            with open(self.ruta_delta, encoding="utf-8") as f:
+                filas = [tuple(linea.rstrip("\n").split("\t")) for linea in f if linea.count("\t") == 2]
+            self._filas_delta = len(filas)
+            data.ingestar([filas])
+        return data
+
+    def _leer_base(self) -> HistorialData:
+        if not self.ruta.exists():
+            return HistorialData(dias=[], horas=[], tabla={})
+
+        with np.load(self.ruta, allow_pickle=False) as npz:
+            fechas = npz["fecha"]
+            horas_idx = npz["hora"]
+            animales_idx = npz["animal"]
+            horas = [str(h) for h in npz["horas"]]
+            animales = [str(a) for a in npz["animales"]]
+
+        # Vocabularios del archivo -> slots del registro y códigos de sorteo
+        slot_por_hora = np.array([slot_de(h) for h in horas], dtype=np.int16)
+        extras = [a for a in animales if a not in CODIGO_POR_NOMBRE]
+        codigo_extra = {a: NUM_CODIGOS + i for i, a in enumerate(extras)}
+        codigo_por_animal = np.array(
+            [CODIGO_POR_NOMBRE.get(a, codigo_extra.get(a)) for a in animales], dtype=np.int16
+        )
+        dias = [ordinal_a_fecha(int(o)) for o in np.unique(fechas)]
+        return HistorialData.from_arrays(
+            dias, horas, fechas, slot_por_hora[horas_idx], codigo_por_animal[animales_idx], extras
+        )
+
+    def mapeado(self) -> Optional[HistorialMapeado]:
+        """
+        Almacén mapeado en memoria (solo lectura, compartido entre procesos),
+        reabierto si otro proceso lo reescribió. None si aún no existe.
+        """
+        if self._mapeado is None:
+            if not self.ruta_mapeada.exists():
+                return None
+            self._mapeado = HistorialMapeado(self.ruta_mapeada)
+        else:
+            self._mapeado.recargar()
+        return self._mapeado
+
+    @property
+    def total_sorteos(self) -> int:
+        return self.load().total_sorteos
+
+    def rango(self) -> Optional[Tuple[str, str]]:
+        """(primer_dia, ultimo_dia) archivados, o None si está vacío."""
+        data = self.load()
+        if not data.dias:
+            return None
+        return data.dias[0], data.dias[-1]
+
+    def ultimo(self) -> Optional[Tuple[str, str]]:
+        """Último (fecha, hora) archivado."""
+        data = self.load()
+        if data.total_sorteos == 0:
+            return None
+        # Las columnas están en orden cronológico: el último registro es el más reciente
+        return ordinal_a_fecha(int(data.dia_ordinal[-1])), hora_de(int(data.slot[-1]))
+
+    def leer(self, start_date: str, end_date: str) -> HistorialData:
+        """Subconjunto del archivo entre start_date y end_date (inclusive)."""
+        data = self.load()
+        mascara = (data.dia_ordinal >= fecha_a_ordinal(start_date)) & (data.dia_ordinal <= fecha_a_ordinal(end_date))
+        slots = data.slot[mascara]
+        horas_presentes = {hora_de(int(s)) for s in np.unique(slots)}
+        return HistorialData.from_arrays(
+            dias=[d for d in data.dias if start_date <= d <= end_date],
+            horas=[h for h in data.horas if h in horas_presentes],
+            dia_ordinal=data.dia_ordinal[mascara],
+            slot=slots,
+            codigos=data.codigos[mascara],
+            extras=data.extras,
+        )
+
+    def faltantes(self, start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """
+        Tramos que hay que descargar para cubrir [start_date, end_date]: lo
+        anterior al primer día archivado, los huecos (días sin ningún sorteo)
+        y desde el último día, que se vuelve a pedir porque pudo quedar
+        incompleto.
+        """
+        data = self.load()
+        if not data.dias:
+            return [(start_date, end_date)]
+
+        primero, ultimo = data.dias[0], data.dias[-1]
+        tramos = []
+        if start_date < primero:
+            dia_previo = datetime.strptime(primero, "%Y-%m-%d").date() - timedelta(days=1)
+            tramos.append((start_date, dia_previo.strftime("%Y-%m-%d")))
+
+        desde = fecha_a_ordinal(max(start_date, primero))
+        hasta = fecha_a_ordinal(min(end_date, ultimo))
+        if desde < hasta:
+            ordinales = data.dia_ordinal
+            presentes = ordinales[(ordinales >= desde) & (ordinales <= hasta)]
+            huecos = np.setdiff1d(np.arange(desde, hasta + 1), presentes)
+            if len(huecos):
+                # Días consecutivos sin sorteos forman un solo tramo
+                for tramo in np.split(huecos, np.flatnonzero(np.diff(huecos) != 1) + 1):
+                    tramos.append((ordinal_a_fecha(int(tramo[0])), ordinal_a_fecha(int(tramo[-1]))))
+
+        if end_date >= ultimo:
+            tramos.append((ultimo, end_date))
+        return tramos
+
+    # --- Escritura ---
+
+    def append(self, nuevo: HistorialData) -> int:
+        """
+        Fusiona `nuevo` en el archivo y lo persiste (solo las filas del lote,
+        ver la clase). Retorna los registros nuevos.
+        """
+        if nuevo.total_sorteos == 0:
+            return 0
+        with self._bloqueo():
+            # Se fusiona en una copia y se publica con una sola asignación: quien
+            # ya tiene la copia vigente (p.ej. `leer` en otro hilo) no la ve cambiar.
+            data = self._vigente().copia()
+            resultado = data.ingestar([nuevo])
+            if resultado.insertados or resultado.actualizados:
+                if not self.ruta.exists() or self._filas_delta + nuevo.total_sorteos > ARCHIVO_DELTA_MAX:
+                    self._compactar(data)
+                else:
+                    self._registrar(data, nuevo)
+        return resultado.insertados
+
+    def append_en_vivo(self, nuevo: HistorialData, client: HistorialClient) -> int:
+        """
+        Agrega sorteos recientes (en vivo o el historial de hoy). Si el archivo
+        no llega hasta ayer, antes se sincroniza desde su último día con
+        `client`: así el lote no queda detrás de un hueco. Retorna los
+        registros nuevos, incluidos los de la sincronización.
+        """
+        rango = self.rango()
+        nuevos = 0
+        if rango is not None:
+            ayer = ordinal_a_fecha(fecha_a_ordinal(hoy_local()) - 1)
+            if rango[1] < ayer:
+                nuevos += self.sync(client)
+        return nuevos + self.append(nuevo)
+
+    def _registrar(self, data: HistorialData, nuevo: HistorialData) -> None:
+        """Agrega el lote al registro de cambios y a la copia mapeada (llamar con `_bloqueo`)."""
+        indice = nuevo.indice
+        with open(self.ruta_delta, "a", encoding="utf-8") as f:
+            f.writelines(f"{fecha}\t{hora}\t{valor}\n" for (fecha, hora), valor in zip(indice.claves, indice.valores))
+            f.flush()
+            os.fsync(f.fileno())
+        self._filas_delta += nuevo.total_sorteos
+        if not HistorialMapeado.actualizar_dias(self.ruta_mapeada, data, nuevo.dia_ordinal):
+            HistorialMapeado.escribir(self.ruta_mapeada, data)
+        self._data = data
+        self._firma = self._firma_disco()
+
+    def save(self, data: HistorialData) -> None:
+        """Escribe el historial completo de forma atómica (compacta el registro de cambios)."""
+        with self._bloqueo():
+            self._compactar(data)
+
+    def _compactar(self, data: HistorialData) -> None:
+        horas = list(data.horas)
+        slots_presentes = [int(x) for x in np.unique(data.slot)]
+        horas += [hora_de(x) for x in slots_presentes if hora_de(x) not in set(horas)]
+        idx_por_slot = np.zeros(max(slots_presentes, default=0) + 1, dtype=np.int16)
+        for i, h in enumerate(horas):
+            if slot_de(h) < len(idx_por_slot):
+                idx_por_slot[slot_de(h)] = i
+
+        codigos_presentes = [int(c) for c in np.unique(data.codigos)]
+        animales = sorted({data.valor_de_codigo(c) for c in codigos_presentes})
+        animales_pos = {a: i for i, a in enumerate(animales)}
+        idx_por_codigo = np.zeros(max(codigos_presentes, default=0) + 1, dtype=np.int16)
+        for c in codigos_presentes:
+            idx_por_codigo[c] = animales_pos[data.valor_de_codigo(c)]
+
+        fechas = data.dia_ordinal
+        horas_idx = idx_por_slot[data.slot]
+        animales_idx = idx_por_codigo[data.codigos]
+
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            fecha=fechas,
+            hora=horas_idx,
+            animal=animales_idx,
+            horas=np.array(horas, dtype=str),
+            animales=np.array(animales, dtype=str),
+        )
+
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.ruta.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(buffer.getvalue())
+            os.replace(tmp, self.ruta)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+        try:
+            os.unlink(self.ruta_delta)
+        except FileNotFoundError:
+            pass
+        self._filas_delta = 0
+
+        HistorialMapeado.escribir(self.ruta_mapeada, data)
+        self._data = data
+        self._firma = self._firma_disco()
+
+    def sync(
+        self,
+        client: HistorialClient,
+        hasta: Optional[str] = None,
+        desde_inicial: Optional[str] = None,
+    ) -> int:
+        """
+        Sincronización incremental: descarga solo desde el último día archivado
+        hasta `hasta` (hoy por defecto) y lo agrega. Si el archivo está vacío se
+        parte de `desde_inicial`. Retorna la cantidad de sorteos nuevos.
+        """
+        hasta = hasta or hoy_local()
+        rango = self.rango()
+        if rango is not None:
+            desde = rango[1]
+        elif desde_inicial is not None:
+            desde = desde_inicial
+        else:
+            raise ValueError("El archivo está vacío: indique desde_inicial para la primera sincronización.")
+
+        if desde > hasta:
+            return 0
+
+        antes = self.total_sorteos
+        logger.info("Sincronizando archivo %s: %s -> %s", self.loteria, desde, hasta)
+        self.append(client.fetch_historial(desde, hasta, concurrent=True))
+        return self.total_sorteos - antes
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .config import CACHE_DIR, CACHE_GRACIA_DIAS, CACHE_TTL_SEMANA_ACTUAL, CACHE_MAX_BYTES
+from .date_utils import fecha_a_ordinal, hoy_local, ordinal_a_fecha
+
+logger = logging.getLogger(__name__)
+
+# Página parseada: (page_dias, page_horas, [(dia, hora, animal), ...])
+Pagina = Tuple[List[str], List[str], List[Tuple[str, str, str]]]
+
+
+class HistorialCache:
+    """
+    Caché en disco de páginas ya parseadas del historial.
+
+    La clave es (URL de la lotería, ventana semanal). Las semanas cerradas
+    (guardadas cuando ya habían pasado `gracia_dias` días completos desde su
+    último día) no vencen nunca; la semana en curso, y la recién terminada
+    mientras el sitio puede seguir publicando sus últimos sorteos, vencen a
+    los `ttl_actual` segundos. Cada entrada es un
+    JSON escrito de forma atómica y el directorio se recorta por tamaño
+    eliminando primero las entradas usadas hace más tiempo.
+    """
+
+    def __init__(
+        self,
+        directorio: str = CACHE_DIR,
+        ttl_actual: float = CACHE_TTL_SEMANA_ACTUAL,
+        max_bytes: int = CACHE_MAX_BYTES,
+        gracia_dias: int = CACHE_GRACIA_DIAS,
+    ) -> None:
+        self.directorio = Path(directorio)
+        self.ttl_actual = ttl_actual
+        self.max_bytes = max_bytes
+        self.gracia_dias = gracia_dias
+        self._lock = threading.Lock()
+
+    def _ruta(self, base_url: str, desde: str, hasta: str) -> Path:
+        clave = f"{base_url}|{desde}|{hasta}".encode("utf-8")
+        return self.directorio / f"{hashlib.sha1(clave).hexdigest()}.json"
+
+    def get(self, base_url: str, desde: str, hasta: str) -> Optional[List[Pagina]]:
+        """Devuelve las páginas guardadas para la ventana, o None si no hay o venció."""
+        ruta = self._ruta(base_url, desde, hasta)
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Entrada de caché ilegible %s: %s", ruta.name, e)
+            return None
+
+        if not payload.get("cerrada") and time.time() - payload.get("guardado", 0) > self.ttl_actual:
+            return None
+
+        try:
+            # Marca de uso para la política de desalojo (LRU por mtime)
+            os.utime(ruta, None)
+        except OSError:
+            pass
+
+        return [
+            (list(dias), list(horas), [tuple(c) for c in celdas])
+            for dias, horas, celdas in payload["paginas"]
+        ]
+
+    def put(self, base_url: str, desde: str, hasta: str, paginas: List[Pagina]) -> None:
+        """Guarda las páginas de la ventana de forma atómica (archivo temporal + rename)."""
+        # Cerrada = terminó hace más de `gracia_dias` días en Caracas: un lunes
+        # temprano el historial aún puede no traer los últimos sorteos del
+        # domingo, y la semana no se volvería a pedir nunca
+        limite = ordinal_a_fecha(fecha_a_ordinal(hoy_local()) - self.gracia_dias)
+        cerrada = hasta < limite
+        payload = {
+            "url": base_url,
+            "desde": desde,
+            "hasta": hasta,
+            "cerrada": cerrada,
+            "guardado": time.time(),
+            "paginas": [[dias, horas, celdas] for dias, horas, celdas in paginas],
+        }
+
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        ruta = self._ruta(base_url, desde, hasta)
+        fd, tmp = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp, ruta)
+        except OSError as e:
+            logger.warning("No se pudo escribir la caché %s: %s", ruta.name, e)
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return
+
+        self._recortar()
+
+    def _recortar(self) -> None:
+        """Elimina las entradas menos usadas hasta quedar por debajo de max_bytes."""
+        with self._lock:
+            entradas = []
+            total = 0
+            for ruta in self.directorio.glob("*.json"):
+                try:
+                    st = ruta.stat()
+                except OSError:
+                    continue
+                entradas.append((st.st_mtime, st.st_size, ruta))
+                total += st.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            entradas.sort()
+            for _, size, ruta in entradas:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    ruta.unlink()
+                    total -= size
+                except OSError:
+                    pass
+
+    def clear(self) -> None:
+        """Vacía la caché."""
+        with self._lock:
+            for ruta in self.directorio.glob("*.json"):
+                try:
+                    ruta.unlink()
+                except OSError:
+                    pass
@@ -1,181 +1,897 @@
 from __future__ import annotations
 
+import bisect
 import logging
+from collections.abc import ItemsView, Mapping, Sequence, ValuesView
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from types import MappingProxyType
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
-import time
 
+import numpy as np
 import requests
-from bs4 import BeautifulSoup
-import unicodedata
 
-from .config import BASE_URL, USER_AGENT, TIMEOUT
+from .config import BASE_URL, TIMEOUT, FETCH_MAX_WORKERS
+from .codigos import decodificar
+from .constantes import CODIGO_POR_NOMBRE, NOMBRE_POR_CODIGO, NUMERO_POR_CODIGO, NUM_CODIGOS
+from .date_utils import ahora_local, fecha_a_ordinal, hoy_local, ordinal_a_fecha
 from .exceptions import ConnectionError, ScrapingError
-from .constantes import ANIMALITOS
+from .horas import clave_hora, ordenar_horas, slot_de, tabla_horas, tabla_minutos
+from .historial_cache import HistorialCache, Pagina
+from .http_transport import HttpTransport, get_transport
+from .historial_parser import (  # noqa: F401 (normalize_str y NORMALIZED_MAP se re-exportan)
+    get_parser,
+    normalize_str,
+    normalizar_animal,
+    NORMALIZED_MAP,
+    parse_resultados_envivo,
+)
+
+if TYPE_CHECKING:
+    from .historial_archivo import HistorialArchivo
 
 logger = logging.getLogger(__name__)
 
-def normalize_str(s: str) -> str:
-    """Elimina tildes y pasa a mayúsculas para comparación."""
-    return ''.join(c for c in unicodedata.normalize('NFD', s)
-                   if unicodedata.category(c) != 'Mn').upper()
+# Fila cruda de un lote: (fecha, hora, valor)
+Fila = Tuple[str, str, str]
+
+
+def _clave_cronologica(ordinales: np.ndarray, slots: np.ndarray) -> np.ndarray:
+    """Clave int64 que ordena igual que (día, minuto, slot): sirve para searchsorted."""
+    minutos = tabla_minutos()[slots].astype(np.int64)
+    return (ordinales.astype(np.int64) << 32) | (minutos << 16) | slots.astype(np.int64)
+
+
+class _Prefijo(Sequence):
+    """Primeros `n` elementos de una lista, sin copiarla."""
+
+    __slots__ = ("_base", "_n")
+
+    def __init__(self, base: Sequence, n: int) -> None:
+        self._base = base
+        self._n = n
 
-# Crear mapa de normalización al cargar el módulo
-# "CIEMPIES" -> "Ciempiés", "DELFIN" -> "Delfín"
-NORMALIZED_MAP = {}
-for nombre_oficial in ANIMALITOS.values():
-    key = normalize_str(nombre_oficial)
-    NORMALIZED_MAP[key] = nombre_oficial
+    def __len__(self) -> int:
+        return self._n
 
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._base[slice(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        return self._base[i]
+
+    def __iter__(self):
+        return islice(self._base, self._n)
+
+    def __reversed__(self):
+        base = self._base
+        for i in range(self._n - 1, -1, -1):
+            yield base[i]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"_Prefijo({list(self)!r})"
 
 
 @dataclass
+class ResultadoMerge:
+    """Resumen de una fusión, por clave (fecha, hora) única del lote."""
+    insertados: int = 0
+    actualizados: int = 0  # correcciones: la clave existía con otro valor
+    sin_cambios: int = 0
+
+
+class IndiceCronologico:
+    """
+    Secuencia cronológica de sorteos de un HistorialData, decodificada una vez.
+
+    Todas las listas y arreglos son paralelos (posición i = i-ésimo sorteo):
+    - `claves`: (fecha, hora); `fechas`, `horas`, `valores`: sus componentes.
+    - `numeros`: número del animalito ("0".."36", "00") o None si el texto
+      no se pudo interpretar.
+    - `codigo_numero`: código canónico (`HistorialData.canonicos`).
+    - `minutos`: int16, minuto del día de la hora.
+    - `dia_ordinal`, `slot`: las columnas del historial (compartidas, no copias).
+
+    Es de solo lectura: `HistorialData.merge` lo extiende o lo descarta.
+    """
+
+    __slots__ = (
+        "claves", "fechas", "horas", "valores", "numeros",
+        "codigo_numero", "minutos", "dia_ordinal", "slot",
+    )
+
+    def __init__(self, data: HistorialData, previo: Optional[IndiceCronologico] = None) -> None:
+        desde = len(previo) if previo is not None else 0
+        valores_por_codigo = NOMBRE_POR_CODIGO + data.extras
+        # El canónico -1 (no interpretado) cae en el None del final
+        numero_por_canonico = NUMERO_POR_CODIGO + [None]
+        horas_slot = tabla_horas()
+
+        ordinales = data.dia_ordinal[desde:].tolist()
+        slots = data.slot[desde:].tolist()
+        codigos = data.codigos[desde:].tolist()
+        canonicos = data.canonicos[desde:].tolist()
+        fechas = [ordinal_a_fecha(o) for o in ordinales]
+        horas = [horas_slot[s] for s in slots]
+        claves = list(zip(fechas, horas))
+        valores = [valores_por_codigo[c] for c in codigos]
+        numeros = [numero_por_canonico[c] for c in canonicos]
+
+        if previo is not None:
+            fechas = previo.fechas + fechas
+            horas = previo.horas + horas
+            claves = previo.claves + claves
+            valores = previo.valores + valores
+            numeros = previo.numeros + numeros
+
+        self.claves: List[Tuple[str, str]] = claves
+        self.fechas: List[str] = fechas
+        self.horas: List[str] = horas
+        self.valores: List[str] = valores
+        self.numeros: List[Optional[str]] = numeros
+        self.codigo_numero = data.canonicos
+        self.minutos = tabla_minutos()[data.slot] if len(data.slot) else np.empty(0, dtype=np.int16)
+        self.dia_ordinal = data.dia_ordinal
+        self.slot = data.slot
+
+    @classmethod
+    def prefijo(cls, indice: IndiceCronologico, n: int) -> IndiceCronologico:
+        """Los primeros `n` sorteos de `indice`, compartiendo sus listas y arreglos."""
+        vista = cls.__new__(cls)
+        for nombre in ("claves", "fechas", "horas", "valores", "numeros"):
+            setattr(vista, nombre, _Prefijo(getattr(indice, nombre), n))
+        for nombre in ("codigo_numero", "minutos", "dia_ordinal", "slot"):
+            setattr(vista, nombre, getattr(indice, nombre)[:n])
+        return vista
+
+    def __len__(self) -> int:
+        return len(self.claves)
+
+    def rango_dia(self, fecha: str) -> Tuple[int, int]:
+        """Posiciones [inicio, fin) de los sorteos del día."""
+        o = fecha_a_ordinal(fecha)
+        return (
+            int(np.searchsorted(self.dia_ordinal, o, side="left")),
+            int(np.searchsorted(self.dia_ordinal, o, side="right")),
+        )
+
+    def del_dia(self, fecha: str) -> List[Tuple[str, str]]:
+        """[(hora, numero)] del día en orden cronológico (solo números interpretados)."""
+        i, j = self.rango_dia(fecha)
+        return [(h, n) for h, n in zip(self.horas[i:j], self.numeros[i:j]) if n is not None]
+
+    def dataframe(self):
+        """DataFrame fecha/hora/numero de los sorteos con número interpretado."""
+        import pandas as pd
+
+        validos = [i for i, n in enumerate(self.numeros) if n is not None]
+        return pd.DataFrame({
+            "fecha": [self.fechas[i] for i in validos],
+            "hora": [self.horas[i] for i in validos],
+            "numero": [self.numeros[i] for i in validos],
+        }, columns=["fecha", "hora", "numero"])
+
+
 class HistorialData:
-    dias: List[str]
-    horas: List[str]
-    tabla: Dict[Tuple[str, str], str]  # (fecha, hora) -> animal
+    """
+    Historial de sorteos en representación columnar compacta.
+
+    El núcleo son tres arreglos NumPy paralelos, en orden cronológico
+    (día, minuto de la hora):
+    - `codigos`: int8, código del animalito (0..36 y 37 para "00"); valores
+      que no son un nombre oficial se guardan aparte y usan códigos >= 38.
+      `canonicos` es la misma columna ya decodificada a 0..37 (-1 si el
+      texto no se reconoce): cada valor distinto se interpreta una sola vez,
+      al cargar.
+    - `dia_ordinal`: int32, ordinal del día (date.toordinal).
+    - `slot`: int16, franja horaria del registro de `src.horas`.
+
+    `dias` es el vocabulario de días tal como lo entrega el sitio; `horas`
+    se guarda en orden cronológico según el registro de franjas, sin
+    importar el orden en que se publicaron.
+    `tabla` ({(fecha, hora): animal}) es una vista de solo lectura que se
+    construye la primera vez que se pide; para modificar use `merge`.
+    `indice` es la secuencia cronológica decodificada que consumen los
+    analizadores; también se construye una sola vez.
+    """
+
+    __slots__ = ("dias", "horas", "_codigos", "_dia_ordinal", "_slot", "_extras", "_canonicos", "_clave", "_tabla", "_indice")
+
+    def __init__(self, dias: List[str], horas: List[str], tabla: Dict[Tuple[str, str], str]) -> None:
+        self.dias = dias
+        self.horas = ordenar_horas(horas)
+        self._cargar(tabla)
+
+    def _cargar(self, tabla: Dict[Tuple[str, str], str]) -> None:
+        n = len(tabla)
+        ordinales = np.empty(n, dtype=np.int32)
+        slots = np.empty(n, dtype=np.int16)
+        codigos = np.empty(n, dtype=np.int16)
+        extras: List[str] = []
+        extra_pos: Dict[str, int] = {}
+        for i, ((fecha, hora), valor) in enumerate(tabla.items()):
+            ordinales[i] = fecha_a_ordinal(fecha)
+            slots[i] = slot_de(hora)
+            codigo = CODIGO_POR_NOMBRE.get(valor)
+            if codigo is None:
+                if valor not in extra_pos:
+                    extra_pos[valor] = len(extras)
+                    extras.append(valor)
+                codigo = NUM_CODIGOS + extra_pos[valor]
+            codigos[i] = codigo
+
+        self._asignar(ordinales, slots, codigos, extras)
+
+    def _asignar(
+        self, ordinales: np.ndarray, slots: np.ndarray, codigos: np.ndarray, extras: List[str]
+    ) -> None:
+        """Ordena cronológicamente las columnas y las fija como estado (inmutable)."""
+        orden = np.lexsort((slots, tabla_minutos()[slots], ordinales))
+        self._fijar(ordinales[orden], slots[orden], codigos[orden], extras)
+
+    def _fijar(
+        self,
+        ordinales: np.ndarray,
+        slots: np.ndarray,
+        codigos: np.ndarray,
+        extras: List[str],
+        clave: Optional[np.ndarray] = None,
+    ) -> None:
+        """Fija como estado columnas que ya están en orden cronológico."""
+        dtype = np.int8 if NUM_CODIGOS + len(extras) <= np.iinfo(np.int8).max + 1 else np.int16
+        self._codigos = codigos.astype(dtype, copy=False)
+        self._dia_ordinal = ordinales.astype(np.int32, copy=False)
+        self._slot = slots.astype(np.int16, copy=False)
+        self._clave = clave
+        self._extras = list(extras)
+        canonico_por_codigo = np.array(
+            list(range(NUM_CODIGOS)) + [-1 if (c := decodificar(e)) is None else c for e in self._extras],
+            dtype=np.int8,
+        )
+        self._canonicos = canonico_por_codigo[self._codigos]
+        self._tabla: Optional[Dict[Tuple[str, str], str]] = None
+        self._indice: Optional[IndiceCronologico] = None
+        for arr in (self._codigos, self._dia_ordinal, self._slot, self._canonicos):
+            arr.flags.writeable = False
+
+    @classmethod
+    def from_arrays(
+        cls,
+        dias: List[str],
+        horas: List[str],
+        dia_ordinal: np.ndarray,
+        slot: np.ndarray,
+        codigos: np.ndarray,
+        extras: Optional[List[str]] = None,
+    ) -> HistorialData:
+        """Construye directamente desde columnas (sin pasar por el dict)."""
+        data = cls.__new__(cls)
+        data.dias = dias
+        data.horas = ordenar_horas(horas)
+        data._asignar(
+            np.asarray(dia_ordinal, dtype=np.int32),
+            np.asarray(slot, dtype=np.int16),
+            np.asarray(codigos, dtype=np.int16),
+            extras or [],
+        )
+        return data
+
+    # --- Arreglos ---
+
+    @property
+    def codigos(self) -> np.ndarray:
+        return self._codigos
+
+    @property
+    def dia_ordinal(self) -> np.ndarray:
+        return self._dia_ordinal
+
+    @property
+    def slot(self) -> np.ndarray:
+        return self._slot
+
+    @property
+    def canonicos(self) -> np.ndarray:
+        """Código canónico 0..37 de cada sorteo (-1 si el texto no se reconoce)."""
+        return self._canonicos
+
+    @property
+    def extras(self) -> List[str]:
+        """Valores no oficiales; el código NUM_CODIGOS + i corresponde a extras[i]."""
+        return self._extras
+
+    def valor_de_codigo(self, codigo: int) -> str:
+        """Texto del animalito para un código (nombre oficial o valor original)."""
+        if codigo < NUM_CODIGOS:
+            return NOMBRE_POR_CODIGO[codigo]
+        return self._extras[codigo - NUM_CODIGOS]
+
+    # --- Vistas ---
+
+    @property
+    def tabla(self) -> Mapping[Tuple[str, str], str]:
+        """{(fecha, hora): animal} en orden cronológico (vista de solo lectura)."""
+        if self._tabla is None:
+            horas_slot = tabla_horas()
+            valores = NOMBRE_POR_CODIGO + self._extras
+            self._tabla = {
+                (ordinal_a_fecha(o), horas_slot[s]): valores[c]
+                for o, s, c in zip(self._dia_ordinal.tolist(), self._slot.tolist(), self._codigos.tolist())
+            }
+        # El dict interno se actualiza en sitio al ingestar; fuera solo se expone la vista.
+        return MappingProxyType(self._tabla)
+
+    @property
+    def indice(self) -> IndiceCronologico:
+        """Índice cronológico (claves ordenadas, números decodificados, minuto del día)."""
+        if self._indice is None:
+            self._indice = IndiceCronologico(self)
+        return self._indice
 
     @property
     def total_sorteos(self) -> int:
-        return len(self.tabla)
+        return len(self._codigos)
 
     @property
     def dias_con_datos(self) -> int:
         return len(self.dias)
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, HistorialData):
+            return NotImplemented
+        return self.dias == other.dias and self.horas == other.horas and self.tabla == other.tabla
+
+    def __repr__(self) -> str:
+        return f"HistorialData(dias={len(self.dias)}, horas={len(self.horas)}, sorteos={self.total_sorteos})"
+
+    def copia(self) -> HistorialData:
+        """
+        Copia independiente para fusionarle datos sin afectar al original.
+        Las columnas y el índice son de solo lectura y se comparten.
+        """
+        data = HistorialData.__new__(HistorialData)
+        for nombre in HistorialData.__slots__:
+            setattr(data, nombre, getattr(self, nombre))
+        data.dias = list(self.dias)
+        data.horas = list(self.horas)
+        data._extras = list(self._extras)
+        data._tabla = dict(self._tabla) if self._tabla is not None else None
+        return data
+
+    def __reduce__(self):
+        # Los números de franja solo valen dentro de este proceso: se envían
+        # las etiquetas de hora y cada fila apunta a la suya.
+        usados, por_fila = np.unique(self._slot, return_inverse=True)
+        horas_slot = tabla_horas()
+        etiquetas = [horas_slot[s] for s in usados.tolist()]
+        return (
+            _restaurar_historial,
+            (self.dias, self.horas, etiquetas, por_fila.astype(np.int16), self._dia_ordinal, self._codigos, self._extras),
+        )
+
+    def _claves(self) -> np.ndarray:
+        """Clave cronológica de cada fila (se calcula la primera vez que se fusiona)."""
+        if self._clave is None:
+            self._clave = _clave_cronologica(self._dia_ordinal, self._slot)
+            self._clave.flags.writeable = False
+        return self._clave
+
     def merge(self, other: HistorialData) -> int:
         """
         Fusiona otro HistorialData en este.
         Retorna la cantidad de nuevos registros agregados a la tabla.
         """
-        nuevos = 0
-        
-        # Actualizar días
-        for d in other.dias:
-            if d not in self.dias:
-                self.dias.append(d)
-        self.dias.sort()
-        
-        # Actualizar horas
-        for h in other.horas:
-            if h not in self.horas:
-                self.horas.append(h)
-        
-        # Actualizar tabla
-        for key, value in other.tabla.items():
-            if key not in self.tabla:
-                self.tabla[key] = value
-                nuevos += 1
-            elif self.tabla[key] != value:
-                # Si el valor cambió (corrección), lo actualizamos
-                self.tabla[key] = value
-                # No contamos como nuevo registro, pero sí actualización
-        
-        return nuevos
+        return self.ingestar([other]).insertados
+
+    def ingestar(self, lotes: Iterable[Union[HistorialData, Iterable[Fila]]]) -> ResultadoMerge:
+        """
+        Fusiona de una vez varios lotes: HistorialData o filas (fecha, hora, valor).
+
+        Si una clave se repite entre lotes gana el último (como fusionarlos en
+        orden); las claves existentes con otro valor son correcciones. El costo
+        en Python es proporcional al tamaño de los lotes: las claves nuevas se
+        ubican por búsqueda binaria sobre las columnas ya ordenadas.
+        """
+        extras = list(self._extras)
+        extra_pos = {e: i for i, e in enumerate(extras)}
+        dias_conocidos = set(self.dias)
+        horas_conocidas = set(self.horas)
+        dias_nuevos = set()
+
+        def codigo_de(valor: str) -> int:
+            codigo = CODIGO_POR_NOMBRE.get(valor)
+            if codigo is None:
+                if valor not in extra_pos:
+                    extra_pos[valor] = len(extras)
+                    extras.append(valor)
+                codigo = NUM_CODIGOS + extra_pos[valor]
+            return codigo
+
+        def registrar(dias: Iterable[str], horas: Iterable[str]) -> None:
+            for d in dias:
+                if d not in dias_conocidos:
+                    dias_conocidos.add(d)
+                    dias_nuevos.add(d)
+            for h in horas:
+                if h not in horas_conocidas:
+                    horas_conocidas.add(h)
+                    bisect.insort(self.horas, h, key=clave_hora)
+
+        partes: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        for lote in lotes:
+            if isinstance(lote, (HistorialData, HistorialView)):
+                registrar(lote.dias, lote.horas)
+                # Los extras del lote se traducen a los de este historial
+                traduccion = np.arange(NUM_CODIGOS + len(lote.extras), dtype=np.int16)
+                for i, valor in enumerate(lote.extras):
+                    traduccion[NUM_CODIGOS + i] = codigo_de(valor)
+                partes.append((lote.dia_ordinal, lote.slot, traduccion[lote.codigos]))
+            else:
+                filas = list(lote)
+                registrar([f[0] for f in filas], [f[1] for f in filas])
+                partes.append((
+                    np.array([fecha_a_ordinal(f[0]) for f in filas], dtype=np.int32),
+                    np.array([slot_de(f[1]) for f in filas], dtype=np.int16),
+                    np.array([codigo_de(f[2]) for f in filas], dtype=np.int16),
+                ))
+
+        self._agregar_dias(dias_nuevos)
+        if not partes:
+            return ResultadoMerge()
+
+        ordinales = np.concatenate([p[0] for p in partes]).astype(np.int32, copy=False)
+        slots = np.concatenate([p[1] for p in partes]).astype(np.int16, copy=False)
+        codigos = np.concatenate([p[2] for p in partes]).astype(np.int16, copy=False)
+        if len(codigos) == 0:
+            return ResultadoMerge()
+
+        # Orden del lote y, por clave repetida, la última aparición
+        claves = _clave_cronologica(ordinales, slots)
+        orden = np.argsort(claves, kind="stable")
+        claves = claves[orden]
+        ultima = np.append(claves[1:] != claves[:-1], True)
+        sel = orden[ultima]
+        claves, ordinales, slots, codigos = claves[ultima], ordinales[sel], slots[sel], codigos[sel]
+
+        # Ubicar cada clave del lote en las columnas actuales
+        propias = self._claves()
+        n = len(propias)
+        pos = np.searchsorted(propias, claves)
+        existe = pos < n
+        existe[existe] = propias[pos[existe]] == claves[existe]
+        corregir = np.zeros(len(claves), dtype=bool)
+        corregir[existe] = self._codigos[pos[existe]].astype(np.int16) != codigos[existe]
+        insertar = ~existe
+
+        resultado = ResultadoMerge(
+            insertados=int(insertar.sum()),
+            actualizados=int(corregir.sum()),
+            sin_cambios=int(existe.sum() - corregir.sum()),
+        )
+        if not resultado.insertados and not resultado.actualizados:
+            return resultado
+
+        tabla, indice = self._tabla, self._indice
+        al_final = bool(np.all(pos[insertar] == n))
+
+        nuevos_codigos = self._codigos.astype(np.int16)
+        nuevos_codigos[pos[corregir]] = codigos[corregir]
+        donde = pos[insertar]
+        self._fijar(
+            np.insert(self._dia_ordinal, donde, ordinales[insertar]),
+            np.insert(self._slot, donde, slots[insertar]),
+            np.insert(nuevos_codigos, donde, codigos[insertar]),
+            extras,
+            clave=np.insert(propias, donde, claves[insertar]),
+        )
+        self._clave.flags.writeable = False
+
+        # Lo habitual (sorteos recientes) es agregar al final: las vistas ya
+        # construidas se actualizan en vez de reconstruirse
+        if al_final:
+            if tabla is not None:
+                horas_slot = tabla_horas()
+                valores = NOMBRE_POR_CODIGO + extras
+                for i in np.flatnonzero(corregir | insertar).tolist():
+                    tabla[(ordinal_a_fecha(int(ordinales[i])), horas_slot[slots[i]])] = valores[codigos[i]]
+                self._tabla = tabla
+            if indice is not None and not resultado.actualizados:
+                self._indice = IndiceCronologico(self, indice)
+        return resultado
+
+    def _agregar_dias(self, nuevos: Iterable[str]) -> None:
+        """Inserta días nuevos manteniendo `dias` ordenado."""
+        nuevos = sorted(nuevos)
+        if not nuevos:
+            return
+        if not self.dias or nuevos[0] > self.dias[-1]:
+            self.dias.extend(nuevos)
+        else:
+            for d in nuevos:
+                bisect.insort(self.dias, d)
+
+
+def _restaurar_historial(
+    dias: List[str],
+    horas: List[str],
+    etiquetas: List[str],
+    por_fila: np.ndarray,
+    ordinales: np.ndarray,
+    codigos: np.ndarray,
+    extras: List[str],
+) -> HistorialData:
+    """Reconstruye un HistorialData serializado, con las franjas de este proceso."""
+    slots = np.array([slot_de(h) for h in etiquetas], dtype=np.int16)[por_fila]
+    data = HistorialData.__new__(HistorialData)
+    data.dias = dias
+    data.horas = horas
+    data._fijar(ordinales, slots, codigos, extras)  # ya viene en orden cronológico
+    return data
+
+
+class _TablaPrefijo(Mapping):
+    """{(fecha, hora): animal} de los primeros `n` sorteos, respaldada por el historial padre."""
+
+    __slots__ = ("_data", "_indice", "_n")
+
+    def __init__(self, data: HistorialData, indice: IndiceCronologico, n: int) -> None:
+        self._data = data
+        self._indice = indice
+        self._n = n
+
+    def __getitem__(self, clave: Tuple[str, str]) -> str:
+        valor = self._data.tabla[clave]
+        pos = np.searchsorted(
+            self._data._claves(),
+            _clave_cronologica(np.array([fecha_a_ordinal(clave[0])]), np.array([slot_de(clave[1])]))[0],
+        )
+        if pos >= self._n:
+            raise KeyError(clave)
+        return valor
+
+    def __iter__(self):
+        return iter(self._indice.claves)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def values(self):
+        return _ValoresPrefijo(self)
+
+    def items(self):
+        return _ItemsPrefijo(self)
+
+
+class _ValoresPrefijo(ValuesView):
+    def __iter__(self):
+        return iter(self._mapping._indice.valores)
+
+
+class _ItemsPrefijo(ItemsView):
+    def __iter__(self):
+        indice = self._mapping._indice
+        return zip(indice.claves, indice.valores)
+
+
+class HistorialView:
+    """
+    Vista de solo lectura de los primeros `upto` sorteos (en orden
+    cronológico) de un HistorialData, sin copiar nada: columnas, índice y
+    `tabla` se apoyan en los del padre. Tiene la misma interfaz de lectura
+    que HistorialData, así que los analizadores (MarkovModel, Recomendador,
+    AnalizadorAtrasos...) la aceptan tal cual; sirve para simular "lo que se
+    sabía" en cada paso de un backtest.
+
+    `dias` son los días del padre hasta el del último sorteo visible; `horas`
+    es el vocabulario del padre.
+    """
+
+    __slots__ = ("_data", "_n", "_tabla", "_indice")
+
+    def __init__(self, data: HistorialData, upto: int) -> None:
+        self._data = data
+        self._n = max(0, min(upto, data.total_sorteos))
+        self._tabla: Optional[_TablaPrefijo] = None
+        self._indice: Optional[IndiceCronologico] = None
+
+    @property
+    def upto(self) -> int:
+        return self._n
+
+    @property
+    def dias(self) -> Sequence:
+        if self._n == 0:
+            return []
+        ultimo = ordinal_a_fecha(int(self._data.dia_ordinal[self._n - 1]))
+        return _Prefijo(self._data.dias, bisect.bisect_right(self._data.dias, ultimo))
+
+    @property
+    def horas(self) -> List[str]:
+        return self._data.horas
+
+    @property
+    def codigos(self) -> np.ndarray:
+        return self._data.codigos[:self._n]
+
+    @property
+    def dia_ordinal(self) -> np.ndarray:
+        return self._data.dia_ordinal[:self._n]
+
+    @property
+    def slot(self) -> np.ndarray:
+        return self._data.slot[:self._n]
+
+    @property
+    def canonicos(self) -> np.ndarray:
+        return self._data.canonicos[:self._n]
+
+    @property
+    def extras(self) -> List[str]:
+        return self._data.extras
+
+    def valor_de_codigo(self, codigo: int) -> str:
+        return self._data.valor_de_codigo(codigo)
+
+    @property
+    def indice(self) -> IndiceCronologico:
+        if self._indice is None:
+            self._indice = IndiceCronologico.prefijo(self._data.indice, self._n)
+        return self._indice
+
+    @property
+    def tabla(self) -> Mapping:
+        if self._tabla is None:
+            self._tabla = _TablaPrefijo(self._data, self.indice, self._n)
+        return self._tabla
+
+    @property
+    def total_sorteos(self) -> int:
+        return self._n
+
+    @property
+    def dias_con_datos(self) -> int:
+        return len(self.dias)
+
+    def __repr__(self) -> str:
+        return f"HistorialView(upto={self._n}, de={self._data!r})"
 
 
 class HistorialClient:
     """Cliente para extraer el historial de La Granjita desde lotoven.com."""
 
-    def __init__(self, base_url: str = BASE_URL) -> None:
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        cache: Optional[HistorialCache] = None,
+        archivo: Optional[HistorialArchivo] = None,
+        parser: Optional[str] = None,
+        transport: Optional[HttpTransport] = None,
+    ) -> None:
         self.base_url = base_url
+        # Sesión, reintentos y limitador compartidos por todos los clientes del proceso
+        self.transport = transport or get_transport()
+        self.cache = cache
+        self.archivo = archivo
+        # Backend de parseo del historial: "lxml" (rápido, por defecto si está instalado) o "bs4"
+        self.parse_pagina = get_parser(parser)
 
-    def fetch_historial(self, start_date: str, end_date: str) -> HistorialData:
+    def fetch_historial(
+        self,
+        start_date: str,
+        end_date: str,
+        concurrent: bool = False,
+        max_workers: int = FETCH_MAX_WORKERS,
+    ) -> HistorialData:
         """
         Descarga y parsea el historial entre start_date y end_date.
         Maneja la paginación semanal de Lotoven.
         Formato fechas: 'YYYY-MM-DD'.
+
+        Con concurrent=True se calculan de antemano las ventanas semanales del
+        rango y se descargan con un pool acotado de hilos. El ritmo lo marca el
+        limitador del transporte (FETCH_RATE_LIMIT). El resultado es idéntico
+        al del modo secuencial.
+
+        Si el cliente tiene caché, las semanas cerradas se leen de disco y
+        solo se descargan las que faltan o la semana en curso vencida.
+
+        Si el cliente tiene archivo local, se lee primero de él y solo se
+        descargan (y archivan) los tramos que le faltan.
         """
-        all_dias: List[str] = []
-        all_horas: List[str] = []
+        if self.archivo is not None:
+            for desde, hasta in self.archivo.faltantes(start_date, end_date):
+                self.archivo.append(self._fetch_remoto(desde, hasta, concurrent, max_workers))
+            return self.archivo.leer(start_date, end_date)
+        return self._fetch_remoto(start_date, end_date, concurrent, max_workers)
+
+    def _fetch_remoto(
+        self, start_date: str, end_date: str, concurrent: bool, max_workers: int
+    ) -> HistorialData:
+        """Descarga desde Lotoven (o la caché de semanas), sin pasar por el archivo."""
+        if self.cache is not None:
+            return self._fetch_con_cache(start_date, end_date, concurrent, max_workers)
+        if concurrent:
+            return self._fetch_concurrente(start_date, end_date, max_workers)
+
+        # Dicts como conjuntos ordenados: pertenencia O(1) y orden de llegada.
+        all_dias: Dict[str, None] = {}
+        all_horas: Dict[str, None] = {}
         all_tabla: Dict[Tuple[str, str], str] = {}
+
+        for page_dias, page_horas, celdas in self._paginar(start_date, end_date):
+            self._acumular(all_dias, all_horas, all_tabla, page_horas, celdas)
+
+        # Ordenar días
+        dias = sorted(all_dias)
         
+        return HistorialData(dias=dias, horas=list(all_horas), tabla=all_tabla)
+
+    def _fetch_concurrente(self, start_date: str, end_date: str, max_workers: int) -> HistorialData:
+        """Descarga las ventanas semanales en paralelo y las fusiona en orden cronológico."""
+        ventanas = self._ventanas_semanales(start_date, end_date)
+        if not ventanas:
+            return HistorialData(dias=[], horas=[], tabla={})
+
+        paginas_por_ventana = self._descargar_ventanas(ventanas, True, max_workers)
+
+        # Dicts como conjuntos ordenados: pertenencia O(1) y orden de llegada.
+        all_dias: Dict[str, None] = {}
+        all_horas: Dict[str, None] = {}
+        all_tabla: Dict[Tuple[str, str], str] = {}
+
+        ultima = len(ventanas) - 1
+        for idx, ((desde, hasta), paginas) in enumerate(zip(ventanas, paginas_por_ventana)):
+            for page_dias, page_horas, celdas in paginas:
+                # Recortar a la ventana para no duplicar días si el sitio devuelve de más.
+                # La primera y la última ventana conservan lo que el modo secuencial vería.
+                celdas = [
+                    c for c in celdas
+                    if (idx == 0 or c[0] >= desde) and (idx == ultima or c[0] <= hasta)
+                ]
+                self._acumular(all_dias, all_horas, all_tabla, page_horas, celdas)
+
+        dias = sorted(all_dias)
+
+        return HistorialData(dias=dias, horas=list(all_horas), tabla=all_tabla)
+
+    def _fetch_con_cache(
+        self, start_date: str, end_date: str, concurrent: bool, max_workers: int
+    ) -> HistorialData:
+        """
+        Resuelve el rango por semanas de calendario (lunes-domingo), que es la
+        unidad de la caché. Solo se descargan las semanas ausentes o vencidas;
+        el resultado se recorta a [start_date, end_date].
+        """
+        ventanas = self._semanas_calendario(start_date, end_date)
+        paginas_por_ventana: List[Optional[List[Pagina]]] = [
+            self.cache.get(self.base_url, desde, hasta) for desde, hasta in ventanas
+        ]
+
+        pendientes = [v for v, paginas in zip(ventanas, paginas_por_ventana) if paginas is None]
+        if pendientes:
+            logger.info("Caché historial: %d/%d semanas por descargar", len(pendientes), len(ventanas))
+            descargadas = dict(zip(pendientes, self._descargar_ventanas(pendientes, concurrent, max_workers)))
+            for idx, ventana in enumerate(ventanas):
+                if ventana in descargadas:
+                    paginas_por_ventana[idx] = descargadas[ventana]
+                    self.cache.put(self.base_url, ventana[0], ventana[1], descargadas[ventana])
+
+        # Dicts como conjuntos ordenados: pertenencia O(1) y orden de llegada.
+        all_dias: Dict[str, None] = {}
+        all_horas: Dict[str, None] = {}
+        all_tabla: Dict[Tuple[str, str], str] = {}
+
+        for paginas in paginas_por_ventana:
+            for page_dias, page_horas, celdas in paginas:
+                celdas = [c for c in celdas if start_date <= c[0] <= end_date]
+                self._acumular(all_dias, all_horas, all_tabla, page_horas, celdas)
+
+        dias = sorted(all_dias)
+
+        return HistorialData(dias=dias, horas=list(all_horas), tabla=all_tabla)
+
+    def _descargar_ventanas(
+        self, ventanas: List[Tuple[str, str]], concurrent: bool, max_workers: int
+    ) -> List[List[Pagina]]:
+        """Descarga cada ventana (paginando dentro de ella) y devuelve las páginas en el mismo orden."""
+        if not concurrent:
+            return [list(self._paginar(desde, hasta)) for desde, hasta in ventanas]
+
+        def descargar(ventana: Tuple[str, str]) -> List[Pagina]:
+            desde, hasta = ventana
+            return list(self._paginar(desde, hasta))
+
+        workers = max(1, min(max_workers, len(ventanas)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="historial") as pool:
+            # map conserva el orden de las ventanas aunque terminen desordenadas
+            return list(pool.map(descargar, ventanas))
+
+    @staticmethod
+    def _semanas_calendario(start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """
+        Semanas lunes-domingo que cubren [start_date, end_date].
+        La semana en curso se corta en hoy: los días futuros no tienen datos.
+        """
+        inicio = datetime.strptime(start_date, "%Y-%m-%d").date()
+        fin = datetime.strptime(end_date, "%Y-%m-%d").date()
+        hoy = ahora_local().date()
+        lunes = inicio - timedelta(days=inicio.weekday())
+        ventanas = []
+        while lunes <= fin:
+            hasta = min(lunes + timedelta(days=6), hoy)
+            if lunes > hasta:
+                break
+            ventanas.append((lunes.strftime("%Y-%m-%d"), hasta.strftime("%Y-%m-%d")))
+            lunes += timedelta(days=7)
+        return ventanas
+
+    @staticmethod
+    def _ventanas_semanales(start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """Divide [start_date, end_date] en ventanas de 7 días (la última puede ser menor)."""
+        inicio = datetime.strptime(start_date, "%Y-%m-%d").date()
+        fin = datetime.strptime(end_date, "%Y-%m-%d").date()
+        ventanas = []
+        while inicio <= fin:
+            hasta = min(inicio + timedelta(days=6), fin)
+            ventanas.append((inicio.strftime("%Y-%m-%d"), hasta.strftime("%Y-%m-%d")))
+            inicio = hasta + timedelta(days=1)
+        return ventanas
+
+    @staticmethod
+    def _acumular(
+        all_dias: Dict[str, None],
+        all_horas: Dict[str, None],
+        all_tabla: Dict[Tuple[str, str], str],
+        page_horas: List[str],
+        celdas: List[Tuple[str, str, str]],
+    ) -> None:
+        # setdefault conserva la primera aparición, igual que el antiguo "not in".
+        for hora in page_horas:
+            all_horas.setdefault(hora)
+        for dia, hora, nombre in celdas:
+            all_tabla[(dia, hora)] = nombre
+            all_dias.setdefault(dia)
+
+    def _paginar(self, start_date: str, end_date: str) -> Iterator[Pagina]:
+        """
+        Recorre las páginas semanales de Lotoven entre start_date y end_date.
+        Produce (page_dias, page_horas, celdas) por página, donde celdas son
+        tuplas (dia, hora, animal) ya normalizadas.
+        """
         current_start = start_date
         # Aumentamos el límite de iteraciones para permitir rangos largos (ej. 1 año = ~52 semanas)
         max_iterations = 150 
         iteration = 0
         
         while current_start <= end_date and iteration < max_iterations:
-            # Pausa para evitar bloqueo por rate-limiting
-            time.sleep(1.0)
-            
             iteration += 1
             url = self.base_url.format(start=current_start, end=end_date)
-            headers = {"User-Agent": USER_AGENT}
 
             logger.info("Descargando historial (iteración %d): %s", iteration, url)
             try:
-                resp = requests.get(url, headers=headers, timeout=TIMEOUT)
-                resp.raise_for_status()
+                # El transporte aplica el límite de tasa para evitar bloqueos
+                resp = self.transport.get(url, timeout=TIMEOUT)
             except requests.RequestException as e:
                 raise ConnectionError(f"Error al conectar con Lotoven: {e}") from e
 
             try:
-                soup = BeautifulSoup(resp.text, "html.parser")
-
-                # Buscar la tabla principal por el texto 'Horario'
-                table = soup.find("table")
-                if table is None:
-                    logger.warning("No se encontró tabla para fecha %s", current_start)
-                    break
-
-                header_row = table.find("tr")
-                if not header_row:
-                    logger.warning("Tabla sin filas para fecha %s", current_start)
+                pagina = self.parse_pagina(resp.text)
+                if pagina is None:
+                    logger.warning("Página sin tabla o sin días para fecha %s", current_start)
                     break
-                    
-                header_cells = header_row.find_all(["th", "td"])
-                headers_text = [c.get_text(strip=True) for c in header_cells]
-
-                if not headers_text or headers_text[0] != "Horario":
-                    # Si la estructura cambia, lanzamos error o intentamos seguir?
-                    # Mejor lanzar error para alertar
-                    raise ScrapingError("Formato de cabecera inesperado en la tabla.")
-
-                page_dias = headers_text[1:]
-                if not page_dias:
-                    break
-
-                # Procesar filas
-                for row in table.find_all("tr")[1:]:
-                    cols = row.find_all("td")
-                    if not cols:
-                        continue
+                page_dias, page_horas, celdas = pagina
 
-                    hora = cols[0].get_text(strip=True)
-                    if not hora:
-                        continue
-                    
-                    if hora not in all_horas:
-                        all_horas.append(hora)
-
-                    for i, dia in enumerate(page_dias, start=1):
-                        if i >= len(cols):
-                            continue
-                        animal_raw = cols[i].get_text(strip=True)
-                        if animal_raw:
-                            # Normalizar nombre
-                            # El scraper trae ej: "03 Ciempies" o solo "Ciempies"?
-                            # Según debug trae "Ciempies" (sin número) o con número?
-                            # El debug mostró: 'Ciempies', 'Delfin'. Parece que trae solo el nombre o nombre limpio.
-                            # Pero en app.py vi lógica de split().
-                            # Asumamos que puede venir sucio.
-                            
-                            # Intentar separar si viene con número "03 Ciempies"
-                            parts = animal_raw.split()
-                            if len(parts) > 1 and parts[0].isdigit():
-                                nombre_sucio = " ".join(parts[1:])
-                            else:
-                                nombre_sucio = animal_raw
-                                
-                            # Buscar en mapa normalizado
-                            key_sucio = normalize_str(nombre_sucio)
-                            nombre_oficial = NORMALIZED_MAP.get(key_sucio, animal_raw) # Fallback al original si no encuentra
-                            
-                            all_tabla[(dia, hora)] = nombre_oficial
-                            if dia not in all_dias:
-                                all_dias.append(dia)
+                yield page_dias, page_horas, celdas
                 
                 # Calcular siguiente fecha de inicio
                 last_fetched_date = page_dias[-1]
@@ -201,98 +917,25 @@ class HistorialClient:
         if iteration >= max_iterations:
             logger.warning("Se alcanzó el límite de iteraciones (%d). El historial puede estar incompleto.", max_iterations)
 
-        # Ordenar días
-        all_dias.sort()
-        
-        return HistorialData(dias=all_dias, horas=all_horas, tabla=all_tabla)
-
     def fetch_resultados_envivo(self, url: str) -> HistorialData:
         """
         Scrapea la página de resultados en vivo (ej. /resultados/) para obtener los datos del día actual.
         Útil cuando la página de historial tiene retraso.
         """
-        import re
-        import unicodedata
-        
-        def normalize(text):
-            return ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn').upper()
-        
-        headers = {"User-Agent": USER_AGENT}
         try:
-            resp = requests.get(url, headers=headers, timeout=TIMEOUT)
-            resp.raise_for_status()
+            resp = self.transport.get(url, timeout=TIMEOUT)
         except requests.RequestException as e:
             raise ConnectionError(f"Error al conectar con Resultados: {e}") from e
-            
-        soup = BeautifulSoup(resp.text, "html.parser")
-        
-        # Fecha de hoy
-        today_str = datetime.now().strftime("%Y-%m-%d")
-        
+
+        # Fecha de hoy en Caracas (la página no la trae)
+        today_str = hoy_local()
+
         all_tabla = {}
         all_horas = []
-        
-        # Regex para hora: 08:00 AM, 12:00 PM
-        # Acepta espacios opcionales: 08:00AM o 08:00 AM
-        time_pattern = re.compile(r"(\d{1,2}:\d{2}\s*[AP]M)")
-        
-        # Buscar todos los elementos que contienen texto de hora
-        candidates = soup.find_all(string=time_pattern)
-        
-        for text_node in candidates:
-            match = time_pattern.search(text_node)
-            if not match:
-                continue
-                
-            hora_str = match.group(1)
-            
-            # Normalizar hora
-            try:
-                # Eliminar espacios internos para parsear y luego re-formatear
-                clean_h = hora_str.replace(" ", "").upper()
-                # Insertar espacio antes de AM/PM si falta
-                if "AM" in clean_h: clean_h = clean_h.replace("AM", " AM")
-                if "PM" in clean_h: clean_h = clean_h.replace("PM", " PM")
-                
-                dt = datetime.strptime(clean_h, "%I:%M %p")
-                hora_fmt = dt.strftime("%I:%M %p")
-            except:
-                hora_fmt = hora_str # Fallback
-            
-            # Buscar el animalito en el contexto cercano (padre o abuelo)
-            container = text_node.parent
-            found_animal = None
-            
-            # Intentamos buscar en el contenedor (hasta 4 niveles arriba)
-            for _ in range(4):
-                if not container: break
-                
-                container_text = container.get_text(" ", strip=True).upper()
-                container_norm = normalize(container_text)
-                
-                # Buscar coincidencias con nuestros ANIMALITOS
-                for num, nombre in ANIMALITOS.items():
-                    # Buscamos "Num Nombre" (ej "7 PERICO")
-                    target = f"{num} {normalize(nombre)}"
-                    
-                    # Verificación robusta: que el target esté en el texto
-                    if target in container_norm:
-                        found_animal = nombre
-                        break
-                    
-                    # Fallback: Si el texto es solo "PERICO" (sin numero)
-                    # Pero esto es peligroso si hay texto descriptivo.
-                    # El screenshot muestra "7 Perico", así que la búsqueda con número debería funcionar.
-                    
-                if found_animal:
-                    break
-                
-                container = container.parent
-            
-            if found_animal:
-                if hora_fmt not in all_horas:
-                    all_horas.append(hora_fmt)
-                # Sobrescribir si ya existe (asumimos que el último encontrado es válido o son duplicados)
-                all_tabla[(today_str, hora_fmt)] = found_animal
-                
-        return HistorialData(dias=[today_str], horas=sorted(all_horas), tabla=all_tabla)
+        for hora_fmt, animal in parse_resultados_envivo(resp.text):
+            if hora_fmt not in all_horas:
+                all_horas.append(hora_fmt)
+            # Sobrescribir si ya existe (asumimos que el último encontrado es válido o son duplicados)
+            all_tabla[(today_str, hora_fmt)] = animal
+
+        return HistorialData(dias=[today_str], horas=all_horas, tabla=all_tabla)
@@ -0,0 +1,231 @@
+"""
+Almacén de historial en disco, mapeado en memoria (np.memmap).
+
+Pensado para historiales de varios años compartidos por varios procesos:
+cada uno abre el archivo en solo lectura y el sistema operativo comparte las
+páginas, sin copias por proceso. `HistorialArchivo` lo mantiene al día y los
+procesos de `Backtester.run_parallel` lo abren con `HistorialArchivo.mapeado()`.
+
+Formato (un único archivo, reemplazado de forma atómica al escribir):
+- 8 bytes: firma b"GRJHIST1"
+- 8 bytes: largo de la cabecera JSON (uint64 little-endian)
+- cabecera JSON: primer_ordinal, n_dias, horas, extras, dtype
+- relleno hasta múltiplo de 64
+- rejilla (n_dias x n_horas) de códigos int8 (int16 si hay muchos extras);
+  -1 = sin sorteo
+
+Cada sorteo es una celda de ancho fijo en (día - primer_ordinal, columna de
+la hora), así que la búsqueda por fecha y hora es O(1) y un rango de días es
+una vista de la rejilla. Las columnas van en orden cronológico, de modo que
+recorrer la rejilla por filas da los sorteos en orden.
+"""
+from __future__ import annotations
+
+import json
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .constantes import NOMBRE_POR_CODIGO, NUM_CODIGOS
+from .date_utils import fecha_a_ordinal, ordinal_a_fecha
+from .historial_client import HistorialData
+from .horas import hora_de, minutos_de, slot_de
+
+FIRMA = b"GRJHIST1"
+_ALINEACION = 64
+VACIO = -1
+
+
+class HistorialMapeado:
+    """Lector de solo lectura del almacén mapeado; ver el docstring del módulo."""
+
+    def __init__(self, ruta) -> None:
+        self.ruta = Path(ruta)
+        self._firma_archivo: Optional[Tuple[int, int]] = None
+        self._abrir()
+
+    # --- Apertura ---
+
+    def _abrir(self) -> None:
+        with open(self.ruta, "rb") as f:
+            firma = f.read(len(FIRMA))
+            if firma != FIRMA:
+                raise ValueError(f"{self.ruta} no es un historial mapeado")
+            (largo,) = struct.unpack("<Q", f.read(8))
+            cabecera = json.loads(f.read(largo).decode("utf-8"))
+            st = os.fstat(f.fileno())
+
+        offset = _alinear(len(FIRMA) + 8 + largo)
+        self._offset = offset
+        self.primer_ordinal: int = cabecera["primer_ordinal"]
+        self.n_dias: int = cabecera["n_dias"]
+        self.horas: List[str] = cabecera["horas"]
+        self.extras: List[str] = cabecera["extras"]
+        forma = (self.n_dias, len(self.horas))
+        if self.n_dias and self.horas:
+            self._rejilla = np.memmap(self.ruta, dtype=cabecera["dtype"], mode="r", offset=offset, shape=forma)
+        else:
+            self._rejilla = np.full(forma, VACIO, dtype=cabecera["dtype"])
+        self._columna: Dict[str, int] = {h: i for i, h in enumerate(self.horas)}
+        self._slot_por_columna = np.array([slot_de(h) for h in self.horas], dtype=np.int16)
+        self._firma_archivo = (st.st_ino, st.st_mtime_ns)
+
+    def recargar(self) -> bool:
+        """Reabre el archivo si otro proceso lo reemplazó. Retorna True si cambió."""
+        try:
+            st = os.stat(self.ruta)
+        except OSError:
+            return False
+        if (st.st_ino, st.st_mtime_ns) == self._firma_archivo:
+            return False
+        self._abrir()
+        return True
+
+    # --- Consultas ---
+
+    @property
+    def rejilla(self) -> np.ndarray:
+        """Rejilla completa (días x horas) de códigos, solo lectura."""
+        return self._rejilla
+
+    @property
+    def total_sorteos(self) -> int:
+        return int(np.count_nonzero(self._rejilla != VACIO))
+
+    def rango(self) -> Optional[Tuple[str, str]]:
+        """(primer_dia, ultimo_dia) del almacén, o None si está vacío."""
+        if self.n_dias == 0:
+            return None
+        return ordinal_a_fecha(self.primer_ordinal), ordinal_a_fecha(self.primer_ordinal + self.n_dias - 1)
+
+    def codigo(self, fecha: str, hora: str) -> int:
+        """Código del sorteo de (fecha, hora) en O(1); VACIO si no hay."""
+        fila = fecha_a_ordinal(fecha) - self.primer_ordinal
+        columna = self._columna.get(hora)
+        if columna is None or not 0 <= fila < self.n_dias:
+            return VACIO
+        return int(self._rejilla[fila, columna])
+
+    def valor(self, fecha: str, hora: str) -> Optional[str]:
+        """Animalito de (fecha, hora), o None si no hay sorteo."""
+        codigo = self.codigo(fecha, hora)
+        if codigo == VACIO:
+            return None
+        return NOMBRE_POR_CODIGO[codigo] if codigo < NUM_CODIGOS else self.extras[codigo - NUM_CODIGOS]
+
+    def dias(self, start_date: str, end_date: str) -> np.ndarray:
+        """Vista (sin copia) de las filas de [start_date, end_date] recortadas al almacén."""
+        desde = max(0, fecha_a_ordinal(start_date) - self.primer_ordinal)
+        hasta = min(self.n_dias, fecha_a_ordinal(end_date) - self.primer_ordinal + 1)
+        return self._rejilla[desde:max(desde, hasta)]
+
+    def leer(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> HistorialData:
+        """Materializa [start_date, end_date] (todo por defecto) como HistorialData."""
+        if self.n_dias == 0:
+            return HistorialData(dias=[], horas=[], tabla={})
+        inicio = ordinal_a_fecha(self.primer_ordinal)
+        start_date = start_date or inicio
+        end_date = end_date or ordinal_a_fecha(self.primer_ordinal + self.n_dias - 1)
+        desde = max(0, fecha_a_ordinal(start_date) - self.primer_ordinal)
+
+        sub = self.dias(start_date, end_date)
+        filas, columnas = np.nonzero(sub != VACIO)
+        ordinales = (self.primer_ordinal + desde + filas).astype(np.int32)
+        dias = [ordinal_a_fecha(int(o)) for o in np.unique(ordinales)]
+        horas = [self.horas[c] for c in np.unique(columnas)]
+        return HistorialData.from_arrays(
+            dias, horas, ordinales, self._slot_por_columna[columnas], sub[filas, columnas], list(self.extras)
+        )
+
+    # --- Escritura ---
+
+    @staticmethod
+    def actualizar_dias(ruta, data: HistorialData, ordinales) -> bool:
+        """
+        Reescribe en sitio solo las filas de los días `ordinales` (ordinales
+        de fecha) con lo que `data` tiene en ellos; los lectores ven el cambio
+        sin reabrir nada. Retorna False sin tocar el archivo si no cabe en la
+        rejilla actual (día fuera de rango, hora sin columna, otros valores no
+        oficiales o archivo inexistente): en ese caso hay que usar `escribir`.
+        """
+        ruta = Path(ruta)
+        ordinales = np.unique(np.asarray(ordinales, dtype=np.int64))
+        try:
+            mapa = HistorialMapeado(ruta)
+        except (OSError, ValueError):
+            return False
+        if len(ordinales) == 0:
+            return True
+        filas = ordinales - mapa.primer_ordinal
+        if mapa.n_dias == 0 or filas[0] < 0 or filas[-1] >= mapa.n_dias or mapa.extras != list(data.extras):
+            return False
+
+        desde = np.searchsorted(data.dia_ordinal, ordinales, side="left")
+        hasta = np.searchsorted(data.dia_ordinal, ordinales, side="right")
+        sel = np.concatenate([np.arange(a, b) for a, b in zip(desde, hasta)])
+        columnas = [mapa._columna.get(hora_de(s)) for s in data.slot[sel].tolist()]
+        if None in columnas:
+            return False
+
+        rejilla = np.memmap(ruta, dtype=mapa.rejilla.dtype, mode="r+", offset=mapa._offset, shape=mapa.rejilla.shape)
+        rejilla[filas] = VACIO
+        rejilla[data.dia_ordinal[sel] - mapa.primer_ordinal, np.array(columnas, dtype=np.intp)] = data.codigos[sel]
+        rejilla.flush()
+        del rejilla
+        os.utime(ruta)  # los lectores detectan el cambio por la fecha de modificación
+        return True
+
+    @staticmethod
+    def escribir(ruta, data: HistorialData) -> None:
+        """Escribe `data` completo en `ruta`, reemplazando el archivo de forma atómica."""
+        ruta = Path(ruta)
+        slots = [int(s) for s in np.unique(data.slot)]
+        slots.sort(key=lambda s: (minutos_de(s), s))
+        horas = [hora_de(s) for s in slots]
+        columna_por_slot = np.zeros(max(slots, default=0) + 1, dtype=np.int64)
+        for i, s in enumerate(slots):
+            columna_por_slot[s] = i
+
+        dtype = "int8" if NUM_CODIGOS + len(data.extras) <= np.iinfo(np.int8).max + 1 else "int16"
+        if data.total_sorteos:
+            primer = int(data.dia_ordinal[0])
+            n_dias = int(data.dia_ordinal[-1]) - primer + 1
+        else:
+            primer, n_dias = 0, 0
+        rejilla = np.full((n_dias, len(horas)), VACIO, dtype=dtype)
+        if data.total_sorteos:
+            rejilla[data.dia_ordinal - primer, columna_por_slot[data.slot]] = data.codigos
+
+        cabecera = json.dumps({
+            "primer_ordinal": primer,
+            "n_dias": n_dias,
+            "horas": horas,
+            "extras": list(data.extras),
+            "dtype": dtype,
+        }, ensure_ascii=False).encode("utf-8")
+        inicio = len(FIRMA) + 8 + len(cabecera)
+
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=ruta.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(FIRMA)
+                f.write(struct.pack("<Q", len(cabecera)))
+                f.write(cabecera)
+                f.write(b"\0" * (_alinear(inicio) - inicio))
+                f.write(rejilla.tobytes())
+            os.replace(tmp, ruta)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+
+def _alinear(n: int) -> int:
+    return -(-n // _ALINEACION) * _ALINEACION
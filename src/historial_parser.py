@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import bisect
+import logging
+import re
+import unicodedata
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+from .constantes import ANIMALITOS
+from .exceptions import ScrapingError
+from .historial_cache import Pagina
+
+# lxml es opcional: si no está instalado se usa BeautifulSoup
+try:
+    import lxml.html
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_str(s: str) -> str:
+    """Elimina tildes y pasa a mayúsculas para comparación."""
+    return ''.join(c for c in unicodedata.normalize('NFD', s)
+                   if unicodedata.category(c) != 'Mn').upper()
+
+# Crear mapa de normalización al cargar el módulo
+# "CIEMPIES" -> "Ciempiés", "DELFIN" -> "Delfín"
+NORMALIZED_MAP = {}
+for nombre_oficial in ANIMALITOS.values():
+    key = normalize_str(nombre_oficial)
+    NORMALIZED_MAP[key] = nombre_oficial
+
+
+def normalizar_animal(animal_raw: str) -> str:
+    """
+    Normaliza el texto de una celda al nombre oficial de ANIMALITOS.
+    El sitio puede traer "03 Ciempies" o solo "Ciempies"; si no se reconoce
+    se devuelve el texto original.
+    """
+    # Intentar separar si viene con número "03 Ciempies"
+    parts = animal_raw.split()
+    if len(parts) > 1 and parts[0].isdigit():
+        nombre_sucio = " ".join(parts[1:])
+    else:
+        nombre_sucio = animal_raw
+
+    # Buscar en mapa normalizado
+    key_sucio = normalize_str(nombre_sucio)
+    return NORMALIZED_MAP.get(key_sucio, animal_raw) # Fallback al original si no encuentra
+
+
+def _armar_pagina(headers_text: List[str], filas: List[Tuple[str, List[str]]]) -> Optional[Pagina]:
+    """
+    Lógica común a los backends: valida la cabecera y convierte las filas
+    (hora, [texto de cada celda de día]) en (page_dias, page_horas, celdas).
+    """
+    if not headers_text or headers_text[0] != "Horario":
+        # Si la estructura cambia, lanzamos error o intentamos seguir?
+        # Mejor lanzar error para alertar
+        raise ScrapingError("Formato de cabecera inesperado en la tabla.")
+
+    page_dias = headers_text[1:]
+    if not page_dias:
+        return None
+
+    page_horas: List[str] = []
+    celdas: List[Tuple[str, str, str]] = []
+    for hora, textos in filas:
+        page_horas.append(hora)
+        for dia, animal_raw in zip(page_dias, textos):
+            if animal_raw:
+                celdas.append((dia, hora, normalizar_animal(animal_raw)))
+
+    return page_dias, page_horas, celdas
+
+
+def parse_historial_bs4(html: str) -> Optional[Pagina]:
+    """
+    Backend de referencia con BeautifulSoup ('html.parser').
+    Retorna None si la página no trae tabla o días (fin de paginación).
+    """
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Buscar la tabla principal por el texto 'Horario'
+    table = soup.find("table")
+    if table is None:
+        return None
+
+    header_row = table.find("tr")
+    if not header_row:
+        return None
+
+    header_cells = header_row.find_all(["th", "td"])
+    headers_text = [c.get_text(strip=True) for c in header_cells]
+
+    filas: List[Tuple[str, List[str]]] = []
+    for row in table.find_all("tr")[1:]:
+        cols = row.find_all("td")
+        if not cols:
+            continue
+
+        hora = cols[0].get_text(strip=True)
+        if not hora:
+            continue
+
+        filas.append((hora, [c.get_text(strip=True) for c in cols[1:]]))
+
+    return _armar_pagina(headers_text, filas)
+
+
+def _texto_lxml(el) -> str:
+    # Equivalente a get_text(strip=True): cada fragmento recortado y unido sin separador
+    return "".join(t.strip() for t in el.itertext())
+
+
+def parse_historial_lxml(html: str) -> Optional[Pagina]:
+    """
+    Backend rápido con lxml: recorre las filas de la tabla una sola vez y
+    extrae el texto de cada celda sin construir el árbol de BeautifulSoup.
+    Produce exactamente lo mismo que parse_historial_bs4.
+    """
+    try:
+        root = lxml.html.fromstring(html)
+    except Exception:
+        # Documentos que lxml no acepta (vacíos, declaración de encoding, ...)
+        return parse_historial_bs4(html)
+
+    table = next(root.iter("table"), None)
+    if table is None:
+        return None
+
+    filas_tr = table.iter("tr")
+    header_row = next(filas_tr, None)
+    if header_row is None:
+        return None
+
+    headers_text = [_texto_lxml(c) for c in header_row.iter("th", "td")]
+
+    filas: List[Tuple[str, List[str]]] = []
+    for row in filas_tr:
+        cols = list(row.iter("td"))
+        if not cols:
+            continue
+
+        hora = _texto_lxml(cols[0])
+        if not hora:
+            continue
+
+        filas.append((hora, [_texto_lxml(c) for c in cols[1:]]))
+
+    return _armar_pagina(headers_text, filas)
+
+
+# --- Resultados en vivo ---
+
+# Regex para hora: 08:00 AM, 12:00 PM
+# Acepta espacios opcionales: 08:00AM o 08:00 AM
+TIME_PATTERN = re.compile(r"(\d{1,2}:\d{2}\s*[AP]M)")
+
+# Objetivos "Num Nombre" normalizados (ej "7 PERICO") -> (orden en ANIMALITOS, nombre oficial)
+_OBJETIVOS_ENVIVO: Dict[str, Tuple[int, str]] = {
+    f"{num} {normalize_str(nombre)}": (orden, nombre)
+    for orden, (num, nombre) in enumerate(ANIMALITOS.items())
+}
+
+# Una sola alternancia compilada al importar. Va dentro de un lookahead para
+# encontrar también coincidencias solapadas: en una misma posición solo puede
+# empezar un objetivo, así que finditer devuelve todas las apariciones.
+_ANIMAL_PATTERN = re.compile(
+    "(?=(" + "|".join(re.escape(t) for t in sorted(_OBJETIVOS_ENVIVO, key=len, reverse=True)) + "))"
+)
+
+
+def buscar_animal(texto_norm: str) -> Optional[str]:
+    """
+    Busca un "Num Nombre" de ANIMALITOS en un texto ya normalizado.
+    Si aparecen varios gana el primero en el orden de ANIMALITOS.
+    """
+    mejor: Optional[Tuple[int, str]] = None
+    for m in _ANIMAL_PATTERN.finditer(texto_norm):
+        candidato = _OBJETIVOS_ENVIVO[m.group(1)]
+        if mejor is None or candidato[0] < mejor[0]:
+            mejor = candidato
+            if mejor[0] == 0:
+                break
+    return mejor[1] if mejor else None
+
+
+def _normalizar_hora_envivo(hora_str: str) -> str:
+    try:
+        # Eliminar espacios internos para parsear y luego re-formatear
+        clean_h = hora_str.replace(" ", "").upper()
+        # Insertar espacio antes de AM/PM si falta
+        if "AM" in clean_h: clean_h = clean_h.replace("AM", " AM")
+        if "PM" in clean_h: clean_h = clean_h.replace("PM", " PM")
+
+        return datetime.strptime(clean_h, "%I:%M %p").strftime("%I:%M %p")
+    except ValueError:
+        return hora_str  # Fallback
+
+
+def parse_resultados_envivo(html: str) -> List[Tuple[str, str]]:
+    """
+    Extrae los pares (hora, animal) de la página de resultados en vivo.
+
+    Una sola pasada por el documento: se recorre cada nodo una vez armando
+    el texto normalizado de toda la página (como get_text(" ", strip=True))
+    y anotando el tramo de caracteres que ocupa cada elemento. Los animalitos
+    se buscan una sola vez sobre ese texto; a cada hora le toca el de su
+    contenedor más cercano que tenga uno (hasta 4 niveles hacia arriba),
+    con el mismo desempate que `buscar_animal`.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+
+    partes: List[str] = []
+    largo = 0  # largo de " ".join(partes)
+    tramos: Dict[int, Tuple[int, int]] = {}  # id(elemento) -> [inicio, fin) en el texto
+    horas: List[Tuple[str, List[int]]] = []  # (hora, ids de hasta 4 contenedores)
+
+    # Recorrido en profundidad con pila explícita: (elemento, hijos pendientes, inicio)
+    pila = [(soup, iter(soup.contents), 0)]
+    while pila:
+        elemento, hijos, desde = pila[-1]
+        hijo = next(hijos, None)
+        if hijo is None:
+            tramos[id(elemento)] = (desde, largo)
+            pila.pop()
+        elif isinstance(hijo, Tag):
+            pila.append((hijo, iter(hijo.contents), largo))
+        elif type(hijo) in (NavigableString, CData):
+            texto = hijo.strip()
+            if not texto:
+                continue
+            texto = normalize_str(texto)
+            largo += len(texto) + (1 if partes else 0)
+            partes.append(texto)
+            match = TIME_PATTERN.search(hijo)
+            if match:
+                contenedores = [id(e) for e, _, _ in reversed(pila[-4:])]
+                horas.append((_normalizar_hora_envivo(match.group(1)), contenedores))
+
+    texto = " ".join(partes)
+    # (inicio, fin, orden en ANIMALITOS, nombre) en orden de aparición
+    animales = [
+        (m.start(1), m.end(1)) + _OBJETIVOS_ENVIVO[m.group(1)]
+        for m in _ANIMAL_PATTERN.finditer(texto)
+    ]
+    inicios = [a[0] for a in animales]
+
+    resultados: List[Tuple[str, str]] = []
+    for hora_fmt, contenedores in horas:
+        for clave in contenedores:
+            desde, hasta = tramos[clave]
+            dentro = [
+                a for a in animales[bisect.bisect_left(inicios, desde):bisect.bisect_left(inicios, hasta)]
+                if a[1] <= hasta
+            ]
+            if dentro:
+                resultados.append((hora_fmt, min(dentro, key=lambda a: a[2])[3]))
+                break
+
+    return resultados
+
+
+PARSERS: Dict[str, Callable[[str], Optional[Pagina]]] = {
+    "bs4": parse_historial_bs4,
+}
+if HAS_LXML:
+    PARSERS["lxml"] = parse_historial_lxml
+
+DEFAULT_PARSER = "lxml" if HAS_LXML else "bs4"
+
+
+def get_parser(nombre: Optional[str] = None) -> Callable[[str], Optional[Pagina]]:
+    """
+    Devuelve el backend de parseo del historial. Sin nombre se usa lxml si
+    está disponible; si se pide lxml y no está instalado se cae a bs4.
+    """
+    nombre = nombre or DEFAULT_PARSER
+    if nombre not in PARSERS:
+        if nombre == "lxml":
+            logger.warning("lxml no está instalado; usando BeautifulSoup para el historial.")
+            return PARSERS["bs4"]
+        raise ValueError(f"Parser desconocido: {nombre}")
+    return PARSERS[nombre]
@@ -0,0 +1,102 @@
+"""
+Registro de franjas horarias (slots) de sorteo.
+
+Cada texto de hora ("08:00 AM") se registra una vez y recibe un índice
+estable en el proceso. Junto al índice se guarda el minuto del día, que es
+lo que se usa para ordenar cronológicamente sin volver a parsear: todo
+orden o aritmética de horas pasa por aquí (`clave_hora`, `ordenar_horas`,
+`minutos_de_hora`) en lugar de llamar a strptime por cada clave.
+
+La grilla de cada lotería (`horario_de`) es su lista de horas ya ordenada
+por el registro, así que no depende del orden en que el sitio las publica.
+"""
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import HORARIO_SORTEOS, HORARIOS_POR_LOTERIA
+
+# Minuto asignado a las horas que no se pueden interpretar: van al final
+MINUTO_DESCONOCIDO = 24 * 60
+
+_lock = threading.Lock()
+_HORAS: List[str] = []
+_SLOT_POR_HORA: Dict[str, int] = {}
+_MINUTOS: List[int] = []
+
+
+_FORMATOS = ("%I:%M %p", "%H:%M", "%H:%M:%S")
+
+
+def _parse_minutos(hora: str) -> Optional[int]:
+    texto = hora.strip()
+    for fmt in _FORMATOS:
+        try:
+            t = datetime.strptime(texto, fmt)
+        except ValueError:
+            continue
+        return t.hour * 60 + t.minute
+    return None
+
+
+def slot_de(hora: str) -> int:
+    """Índice de la franja `hora`, registrándola si es nueva."""
+    slot = _SLOT_POR_HORA.get(hora)
+    if slot is not None:
+        return slot
+    with _lock:
+        slot = _SLOT_POR_HORA.get(hora)
+        if slot is None:
+            minutos = _parse_minutos(hora)
+            slot = len(_HORAS)
+            _HORAS.append(hora)
+            _MINUTOS.append(MINUTO_DESCONOCIDO if minutos is None else minutos)
+            _SLOT_POR_HORA[hora] = slot
+        return slot
+
+
+def hora_de(slot: int) -> str:
+    return _HORAS[slot]
+
+
+def minutos_de(slot: int) -> int:
+    """Minuto del día de la franja (MINUTO_DESCONOCIDO si no se pudo interpretar)."""
+    return _MINUTOS[slot]
+
+
+def minutos_de_hora(hora: str) -> Optional[int]:
+    """Minuto del día de `hora` ("02:00 PM", "14:00"), o None si no se puede interpretar."""
+    minutos = _MINUTOS[slot_de(hora)]
+    return None if minutos == MINUTO_DESCONOCIDO else minutos
+
+
+def clave_hora(hora: str) -> Tuple[int, int]:
+    """Clave de orden cronológico de `hora`; las no interpretables van al final."""
+    slot = slot_de(hora)
+    return _MINUTOS[slot], slot
+
+
+def ordenar_horas(horas) -> List[str]:
+    """Horas en orden cronológico (sin duplicados)."""
+    return sorted(set(horas), key=clave_hora)
+
+
+@lru_cache(maxsize=None)
+def horario_de(loteria: str) -> Tuple[str, ...]:
+    """Grilla diaria de `loteria` (config.HORARIOS_POR_LOTERIA o la general), en orden."""
+    return tuple(ordenar_horas(HORARIOS_POR_LOTERIA.get(loteria, HORARIO_SORTEOS)))
+
+
+def tabla_minutos() -> np.ndarray:
+    """Minuto del día de cada slot registrado, indexado por slot."""
+    return np.asarray(_MINUTOS, dtype=np.int16)
+
+
+def tabla_horas() -> List[str]:
+    """Texto de cada slot registrado, indexado por slot."""
+    return _HORAS
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import (
+    USER_AGENT,
+    TIMEOUT,
+    FETCH_RATE_LIMIT,
+    HTTP_RATE_BURST,
+    HTTP_POOL_SIZE,
+    HTTP_RETRIES,
+    HTTP_BACKOFF_BASE,
+    HTTP_BACKOFF_MAX,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Limitador de peticiones por cubeta de fichas, seguro entre hilos.
+    Se recargan `rate` fichas por segundo hasta `capacity`; cada petición
+    consume una. Con rate <= 0 no se limita.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Bloquea hasta obtener una ficha."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Se reserva la ficha aunque aún no exista: el saldo negativo ordena a los que esperan
+            self._tokens -= 1.0
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+
+
+@dataclass
+class HostStats:
+    """Contadores acumulados de un host."""
+    peticiones: int = 0
+    errores: int = 0
+    reintentos: int = 0
+    bytes: int = 0
+    latencia_total: float = 0.0
+
+    @property
+    def latencia_media(self) -> float:
+        return self.latencia_total / self.peticiones if self.peticiones else 0.0
+
+
+class HttpTransport:
+    """
+    Capa HTTP compartida por los clientes de scraping.
+
+    - Sesión con conexiones keep-alive reutilizables (pool por host).
+    - Reintentos con backoff exponencial ante 5xx, timeouts y errores de conexión.
+    - Cubeta de fichas común a todos los hilos y loterías que usan el transporte.
+    - Contadores por host de peticiones, latencia y bytes.
+    """
+
+    RETRY_STATUS = frozenset({500, 502, 503, 504})
+
+    def __init__(
+        self,
+        rate: float = FETCH_RATE_LIMIT,
+        burst: float = HTTP_RATE_BURST,
+        pool_size: int = HTTP_POOL_SIZE,
+        retries: int = HTTP_RETRIES,
+        backoff_base: float = HTTP_BACKOFF_BASE,
+        backoff_max: float = HTTP_BACKOFF_MAX,
+        timeout: float = TIMEOUT,
+    ) -> None:
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._stats: Dict[str, HostStats] = {}
+        self._stats_lock = threading.Lock()
+
+    def _backoff(self, intento: int) -> float:
+        return min(self.backoff_max, self.backoff_base * (2 ** intento))
+
+    def _registrar(self, host: str, latencia: float, nbytes: int = 0, error: bool = False, reintento: bool = False) -> None:
+        with self._stats_lock:
+            st = self._stats.setdefault(host, HostStats())
+            st.peticiones += 1
+            st.latencia_total += latencia
+            st.bytes += nbytes
+            st.errores += int(error)
+            st.reintentos += int(reintento)
+
+    def get(self, url: str, timeout: Optional[float] = None) -> requests.Response:
+        """
+        GET con límite de tasa y reintentos. Retorna la respuesta ya validada
+        (raise_for_status); los errores finales se propagan como
+        requests.RequestException.
+        """
+        host = urlsplit(url).netloc
+        timeout = timeout or self.timeout
+
+        for intento in range(self.retries + 1):
+            ultimo = intento == self.retries
+            self.bucket.acquire()
+            inicio = time.perf_counter()
+            try:
+                resp = self.session.get(url, timeout=timeout)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                self._registrar(host, time.perf_counter() - inicio, error=True, reintento=not ultimo)
+                if ultimo:
+                    raise
+                espera = self._backoff(intento)
+                logger.warning("Fallo de red en %s (%s); reintento %d en %.1fs", host, e, intento + 1, espera)
+                time.sleep(espera)
+                continue
+
+            latencia = time.perf_counter() - inicio
+            if resp.status_code in self.RETRY_STATUS and not ultimo:
+                self._registrar(host, latencia, len(resp.content), error=True, reintento=True)
+                espera = self._backoff(intento)
+                logger.warning("HTTP %d en %s; reintento %d en %.1fs", resp.status_code, host, intento + 1, espera)
+                time.sleep(espera)
+                continue
+
+            self._registrar(host, latencia, len(resp.content), error=resp.status_code >= 400)
+            resp.raise_for_status()
+            return resp
+
+    def stats(self) -> Dict[str, HostStats]:
+        """Copia de los contadores por host."""
+        with self._stats_lock:
+            return {host: HostStats(**vars(st)) for host, st in self._stats.items()}
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._stats.clear()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_default_transport: Optional[HttpTransport] = None
+_default_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """Transporte compartido del proceso (una sesión y un limitador para todas las loterías)."""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = HttpTransport()
+        return _default_transport
@@ -10,6 +10,7 @@ import re
 from src.ai_client import AIClient
 from src.gemini_client import GeminiClient
 from src.constantes import ANIMALITOS
+from src.horas import minutos_de_hora
 
 class IAService:
     def __init__(self, engine: Engine, forced_provider: str = None):
@@ -78,22 +79,34 @@ class IAService:
             # 2. Atrasos (Top 10 más atrasados)
             # Esto es aproximado, idealmente usaríamos AnalizadorAtrasos, pero por rapidez consultamos la última salida
             query_atrasos = text("""
-                SELECT numero_real, MAX(fecha || ' ' || hora) as ultima_salida
-                FROM sorteos
-                WHERE numero_real != -1
-                GROUP BY numero_real
+                SELECT s.numero_real, s.fecha, s.hora
+                FROM sorteos s
+                JOIN (
+                    SELECT numero_real, MAX(fecha) AS ultima_fecha
+                    FROM sorteos
+                    WHERE numero_real != -1
+                    GROUP BY numero_real
+                ) u ON s.numero_real = u.numero_real AND s.fecha = u.ultima_fecha
             """)
-            # Procesar en python para calcular días
-            all_last = conn.execute(query_atrasos).fetchall()
-            atrasos = []
-            now = datetime.now()
-            for row in all_last:
+            # La hora se ordena con el registro de franjas (el texto "12:00 PM" > "01:00 PM"
+            # no sirve para MAX); solo llegan las filas del último día de cada número
+            ultima_salida: Dict[Any, datetime] = {}
+            for numero, fecha, hora in conn.execute(query_atrasos).fetchall():
+                minutos = minutos_de_hora(hora)
+                if minutos is None:
+                    continue
                 try:
-                    last_dt = datetime.strptime(row[1], "%Y-%m-%d %I:%M %p")
-                    diff = (now - last_dt).total_seconds() / 3600 # Horas
-                    atrasos.append({"numero": row[0], "horas_sin_salir": int(diff)})
-                except:
-                    pass
+                    momento = datetime.strptime(fecha, "%Y-%m-%d") + timedelta(minutes=minutos)
+                except (TypeError, ValueError):
+                    continue
+                if numero not in ultima_salida or momento > ultima_salida[numero]:
+                    ultima_salida[numero] = momento
+
+            now = datetime.now()
+            atrasos = [
+                {"numero": numero, "horas_sin_salir": int((now - momento).total_seconds() / 3600)}
+                for numero, momento in ultima_salida.items()
+            ]
             
             atrasos.sort(key=lambda x: x["horas_sin_salir"], reverse=True)
             context["estadisticas"]["top_atrasados"] = [
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config import LOTERIAS, ARCHIVO_DIR, FETCH_MAX_WORKERS
+from .date_utils import hoy_local
+from .historial_archivo import HistorialArchivo
+from .historial_cache import HistorialCache
+from .historial_client import HistorialClient, HistorialData
+from .http_transport import HttpTransport
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ResultadoIngesta:
+    """Resumen de la actualización de una lotería."""
+    loteria: str
+    total: int = 0
+    envivo: int = 0  # sorteos aportados por la página de resultados en vivo
+    duracion: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class _Entrada:
+    data: Optional[HistorialData] = None
+    rango: Optional[Tuple[str, str]] = None
+    actualizado: float = 0.0
+    ultimo: Optional[ResultadoIngesta] = None
+    secuencia: int = 0  # refresco que publicó `data`; uno más viejo no lo pisa
+
+
+class Ingestor:
+    """
+    Orquesta la descarga de todas las loterías configuradas a la vez.
+
+    Cada lotería tiene su propio cliente (con caché de semanas y archivo
+    local) y su propio almacén en memoria. Las loterías se actualizan en
+    paralelo, cada una en su hilo, compartiendo el transporte HTTP (y por
+    tanto el límite de peticiones); un sitio lento o caído solo retrasa su
+    propia entrada. La UI lee el último historial publicado con `get`, lo
+    que hace instantáneo el cambio de lotería.
+    """
+
+    def __init__(
+        self,
+        loterias: Optional[Dict[str, Dict[str, str]]] = None,
+        cache: Optional[HistorialCache] = None,
+        archivo_dir: str = ARCHIVO_DIR,
+        transport: Optional[HttpTransport] = None,
+        max_workers: Optional[int] = None,
+        fetch_workers: int = FETCH_MAX_WORKERS,
+    ) -> None:
+        self.loterias = dict(loterias if loterias is not None else LOTERIAS)
+        self.fetch_workers = fetch_workers
+        self._clientes: Dict[str, HistorialClient] = {
+            nombre: HistorialClient(
+                base_url=cfg["historial"],
+                cache=cache,
+                archivo=HistorialArchivo(nombre, archivo_dir),
+                transport=transport,
+            )
+            for nombre, cfg in self.loterias.items()
+        }
+        self._entradas: Dict[str, _Entrada] = {nombre: _Entrada() for nombre in self.loterias}
+        self._pendientes: Dict[Tuple[str, str, str], Future] = {}
+        self._lock = threading.Lock()
+        self._secuencia = itertools.count(1)
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers or max(1, len(self.loterias)),
+            thread_name_prefix="ingesta",
+        )
+
+    # --- Lectura (UI) ---
+
+    def get(self, loteria: str) -> Optional[HistorialData]:
+        """
+        Copia del último historial publicado de la lotería, o None si aún no
+        se cargó. Es una copia propia: quien la recibe puede fusionarle
+        sorteos sin tocar lo que ven las demás sesiones.
+        """
+        with self._lock:
+            data = self._entradas[loteria].data
+        return data.copia() if data is not None else None
+
+    def rango(self, loteria: str) -> Optional[Tuple[str, str]]:
+        """Rango (inicio, fin) con el que se cargó la lotería."""
+        with self._lock:
+            return self._entradas[loteria].rango
+
+    def ultimo_resultado(self, loteria: str) -> Optional[ResultadoIngesta]:
+        with self._lock:
+            return self._entradas[loteria].ultimo
+
+    def cliente(self, loteria: str) -> HistorialClient:
+        return self._clientes[loteria]
+
+    def archivo(self, loteria: str) -> HistorialArchivo:
+        return self._clientes[loteria].archivo
+
+    # --- Actualización ---
+
+    def refresh(self, loteria: str, start_date: str, end_date: str, envivo: bool = True) -> ResultadoIngesta:
+        """
+        Actualiza una lotería de forma síncrona: historial del rango (archivo +
+        delta remoto) y, si el rango incluye hoy, la página de resultados en vivo.
+        El historial nuevo se publica de una vez al terminar, salvo que un
+        refresco pedido después (p.ej. con otro rango) ya haya publicado.
+        """
+        with self._lock:
+            secuencia = next(self._secuencia)
+        return self._refrescar(loteria, start_date, end_date, envivo, secuencia)
+
+    def _refrescar(self, loteria: str, start_date: str, end_date: str, envivo: bool, secuencia: int) -> ResultadoIngesta:
+        cliente = self._clientes[loteria]
+        cfg = self.loterias[loteria]
+        resultado = ResultadoIngesta(loteria=loteria)
+        inicio = time.perf_counter()
+        try:
+            data = cliente.fetch_historial(start_date, end_date, concurrent=True, max_workers=self.fetch_workers)
+
+            hoy = hoy_local()
+            if envivo and cfg.get("resultados") and start_date <= hoy <= end_date:
+                try:
+                    live = cliente.fetch_resultados_envivo(cfg["resultados"])
+                    resultado.envivo = data.merge(live)
+                    if live.total_sorteos:
+                        cliente.archivo.append(live)
+                except Exception as e:
+                    logger.warning("[%s] No se pudieron obtener resultados en vivo: %s", loteria, e)
+
+            resultado.total = data.total_sorteos
+            with self._lock:
+                entrada = self._entradas[loteria]
+                if secuencia > entrada.secuencia:
+                    entrada.data = data
+                    entrada.rango = (start_date, end_date)
+                    entrada.actualizado = time.time()
+                    entrada.secuencia = secuencia
+        except Exception as e:
+            logger.warning("[%s] Error de ingesta: %s", loteria, e)
+            resultado.error = str(e)
+
+        resultado.duracion = time.perf_counter() - inicio
+        with self._lock:
+            self._entradas[loteria].ultimo = resultado
+        return resultado
+
+    def submit(self, loteria: str, start_date: str, end_date: str, envivo: bool = True) -> Future:
+        """
+        Programa la actualización de una lotería en segundo plano. Si ya hay
+        una en curso para esa lotería y el mismo rango se devuelve la misma;
+        con otro rango se programa una nueva.
+        """
+        clave = (loteria, start_date, end_date)
+        with self._lock:
+            pendiente = self._pendientes.get(clave)
+            if pendiente is not None and not pendiente.done():
+                return pendiente
+            # El orden de publicación es el de los pedidos, no el de arranque de los hilos
+            futuro = self._pool.submit(self._refrescar, loteria, start_date, end_date, envivo, next(self._secuencia))
+            self._pendientes = {c: f for c, f in self._pendientes.items() if not f.done()}
+            self._pendientes[clave] = futuro
+            return futuro
+
+    def submit_all(
+        self, start_date: str, end_date: str, loterias: Optional[List[str]] = None, envivo: bool = True
+    ) -> Dict[str, Future]:
+        """Programa todas las loterías (o las indicadas) sin esperar a que terminen."""
+        return {
+            nombre: self.submit(nombre, start_date, end_date, envivo)
+            for nombre in (list(self.loterias) if loterias is None else loterias)
+        }
+
+    def refresh_all(
+        self,
+        start_date: str,
+        end_date: str,
+        loterias: Optional[List[str]] = None,
+        envivo: bool = True,
+        on_done: Optional[Callable[[ResultadoIngesta], None]] = None,
+    ) -> Dict[str, ResultadoIngesta]:
+        """
+        Actualiza todas las loterías en paralelo y espera a que terminen.
+        `on_done` se llama en cuanto cada una acaba, en orden de llegada.
+        """
+        futuros = self.submit_all(start_date, end_date, loterias, envivo)
+        resultados: Dict[str, ResultadoIngesta] = {}
+        for futuro in as_completed(futuros.values()):
+            resultado = futuro.result()
+            resultados[resultado.loteria] = resultado
+            if on_done is not None:
+                on_done(resultado)
+        # Mismo orden que la configuración
+        return {nombre: resultados[nombre] for nombre in futuros}
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
@@ -18,6 +18,7 @@ except ImportError:
     HAS_ML = False
 
 from .historial_client import HistorialData
+from .codigos import numero_de
 from .constantes import ANIMALITOS, SECTORES, DOCENAS, COLUMNAS
 from .atrasos import AnalizadorAtrasos
 from .model import MarkovModel
@@ -70,16 +71,15 @@ class MLPredictor:
         if not HAS_ML:
             return [], []
 
-        # Aplanar historial cronológicamente
-        # data.tabla es {(fecha, hora): animal}
-        # Ordenar por fecha y hora
-        sorted_keys = sorted(self.data.tabla.keys(), key=lambda x: (x[0], datetime.strptime(x[1], "%I:%M %p") if "M" in x[1] else x[1]))
+        # Historial en orden cronológico (índice de HistorialData)
+        indice = self.data.indice
+        sorted_keys = indice.claves
         
         X = []
         y = []
         
         # Codificador para animales
-        all_animals = list(self.data.tabla.values())
+        all_animals = indice.valores
         self.le_animal = LabelEncoder()
         
         # Normalizar nombres en data.tabla para que coincidan con ANIMALITOS
@@ -98,6 +98,8 @@ class MLPredictor:
         le_hora.fit(unique_hours)
         
         numeros_encoded = self.le_animal.transform(all_animals)
+        hora_codificada = dict(zip(unique_hours, le_hora.transform(unique_hours))) if unique_hours else {}
+        dias_semana = [datetime.fromordinal(o).weekday() for o in indice.dia_ordinal.tolist()]
         
         # Construir dataset
         # Empezamos desde lookback para tener historial previo
@@ -107,9 +109,8 @@ class MLPredictor:
             target_idx = numeros_encoded[i]
             
             # Features
-            dt = datetime.strptime(fecha, "%Y-%m-%d")
-            dia_semana = dt.weekday()
-            hora_idx = le_hora.transform([hora])[0]
+            dia_semana = dias_semana[i]
+            hora_idx = hora_codificada[hora]
             
             lags = numeros_encoded[i-lookback:i]
             
@@ -224,9 +225,7 @@ class MLPredictor:
 
         # --- CÓDIGO LEGACY DE PREDICCIÓN (Mantenido por compatibilidad) ---
         # Necesitamos los últimos lags
-        sorted_keys = sorted(self.data.tabla.keys(), key=lambda x: (x[0], datetime.strptime(x[1], "%I:%M %p") if "M" in x[1] else x[1]))
-        last_keys = sorted_keys[-3:] # Lag 3
-        last_animals = [self.data.tabla[k] for k in last_keys]
+        last_animals = self.data.indice.valores[-3:] # Lag 3
         
         # Codificar
         try:
@@ -255,11 +254,7 @@ class MLPredictor:
             animal_name = self.le_animal.inverse_transform([animal_label])[0]
             
             # Buscar número asociado al nombre
-            num = "0"
-            for k, v in ANIMALITOS.items():
-                if v == animal_name:
-                    num = k
-                    break
+            num = numero_de(animal_name) or "0"
             
             preds.append(MLPrediction(
                 numero=num,
@@ -1,91 +1,607 @@
 from __future__ import annotations
 
-from collections import Counter
+from collections import Counter, defaultdict, deque
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Tuple
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
+
+from .codigos import decodificar
+from .constantes import NOMBRE_POR_CODIGO, NUM_CODIGOS
 from .historial_client import HistorialData
+from .horas import hora_de, minutos_de, tabla_minutos
+
+# Posición de llegada de lo que aún no apareció
+_SIN_VER = np.iinfo(np.int64).max
 
 
 @dataclass
+class PrediccionHorizonte:
+    """
+    Predicción a varios sorteos para un lote de estados actuales.
+
+    - `pasos[i, t - 1]`: distribución del sorteo t posiciones adelante (t = 1..k).
+    - `dentro_de[i]`: probabilidad de que cada animalito salga al menos una
+      vez en los próximos k sorteos.
+    Las columnas siguen `estados`.
+    """
+
+    estados: List[str]
+    pasos: np.ndarray
+    dentro_de: np.ndarray
+
+    def top_dentro_de(self, fila: int = 0, n: int = 5) -> List[Tuple[str, float]]:
+        """Los n animalitos con más probabilidad de salir dentro del horizonte."""
+        valores = self.dentro_de[fila]
+        orden = np.lexsort((np.arange(len(valores)), -valores))[:n]
+        return [(self.estados[i], float(valores[i])) for i in orden]
+
+
 class MarkovModel:
-    freq: Counter      # frecuencia total por animal
-    transitions: Counter  # (A, B) -> conteo
+    """
+    Cadena de Márkov de primer orden sobre los animalitos.
+
+    Los conteos viven en arreglos densos indexados por código de sorteo
+    (0..37 más los valores no oficiales del historial, ver HistorialData):
+    - `frecuencias[i]`: veces que salió el estado i.
+    - `conteos[i, j]`: transiciones i -> j.
+    Las sumas por fila y las filas normalizadas se calculan una vez, así que
+    `next_probs` es una lectura de fila y `top_next` una selección parcial
+    (np.partition) en lugar de ordenar todo el diccionario.
+    `freq` y `transitions` siguen disponibles como Counter (vista construida
+    la primera vez que se piden).
+
+    Los empates se resuelven como en el modelo original, que ordenaba de
+    forma estable Counters llenados en orden de llegada: a igual conteo va
+    primero el estado (o la transición) que apareció antes. Para eso se
+    guarda la posición de la primera aparición de cada uno (`primera_vez`,
+    `primera_transicion`); sin esa información (`desde_conteos`) se usa el
+    orden de los códigos.
+
+    Un modelo secuencial construido con `from_historial` recuerda su
+    secuencia, así que puede actualizarse en línea en O(1) por sorteo
+    (`add_draw`, `extend`, `remove_oldest`) en lugar de reconstruirse.
+    Con `ventana=N` cuenta solo los últimos N sorteos y descarta el más
+    antiguo a medida que llegan nuevos; `por_ventanas` arma varias
+    ventanas de una sola pasada. Para conteos con decaimiento exponencial
+    ver `MarkovDecaido`.
+    """
+
+    _DTYPE = np.int64
+
+    def __init__(self, freq: Counter, transitions: Counter) -> None:
+        estados = list(NOMBRE_POR_CODIGO)
+        posicion = {e: i for i, e in enumerate(estados)}
+        for clave in list(freq) + [x for par in transitions for x in par]:
+            if clave not in posicion:
+                posicion[clave] = len(estados)
+                estados.append(clave)
+        k = len(estados)
+        # El orden de los Counter es el orden de llegada
+        frecuencias = np.zeros(k, dtype=np.int64)
+        primera_vez = np.full(k, _SIN_VER, dtype=np.int64)
+        for orden, (clave, c) in enumerate(freq.items()):
+            frecuencias[posicion[clave]] = c
+            primera_vez[posicion[clave]] = orden
+        conteos = np.zeros((k, k), dtype=np.int64)
+        primera_transicion = np.full((k, k), _SIN_VER, dtype=np.int64)
+        for orden, ((a, b), c) in enumerate(transitions.items()):
+            conteos[posicion[a], posicion[b]] = c
+            primera_transicion[posicion[a], posicion[b]] = orden
+        self._fijar(estados, frecuencias, conteos, primera_vez, primera_transicion)
+
+    @classmethod
+    def desde_conteos(
+        cls,
+        estados: Sequence[str],
+        frecuencias: np.ndarray,
+        conteos: np.ndarray,
+        primera_vez: Optional[np.ndarray] = None,
+        primera_transicion: Optional[np.ndarray] = None,
+    ) -> MarkovModel:
+        """
+        Construye desde arreglos ya contados (estado i = `estados[i]`). Sin
+        posiciones de primera aparición, los empates van por código.
+        """
+        model = cls.__new__(cls)
+        model._fijar(list(estados), frecuencias, conteos, primera_vez, primera_transicion)
+        return model
+
+    def _fijar(
+        self,
+        estados: List[str],
+        frecuencias: np.ndarray,
+        conteos: np.ndarray,
+        primera_vez: Optional[np.ndarray] = None,
+        primera_transicion: Optional[np.ndarray] = None,
+    ) -> None:
+        k = len(estados)
+        self.estados = estados
+        self._posicion = {e: i for i, e in enumerate(estados)}
+        self.frecuencias = np.asarray(frecuencias, dtype=self._DTYPE)
+        self.conteos = np.asarray(conteos, dtype=self._DTYPE)
+        self.totales_fila = self.conteos.sum(axis=1)
+        if primera_vez is None:
+            primera_vez = np.arange(k, dtype=np.int64)
+        if primera_transicion is None:
+            primera_transicion = np.arange(k * k, dtype=np.int64).reshape(k, k)
+        self.primera_vez = np.asarray(primera_vez, dtype=np.int64)
+        self.primera_transicion = np.asarray(primera_transicion, dtype=np.int64)
+        # Posición que tendrá el próximo sorteo agregado en línea y, solo si
+        # se quitan sorteos, las posiciones de cada estado y transición
+        self._proxima_posicion = 0
+        self._apariciones: Optional[Tuple[Dict[int, Deque[int]], Dict[Tuple[int, int], Deque[int]]]] = None
+        self._filas: Optional[np.ndarray] = None
+        self._filas_sucias: set = set()
+        self._invalidar_vistas()
+        # Secuencia de códigos contados (solo modo secuencial); None = no admite
+        # actualizaciones en línea
+        self._secuencia: Optional[Deque[int]] = None
+        self.ventana: Optional[int] = None
+
+    @staticmethod
+    def _estados_de(data: HistorialData) -> List[str]:
+        """Vocabulario de estados del historial: 38 oficiales más sus valores no oficiales."""
+        return [data.valor_de_codigo(c) for c in range(NUM_CODIGOS + len(data.extras))]
 
     @staticmethod
-    def from_historial(data: HistorialData, mode: str = "sequential") -> "MarkovModel":
+    def _primeras(claves: np.ndarray, tamano: int) -> np.ndarray:
+        """Posición de la primera aparición de cada clave 0..tamano-1 en `claves` (_SIN_VER si no está)."""
+        primera = np.full(tamano, _SIN_VER, dtype=np.int64)
+        unicas, posiciones = np.unique(claves, return_index=True)
+        primera[unicas] = posiciones
+        return primera
+
+    @staticmethod
+    def from_historial(
+        data: HistorialData, mode: str = "sequential", ventana: Optional[int] = None
+    ) -> "MarkovModel":
         """
         Crea el modelo a partir de los datos.
-        
+
         Args:
             data: Datos del historial.
             mode: "sequential" para transiciones cronológicas (9am -> 10am).
                   "same_hour" para transiciones por hora entre días (Hoy 9am -> Mañana 9am).
+            ventana: Solo modo secuencial: contar únicamente los últimos N sorteos
+                  (y mantener ese largo al agregar sorteos en línea).
         """
-        freq = Counter()
-        transitions = Counter()
+        codigos = data.codigos.astype(np.intp)
+        estados = MarkovModel._estados_de(data)
+        k = len(estados)
+        if ventana is not None:
+            if mode != "sequential":
+                raise ValueError("La ventana solo aplica al modo secuencial")
+            if ventana < 1:
+                raise ValueError("La ventana debe ser de al menos un sorteo")
+            codigos = codigos[max(0, len(codigos) - ventana):]
 
         # Frecuencia total
-        for animal in data.tabla.values():
-            freq[animal] += 1
+        frecuencias = np.bincount(codigos, minlength=k)
 
         if mode == "sequential":
             # Modo Secuencial: Aprende la transición inmediata (t -> t+1)
-            # Recorremos día por día, y dentro de cada día, hora por hora.
-            secuencia_total: List[str] = []
-            for dia in data.dias:
-                for hora in data.horas:
-                    key = (dia, hora)
-                    if key in data.tabla:
-                        secuencia_total.append(data.tabla[key])
-            
-            # Calculamos transiciones sobre la secuencia única cronológica
-            for a, b in zip(secuencia_total, secuencia_total[1:]):
-                transitions[(a, b)] += 1
+            # sobre la secuencia cronológica única (día por día, hora por hora).
+            origen, destino = codigos[:-1], codigos[1:]
 
         elif mode == "same_hour":
             # Modo Misma Hora: Aprende patrones de la misma hora en días consecutivos
-            # (Hoy 9am -> Mañana 9am)
-            for hora in data.horas:
-                secuencia: List[str] = []
-                for dia in data.dias:
-                    key = (dia, hora)
-                    if key in data.tabla:
-                        secuencia.append(data.tabla[key])
-
-                for a, b in zip(secuencia, secuencia[1:]):
-                    transitions[(a, b)] += 1
-        
+            # (Hoy 9am -> Mañana 9am). El orden estable por franja (en orden
+            # cronológico de las horas) deja cada hora en orden cronológico;
+            # solo cuentan pares de la misma franja.
+            orden = np.lexsort((data.slot, tabla_minutos()[data.slot]))
+            por_hora = codigos[orden]
+            misma = data.slot[orden][1:] == data.slot[orden][:-1]
+            origen, destino = por_hora[:-1][misma], por_hora[1:][misma]
+
         else:
             raise ValueError(f"Modo desconocido: {mode}")
 
-        return MarkovModel(freq=freq, transitions=transitions)
+        claves = origen * k + destino
+        conteos = np.bincount(claves, minlength=k * k).reshape(k, k)
+        model = MarkovModel.desde_conteos(
+            estados, frecuencias, conteos,
+            MarkovModel._primeras(codigos, k), MarkovModel._primeras(claves, k * k).reshape(k, k),
+        )
+        if mode == "sequential":
+            model._secuencia = deque(codigos.tolist())
+            model._proxima_posicion = len(codigos)
+            model.ventana = ventana
+        return model
 
     @staticmethod
-    def _normalize(counter: Counter) -> Dict[str, float]:
-        total = float(sum(counter.values()))
-        if total == 0:
-            return {}
-        return {k: v / total for k, v in counter.items()}
+    def por_ventanas(data: HistorialData, ventanas: Iterable[int]) -> Dict[int, "MarkovModel"]:
+        """
+        Modelos secuenciales sobre los últimos N sorteos para cada N de
+        `ventanas` (p.ej. 100/500/2000), contados en una sola pasada: cada
+        ventana suma a la anterior solo el tramo que le falta.
+        """
+        codigos = data.codigos.astype(np.intp)
+        estados = MarkovModel._estados_de(data)
+        k = len(estados)
+        n = len(codigos)
+        claves = codigos[:-1] * k + codigos[1:]  # claves[j]: transición j -> j + 1
+
+        modelos: Dict[int, MarkovModel] = {}
+        frecuencias = np.zeros(k, dtype=np.int64)
+        conteos = np.zeros(k * k, dtype=np.int64)
+        desde = n  # primer sorteo ya contado
+        for ventana in sorted(set(ventanas)):
+            if ventana < 1:
+                raise ValueError("La ventana debe ser de al menos un sorteo")
+            inicio = max(0, n - ventana)
+            frecuencias += np.bincount(codigos[inicio:desde], minlength=k)
+            # Transiciones cuyo origen entra ahora en la ventana
+            conteos += np.bincount(claves[inicio:min(desde, n - 1)], minlength=k * k)
+            desde = inicio
+            model = MarkovModel.desde_conteos(
+                estados, frecuencias.copy(), conteos.reshape(k, k).copy(),
+                MarkovModel._primeras(codigos[inicio:], k), MarkovModel._primeras(claves[inicio:], k * k).reshape(k, k),
+            )
+            model._secuencia = deque(codigos[inicio:].tolist())
+            model._proxima_posicion = n - inicio
+            model.ventana = ventana
+            modelos[ventana] = model
+        return modelos
+
+    @staticmethod
+    def top_por_paso(data: HistorialData, inicio: int, fin: int, n: int = 5, bloque: int = 8192) -> np.ndarray:
+        """
+        Walk-forward vectorizado (modo secuencial): para cada sorteo i de
+        [inicio, fin), los `n` estados que daría `top_next` tras el sorteo
+        i - 1 con un modelo contado solo con los sorteos anteriores a i.
+        Devuelve (fin - inicio, n) códigos de estado, con -1 de relleno si
+        la fila tiene menos de `n` sucesores vistos. Los empates van por
+        orden de llegada, como en `top_next`: una transición contada en un
+        prefijo tiene en él la misma primera aparición que en todo el rango.
+
+        Se procesa por bloques de `bloque` pasos: dentro del bloque, el
+        conteo de la fila en cada paso es la base más la suma acumulada
+        (por fila) de las transiciones anteriores del mismo bloque.
+        """
+        if inicio < 1:
+            raise ValueError("El primer paso necesita al menos un sorteo previo")
+        codigos = data.codigos.astype(np.intp)
+        k = NUM_CODIGOS + len(data.extras)
+        fin = min(fin, len(codigos))
+        salida = np.full((max(0, fin - inicio), n), -1, dtype=np.intp)
+        if fin <= inicio or n <= 0:
+            return salida
+
+        # Transiciones j -> j + 1 ya vistas en el paso `inicio` (j + 1 <= inicio - 1)
+        claves = codigos[:-1] * k + codigos[1:]
+        base = np.bincount(claves[:inicio - 1], minlength=k * k).reshape(k, k)
+        # A igual conteo gana la transición que apareció antes: rango dentro de su fila
+        primera = MarkovModel._primeras(claves[:fin - 1], k * k).reshape(k, k)
+        desempate = np.empty((k, k), dtype=np.int64)
+        np.put_along_axis(
+            desempate, np.argsort(primera, axis=1, kind="stable"),
+            np.broadcast_to(np.arange(k - 1, -1, -1), (k, k)), axis=1,
+        )
+        for a in range(inicio, fin, bloque):
+            b = min(a + bloque, fin)
+            m = b - a
+            filas = codigos[a - 1:b - 1]  # sorteo previo a cada paso
+            # Tras el paso i la fila suma la transición (i - 1 -> i)
+            orden = np.argsort(filas, kind="stable")
+            por_fila = filas[orden]
+            acumulado = np.zeros((m + 1, k), dtype=np.int64)
+            acumulado[np.arange(1, m + 1), codigos[a:b][orden]] = 1
+            np.cumsum(acumulado, axis=0, out=acumulado)
+            # Suma exclusiva reiniciada al comienzo de cada fila
+            comienzo = np.flatnonzero(np.r_[True, por_fila[1:] != por_fila[:-1]])
+            grupo = np.repeat(comienzo, np.diff(np.r_[comienzo, m]))
+            conteos = base[por_fila] + acumulado[:-1] - acumulado[grupo]
+
+            puntaje = np.where(conteos > 0, conteos * k + desempate[por_fila], -1)
+            if k > n:
+                mejores = np.argpartition(-puntaje, n - 1, axis=1)[:, :n]
+            else:
+                mejores = np.broadcast_to(np.arange(k), (m, k))
+            elegidos = np.take_along_axis(puntaje, mejores, axis=1)
+            rango = np.argsort(-elegidos, axis=1, kind="stable")
+            top = np.take_along_axis(mejores, rango, axis=1)
+            top[np.take_along_axis(elegidos, rango, axis=1) < 0] = -1
+            salida[a - inicio + orden, :top.shape[1]] = top
+
+            base += np.bincount(claves[a - 1:b - 1], minlength=k * k).reshape(k, k)
+        return salida
+
+    # --- Actualización en línea ---
+
+    def _codigo(self, draw: Union[int, str]) -> int:
+        """Estado de `draw` (código o texto); un texto nuevo agrega un estado."""
+        if not isinstance(draw, str):
+            return int(draw)
+        i = self._posicion.get(draw)
+        if i is None:
+            i = len(self.estados)
+            self.estados.append(draw)
+            self._posicion[draw] = i
+            self.frecuencias = np.append(self.frecuencias, 0)
+            self.conteos = np.pad(self.conteos, ((0, 1), (0, 1)))
+            self.totales_fila = np.append(self.totales_fila, 0)
+            self.primera_vez = np.append(self.primera_vez, _SIN_VER)
+            self.primera_transicion = np.pad(self.primera_transicion, ((0, 1), (0, 1)), constant_values=_SIN_VER)
+            self._filas = None
+        return i
+
+    def _anotar_llegada(self, a: Optional[int], b: int) -> None:
+        """Registra la posición del sorteo b recién agregado (y de la transición a -> b)."""
+        pos = self._proxima_posicion
+        self._proxima_posicion += 1
+        if pos < self.primera_vez[b]:
+            self.primera_vez[b] = pos
+        if a is not None and pos - 1 < self.primera_transicion[a, b]:
+            self.primera_transicion[a, b] = pos - 1
+        if self._apariciones is not None:
+            por_estado, por_par = self._apariciones
+            por_estado[b].append(pos)
+            if a is not None:
+                por_par[(a, b)].append(pos - 1)
+
+    def _registro_apariciones(self) -> Tuple[Dict[int, Deque[int]], Dict[Tuple[int, int], Deque[int]]]:
+        """
+        Posiciones de cada estado y transición aún contados, para saber cuál
+        pasa a ser su primera aparición al quitar el sorteo más antiguo. Se
+        arma la primera vez que hace falta y luego se mantiene en línea.
+        """
+        if self._apariciones is None:
+            por_estado: Dict[int, Deque[int]] = defaultdict(deque)
+            por_par: Dict[Tuple[int, int], Deque[int]] = defaultdict(deque)
+            previo = None
+            for pos, c in enumerate(self._secuencia, start=self._proxima_posicion - len(self._secuencia)):
+                por_estado[c].append(pos)
+                if previo is not None:
+                    por_par[(previo, c)].append(pos - 1)
+                previo = c
+            self._apariciones = (por_estado, por_par)
+        return self._apariciones
+
+    @staticmethod
+    def _siguiente_aparicion(apariciones: Dict, clave) -> int:
+        cola = apariciones[clave]
+        cola.popleft()
+        return cola[0] if cola else _SIN_VER
+
+    def _secuencial(self) -> Deque[int]:
+        if self._secuencia is None:
+            raise ValueError("Solo un modelo secuencial construido con from_historial admite actualizaciones en línea")
+        return self._secuencia
+
+    def _invalidar_vistas(self) -> None:
+        self._freq = None
+        self._transitions = None
+        self._potencias: List[np.ndarray] = []
+        self._evitar: List[np.ndarray] = []
+
+    def add_draw(self, draw: Union[int, str]) -> None:
+        """Agrega un sorteo al final de la secuencia (código o texto del animalito)."""
+        secuencia = self._secuencial()
+        b = self._codigo(draw)
+        self.frecuencias[b] += 1
+        a = secuencia[-1] if secuencia else None
+        if a is not None:
+            self.conteos[a, b] += 1
+            self.totales_fila[a] += 1
+            self._filas_sucias.add(a)
+        self._anotar_llegada(a, b)
+        secuencia.append(b)
+        self._invalidar_vistas()
+        self._recortar()
+
+    def extend(self, draws: Iterable[Union[int, str]]) -> None:
+        """Agrega varios sorteos en orden."""
+        secuencia = self._secuencial()
+        codigos = np.array([self._codigo(d) for d in draws], dtype=np.intp)
+        if len(codigos) == 0:
+            return
+        if self._apariciones is not None:
+            for b in codigos.tolist():
+                self.add_draw(b)
+            return
+        pos = self._proxima_posicion + np.arange(len(codigos))
+        if secuencia:
+            origen, destino = np.concatenate(([secuencia[-1]], codigos[:-1])), codigos
+            pos_origen = pos - 1
+        else:
+            origen, destino = codigos[:-1], codigos[1:]
+            pos_origen = pos[:-1]
+        np.add.at(self.frecuencias, codigos, 1)
+        np.add.at(self.conteos, (origen, destino), 1)
+        np.add.at(self.totales_fila, origen, 1)
+        # Las posiciones ya anotadas son anteriores: el mínimo conserva la primera
+        np.minimum.at(self.primera_vez, codigos, pos)
+        np.minimum.at(self.primera_transicion, (origen, destino), pos_origen)
+        self._proxima_posicion += len(codigos)
+        self._filas_sucias.update(origen.tolist())
+        secuencia.extend(codigos.tolist())
+        self._invalidar_vistas()
+        self._recortar()
+
+    def _recortar(self) -> None:
+        """Con ventana fija, descarta lo más antiguo que quedó fuera."""
+        if self.ventana is not None:
+            while len(self._secuencia) > self.ventana:
+                self.remove_oldest()
+
+    def remove_oldest(self) -> Optional[str]:
+        """Quita el sorteo más antiguo (para ventanas deslizantes). Retorna su texto."""
+        secuencia = self._secuencial()
+        if not secuencia:
+            return None
+        por_estado, por_par = self._registro_apariciones()
+        a = secuencia.popleft()
+        self.frecuencias[a] -= 1
+        self.primera_vez[a] = self._siguiente_aparicion(por_estado, a)
+        if secuencia:
+            b = secuencia[0]
+            self.conteos[a, b] -= 1
+            self.totales_fila[a] -= 1
+            self.primera_transicion[a, b] = self._siguiente_aparicion(por_par, (a, b))
+            self._filas_sucias.add(a)
+        self._invalidar_vistas()
+        return self.estados[a]
+
+    @property
+    def total_sorteos(self) -> int:
+        return int(self.frecuencias.sum())
+
+    # --- Vistas compatibles (Counter) ---
+
+    @staticmethod
+    def _por_llegada(indices: np.ndarray, primera: np.ndarray) -> np.ndarray:
+        """`indices` en orden de primera aparición (el de inserción de los Counter originales)."""
+        return indices[np.argsort(primera[indices], kind="stable")]
+
+    def _pares_por_llegada(self, conteos: np.ndarray) -> List[Tuple[int, int]]:
+        planos = self._por_llegada(np.flatnonzero(conteos), self.primera_transicion.ravel())
+        return [divmod(int(x), conteos.shape[1]) for x in planos]
+
+    @property
+    def freq(self) -> Counter:
+        """Frecuencia total por animal."""
+        if self._freq is None:
+            indices = self._por_llegada(np.flatnonzero(self.frecuencias), self.primera_vez)
+            self._freq = Counter({self.estados[i]: int(self.frecuencias[i]) for i in indices})
+        return self._freq
+
+    @property
+    def transitions(self) -> Counter:
+        """(A, B) -> conteo."""
+        if self._transitions is None:
+            self._transitions = Counter({
+                (self.estados[a], self.estados[b]): int(self.conteos[a, b])
+                for a, b in self._pares_por_llegada(self.conteos)
+            })
+        return self._transitions
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, MarkovModel):
+            return NotImplemented
+        return self.freq == other.freq and self.transitions == other.transitions
+
+    def __repr__(self) -> str:
+        return f"MarkovModel(estados={len(self.estados)}, transiciones={int(self.totales_fila.sum())})"
+
+    # --- Probabilidades ---
+
+    def filas_normalizadas(self) -> np.ndarray:
+        """Matriz P(B|A) (filas sin transiciones quedan en cero)."""
+        if self._filas is None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                filas = self.conteos / self.totales_fila[:, None]
+            filas[self.totales_fila == 0] = 0.0
+            self._filas = filas
+            self._filas_sucias.clear()
+        elif self._filas_sucias:
+            # Solo se renormalizan las filas que cambiaron desde la última lectura
+            for i in self._filas_sucias:
+                total = self.totales_fila[i]
+                self._filas[i] = self.conteos[i] / total if total else 0.0
+            self._filas_sucias.clear()
+        return self._filas
+
+    def _como_dict(self, valores: np.ndarray, indices: np.ndarray) -> Dict[str, float]:
+        return {self.estados[i]: float(valores[i]) for i in indices}
 
     def global_probs(self) -> Dict[str, float]:
         """Probabilidades globales basadas solo en frecuencia."""
-        return self._normalize(self.freq)
+        total = float(self.frecuencias.sum())
+        if total == 0:
+            return {}
+        return self._como_dict(self.frecuencias / total, self._por_llegada(np.flatnonzero(self.frecuencias), self.primera_vez))
 
     def next_probs(self, actual: str) -> Dict[str, float]:
         """Probabilidades condicionales P(B|A=actual)."""
-        sub = Counter({
-            b: c for (a, b), c in self.transitions.items() if a == actual
-        })
-        return self._normalize(sub)
+        i = self._posicion.get(actual)
+        if i is None or self.totales_fila[i] == 0:
+            return {}
+        fila = self.conteos[i]
+        return self._como_dict(self.filas_normalizadas()[i], self._por_llegada(np.flatnonzero(fila), self.primera_transicion[i]))
+
+    def prob(self, actual: str, siguiente: str) -> float:
+        """P(siguiente|actual) en O(1); 0.0 si alguno no se conoce."""
+        i, j = self._posicion.get(actual), self._posicion.get(siguiente)
+        if i is None or j is None:
+            return 0.0
+        return float(self.filas_normalizadas()[i, j])
+
+    # --- Horizonte de varios sorteos ---
+
+    def matriz_estocastica(self) -> np.ndarray:
+        """P(B|A) con las filas sin transiciones reemplazadas por la frecuencia global."""
+        matriz = self.filas_normalizadas().copy()
+        vacias = self.totales_fila == 0
+        if vacias.any():
+            total = self.frecuencias.sum()
+            matriz[vacias] = self.frecuencias / total if total else 1.0 / len(self.estados)
+        return matriz
+
+    def _potencia(self, n: int) -> np.ndarray:
+        """P^n, cacheada; se invalida con cada actualización en línea."""
+        if not self._potencias:
+            self._potencias = [np.eye(len(self.estados)), self.matriz_estocastica()]
+        while len(self._potencias) <= n:
+            self._potencias.append(self._potencias[-1] @ self._potencias[1])
+        return self._potencias[n]
+
+    def _sin_salir(self, t: int) -> np.ndarray:
+        """
+        A_t[s, x] = P(x no sale en t sorteos partiendo de s), para todo x a la vez:
+        A_{t+1} = P A_t - P * diag(A_t) (se descuenta el paso que cae en x).
+        """
+        if not self._evitar:
+            self._evitar = [np.ones((len(self.estados), len(self.estados)))]
+        matriz = self._potencia(1)
+        while len(self._evitar) <= t:
+            previo = self._evitar[-1]
+            self._evitar.append(matriz @ previo - matriz * np.diag(previo)[None, :])
+        return self._evitar[t]
+
+    def predict_horizon(self, actuales: Iterable[Union[int, str]], k: int = 12) -> PrediccionHorizonte:
+        """
+        Distribuciones a 1..k sorteos y probabilidad de salir dentro de k para
+        un lote de estados actuales (texto o código). Un estado desconocido
+        parte de la frecuencia global.
+        """
+        if k < 1:
+            raise ValueError("El horizonte debe ser de al menos un sorteo")
+        matriz = self._potencia(1)
+        total = self.frecuencias.sum()
+        global_ = self.frecuencias / total if total else np.full(len(self.estados), 1.0 / len(self.estados))
+        indices = [self._posicion.get(a) if isinstance(a, str) else int(a) for a in actuales]
+        primero = np.array([global_ if i is None else matriz[i] for i in indices]).reshape(len(indices), -1)
+
+        # Distribución del paso t: (paso 1) @ P^(t-1)
+        pasos = np.stack([primero @ self._potencia(t) for t in range(k)], axis=1)
+        previo = self._sin_salir(k - 1)
+        sin_salir = primero @ previo - primero * np.diag(previo)[None, :]
+        return PrediccionHorizonte(estados=list(self.estados), pasos=pasos, dentro_de=1.0 - sin_salir)
+
+    def _top(self, conteos: np.ndarray, total: float, n: int, primera: np.ndarray) -> List[Tuple[str, float]]:
+        if total == 0 or n <= 0:
+            return []
+        candidatos = np.flatnonzero(conteos)
+        if len(candidatos) > n:
+            # Umbral del n-ésimo mayor; los empatados en el umbral entran por orden de llegada
+            valores = conteos[candidatos]
+            umbral = np.partition(valores, len(valores) - n)[len(valores) - n]
+            mayores = candidatos[valores > umbral]
+            empatados = self._por_llegada(candidatos[valores == umbral], primera)
+            candidatos = np.concatenate([mayores, empatados[: n - len(mayores)]])
+        # Mayor probabilidad primero; a igualdad, el que apareció antes
+        candidatos = candidatos[np.lexsort((primera[candidatos], -conteos[candidatos]))]
+        return [(self.estados[i], float(conteos[i] / total)) for i in candidatos]
 
     def top_global(self, n: int = 10) -> List[Tuple[str, float]]:
-        probs = self.global_probs()
-        return sorted(probs.items(), key=lambda x: x[1], reverse=True)[:n]
+        return self._top(self.frecuencias, float(self.frecuencias.sum()), n, self.primera_vez)
 
     def top_next(self, actual: str, n: int = 5) -> List[Tuple[str, float]]:
-        probs = self.next_probs(actual)
-        return sorted(probs.items(), key=lambda x: x[1], reverse=True)[:n]
+        i = self._posicion.get(actual)
+        if i is None:
+            return []
+        return self._top(self.conteos[i], float(self.totales_fila[i]), n, self.primera_transicion[i])
 
     def debug_transitions(
         self, min_count: int = 2
@@ -96,3 +612,395 @@ class MarkovModel:
             key=lambda x: x[1],
             reverse=True,
         )
+
+
+class MarkovDecaido(MarkovModel):
+    """
+    Modelo secuencial con conteos de decaimiento exponencial: un sorteo de
+    hace `vida_media` sorteos pesa la mitad que el más reciente.
+
+    Agregar un sorteo es O(1): en lugar de multiplicar toda la matriz por el
+    factor de decaimiento, cada sorteo nuevo suma un peso 2^(1/vida_media)
+    veces mayor que el anterior. Las probabilidades no dependen de la
+    escala; `freq` y `transitions` se reportan relativas al último sorteo
+    (peso 1). Cuando el peso crece demasiado se reescala todo una vez.
+    `total_sorteos` sigue siendo el número de sorteos contados; la masa
+    decaída está en `peso_total`.
+    """
+
+    _DTYPE = np.float64
+    _PESO_MAXIMO = 1e100
+
+    @classmethod
+    def from_historial(cls, data: HistorialData, vida_media: float) -> MarkovDecaido:
+        if vida_media <= 0:
+            raise ValueError("La vida media debe ser positiva")
+        codigos = data.codigos.astype(np.intp)
+        estados = MarkovModel._estados_de(data)
+        k = len(estados)
+        n = len(codigos)
+        # Peso de cada sorteo relativo al último; una transición pesa lo que su destino
+        pesos = np.exp2(-(n - 1 - np.arange(n)) / vida_media)
+        frecuencias = np.bincount(codigos, weights=pesos, minlength=k)
+        claves = codigos[:-1] * k + codigos[1:]
+        conteos = np.bincount(claves, weights=pesos[1:], minlength=k * k).reshape(k, k)
+
+        model = cls.desde_conteos(
+            estados, frecuencias, conteos,
+            MarkovModel._primeras(codigos, k), MarkovModel._primeras(claves, k * k).reshape(k, k),
+        )
+        model.vida_media = vida_media
+        model._factor = 2.0 ** (1.0 / vida_media)
+        model._peso = 1.0
+        model._sorteos = n
+        model._proxima_posicion = n
+        # Para encadenar transiciones basta con recordar el último sorteo
+        model._secuencia = deque(codigos[-1:].tolist(), maxlen=1)
+        return model
+
+    def add_draw(self, draw: Union[int, str]) -> None:
+        secuencia = self._secuencial()
+        b = self._codigo(draw)
+        self._peso *= self._factor
+        if self._peso > self._PESO_MAXIMO:
+            self._reescalar()
+        self.frecuencias[b] += self._peso
+        a = secuencia[-1] if secuencia else None
+        if a is not None:
+            self.conteos[a, b] += self._peso
+            self.totales_fila[a] += self._peso
+            self._filas_sucias.add(a)
+        self._anotar_llegada(a, b)
+        secuencia.append(b)
+        self._sorteos += 1
+        self._invalidar_vistas()
+
+    def extend(self, draws: Iterable[Union[int, str]]) -> None:
+        for draw in draws:
+            self.add_draw(draw)
+
+    def remove_oldest(self) -> Optional[str]:
+        raise ValueError("Un modelo con decaimiento no tiene sorteo más antiguo que quitar; use ventana")
+
+    def _reescalar(self) -> None:
+        self.frecuencias /= self._peso
+        self.conteos /= self._peso
+        self.totales_fila /= self._peso
+        self._peso = 1.0
+        self._invalidar_vistas()
+
+    @property
+    def total_sorteos(self) -> int:
+        return self._sorteos
+
+    @property
+    def peso_total(self) -> float:
+        """Suma de pesos decaídos, relativa al último sorteo (la de `freq`)."""
+        return float(self.frecuencias.sum() / self._peso)
+
+    @property
+    def freq(self) -> Counter:
+        if self._freq is None:
+            efectivas = self.frecuencias / self._peso
+            indices = self._por_llegada(np.flatnonzero(efectivas), self.primera_vez)
+            self._freq = Counter({self.estados[i]: float(efectivas[i]) for i in indices})
+        return self._freq
+
+    @property
+    def transitions(self) -> Counter:
+        if self._transitions is None:
+            efectivos = self.conteos / self._peso
+            self._transitions = Counter({
+                (self.estados[a], self.estados[b]): float(efectivos[a, b]) for a, b in self._pares_por_llegada(efectivos)
+            })
+        return self._transitions
+
+
+class MarkovPorHora:
+    """
+    Transiciones condicionadas a la franja horaria: "después de X, ¿qué sale
+    a las 11 AM?".
+
+    Se guardan dos tensores (horas x estados x estados) contados en la
+    misma pasada vectorizada:
+    - `secuencial[h, a, b]`: b salió en la franja h justo después de a.
+    - `misma_hora[h, a, b]`: b salió en la franja h y el sorteo anterior de
+      esa misma franja había sido a.
+    Las franjas son las del historial en orden cronológico (`horas`) y los
+    estados los de MarkovModel (38 códigos más los valores no oficiales).
+    Los modos de MarkovModel son reducciones: `marginal("sequential")` suma
+    `secuencial` sobre las horas y `marginal("same_hour")` suma `misma_hora`.
+    Se puede actualizar en línea con `add_draw(draw, hora)`.
+    """
+
+    def __init__(self, estados: List[str], horas: List[str]) -> None:
+        self.estados = list(estados)
+        self.horas = list(horas)
+        self._posicion = {e: i for i, e in enumerate(self.estados)}
+        self._columna = {h: i for i, h in enumerate(self.horas)}
+        k, nh = len(self.estados), len(self.horas)
+        self.frecuencias = np.zeros((nh, k), dtype=np.int64)
+        self.secuencial = np.zeros((nh, k, k), dtype=np.int64)
+        self.misma_hora = np.zeros((nh, k, k), dtype=np.int64)
+        self.totales = np.zeros((nh, k), dtype=np.int64)  # secuencial.sum(axis=2)
+        self._ultimo = -1
+        self._ultimo_por_hora = np.full(nh, -1, dtype=np.int64)
+
+    @classmethod
+    def from_historial(cls, data: HistorialData) -> MarkovPorHora:
+        slots = [int(x) for x in np.unique(data.slot)]
+        slots.sort(key=lambda x: (minutos_de(x), x))
+        model = cls(MarkovModel._estados_de(data), [hora_de(x) for x in slots])
+        k, nh = len(model.estados), len(model.horas)
+        if data.total_sorteos == 0:
+            return model
+
+        columna_por_slot = np.zeros(max(slots) + 1, dtype=np.intp)
+        columna_por_slot[slots] = np.arange(nh)
+        codigos = data.codigos.astype(np.intp)
+        columnas = columna_por_slot[data.slot]
+
+        model.frecuencias = np.bincount(columnas * k + codigos, minlength=nh * k).reshape(nh, k)
+        claves = (columnas[1:] * k + codigos[:-1]) * k + codigos[1:]
+        model.secuencial = np.bincount(claves, minlength=nh * k * k).reshape(nh, k, k)
+
+        orden = np.argsort(columnas, kind="stable")
+        por_hora, col = codigos[orden], columnas[orden]
+        misma = col[1:] == col[:-1]
+        claves = (col[1:][misma] * k + por_hora[:-1][misma]) * k + por_hora[1:][misma]
+        model.misma_hora = np.bincount(claves, minlength=nh * k * k).reshape(nh, k, k)
+
+        model.totales = model.secuencial.sum(axis=2)
+        model._ultimo = int(codigos[-1])
+        # Último código visto en cada franja: con el orden estable, el final
+        # de cada grupo de `col` es su sorteo más reciente
+        fin_grupo = np.append(col[1:] != col[:-1], True)
+        ultimo = np.full(nh, -1, dtype=np.int64)
+        ultimo[col[fin_grupo]] = por_hora[fin_grupo]
+        model._ultimo_por_hora = ultimo
+        return model
+
+    # --- Actualización en línea ---
+
+    def _estado(self, draw: Union[int, str]) -> int:
+        if not isinstance(draw, str):
+            return int(draw)
+        i = self._posicion.get(draw)
+        if i is None:
+            i = len(self.estados)
+            self.estados.append(draw)
+            self._posicion[draw] = i
+            self.frecuencias = np.pad(self.frecuencias, ((0, 0), (0, 1)))
+            self.secuencial = np.pad(self.secuencial, ((0, 0), (0, 1), (0, 1)))
+            self.misma_hora = np.pad(self.misma_hora, ((0, 0), (0, 1), (0, 1)))
+            self.totales = np.pad(self.totales, ((0, 0), (0, 1)))
+        return i
+
+    def _hora(self, hora: str) -> int:
+        h = self._columna.get(hora)
+        if h is None:
+            # Franja nueva: se agrega al final (el orden cronológico se rehace al reconstruir)
+            h = len(self.horas)
+            self.horas.append(hora)
+            self._columna[hora] = h
+            self.frecuencias = np.pad(self.frecuencias, ((0, 1), (0, 0)))
+            self.secuencial = np.pad(self.secuencial, ((0, 1), (0, 0), (0, 0)))
+            self.misma_hora = np.pad(self.misma_hora, ((0, 1), (0, 0), (0, 0)))
+            self.totales = np.pad(self.totales, ((0, 1), (0, 0)))
+            self._ultimo_por_hora = np.append(self._ultimo_por_hora, -1)
+        return h
+
+    def add_draw(self, draw: Union[int, str], hora: str) -> None:
+        """Agrega el sorteo más reciente (código o texto) salido a `hora`."""
+        b = self._estado(draw)
+        h = self._hora(hora)
+        self.frecuencias[h, b] += 1
+        if self._ultimo >= 0:
+            self.secuencial[h, self._ultimo, b] += 1
+            self.totales[h, self._ultimo] += 1
+        previo = self._ultimo_por_hora[h]
+        if previo >= 0:
+            self.misma_hora[h, previo, b] += 1
+        self._ultimo = b
+        self._ultimo_por_hora[h] = b
+
+    # --- Consultas ---
+
+    def prob(self, anterior: str, siguiente: str, hora: str) -> float:
+        """P(siguiente a `hora` | anterior) en O(1); 0.0 si no hay datos."""
+        a, b, h = self._posicion.get(anterior), self._posicion.get(siguiente), self._columna.get(hora)
+        if a is None or b is None or h is None or self.totales[h, a] == 0:
+            return 0.0
+        return float(self.secuencial[h, a, b] / self.totales[h, a])
+
+    def next_probs(self, actual: str, hora: str) -> Dict[str, float]:
+        """Distribución del sorteo de `hora` sabiendo que el anterior fue `actual`."""
+        a, h = self._posicion.get(actual), self._columna.get(hora)
+        if a is None or h is None or self.totales[h, a] == 0:
+            return {}
+        fila = self.secuencial[h, a]
+        total = float(self.totales[h, a])
+        return {self.estados[j]: float(fila[j] / total) for j in np.flatnonzero(fila)}
+
+    def marginal(self, mode: str = "sequential", hora: Optional[str] = None) -> MarkovModel:
+        """
+        MarkovModel como reducción del tensor: "sequential" (sin condicionar a
+        la hora) o "same_hour". Con `hora`, solo las transiciones que llegan a
+        esa franja. El tensor no guarda el orden de llegada: los empates del
+        modelo resultante van por código.
+        """
+        if mode == "sequential":
+            tensor = self.secuencial
+        elif mode == "same_hour":
+            tensor = self.misma_hora
+        else:
+            raise ValueError(f"Modo desconocido: {mode}")
+        if hora is None:
+            return MarkovModel.desde_conteos(self.estados, self.frecuencias.sum(axis=0), tensor.sum(axis=0))
+        h = self._columna.get(hora)
+        if h is None:
+            vacio = np.zeros(len(self.estados), dtype=np.int64)
+            return MarkovModel.desde_conteos(self.estados, vacio, np.zeros((len(vacio),) * 2, dtype=np.int64))
+        return MarkovModel.desde_conteos(self.estados, self.frecuencias[h], tensor[h])
+
+
+class MarkovOrdenK:
+    """
+    Cadena de Márkov de orden k (contexto de los k sorteos previos) con
+    almacenamiento disperso y suavizado hacia los órdenes menores.
+
+    Trabaja sobre los códigos canónicos (0..37, ver HistorialData.canonicos).
+    Por cada orden j = 1..k se guardan solo los contextos observados:
+    - `claves[j]`: int64 ordenado, contexto * 38 + siguiente (el contexto es
+      el número en base 38 de los j códigos previos).
+    - `conteos[j]`: veces que se vio cada clave.
+    - `contextos[j]`, `totales[j]`, `distintos[j]`: por contexto, total de
+      transiciones y cantidad de sucesores distintos.
+    La memoria es O(n * k) sin importar 38^k, y las búsquedas son
+    searchsorted sobre arreglos ordenados.
+
+    Suavizado:
+    - "interpolado" (Witten-Bell): P_j(b|h) = (c(h,b) + T(h) P_{j-1}(b|h')) / (c(h) + T(h)),
+      donde h' es el contexto sin su sorteo más antiguo y T(h) los sucesores distintos.
+    - "backoff": la estimación del orden más alto cuyo contexto se observó.
+    El orden 0 es la frecuencia global con suma de uno (Laplace).
+    """
+
+    def __init__(self, codigos: Sequence[int], orden: int = 2, suavizado: str = "interpolado") -> None:
+        if not 1 <= orden <= 4:
+            raise ValueError("El orden debe estar entre 1 y 4")
+        if suavizado not in ("interpolado", "backoff"):
+            raise ValueError(f"Suavizado desconocido: {suavizado}")
+        self.orden = orden
+        self.suavizado = suavizado
+        seq = np.asarray(codigos, dtype=np.int64)
+        validos = seq[seq >= 0]
+        self.unigramas = np.bincount(validos, minlength=NUM_CODIGOS)[:NUM_CODIGOS]
+        self.total_sorteos = int(len(validos))
+
+        self.claves: Dict[int, np.ndarray] = {}
+        self.conteos: Dict[int, np.ndarray] = {}
+        self.contextos: Dict[int, np.ndarray] = {}
+        self.totales: Dict[int, np.ndarray] = {}
+        self.distintos: Dict[int, np.ndarray] = {}
+        for j in range(1, orden + 1):
+            ids, siguiente, ok = self._ventanas(seq, j)
+            claves, conteos = np.unique(ids[ok] * NUM_CODIGOS + siguiente[ok], return_counts=True)
+            contextos, inicio = np.unique(claves // NUM_CODIGOS, return_index=True)
+            self.claves[j] = claves
+            self.conteos[j] = conteos
+            self.contextos[j] = contextos
+            self.totales[j] = np.add.reduceat(conteos, inicio) if len(inicio) else conteos[:0]
+            self.distintos[j] = np.diff(np.append(inicio, len(claves)))
+
+    @staticmethod
+    def _ventanas(seq: np.ndarray, j: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(id de contexto, siguiente, válido) para cada posición con j previos."""
+        n = len(seq) - j
+        if n <= 0:
+            vacio = np.empty(0, dtype=np.int64)
+            return vacio, vacio, np.empty(0, dtype=bool)
+        ids = np.zeros(n, dtype=np.int64)
+        ok = np.ones(n, dtype=bool)
+        for t in range(j + 1):
+            tramo = seq[t:t + n]
+            ok &= tramo >= 0
+            if t < j:
+                ids = ids * NUM_CODIGOS + np.maximum(tramo, 0)
+        return ids, seq[j:], ok
+
+    @classmethod
+    def from_historial(cls, data: HistorialData, orden: int = 2, suavizado: str = "interpolado") -> MarkovOrdenK:
+        return cls(data.canonicos, orden=orden, suavizado=suavizado)
+
+    def _codigos_contexto(self, contextos) -> np.ndarray:
+        """Normaliza a una matriz (m, orden) de códigos; -1 rellena a la izquierda."""
+        filas = []
+        for ctx in contextos:
+            codigos = [decodificar(c) if isinstance(c, str) else int(c) for c in ctx][-self.orden:]
+            codigos = [-1 if c is None else c for c in codigos]
+            filas.append([-1] * (self.orden - len(codigos)) + codigos)
+        return np.array(filas, dtype=np.int64).reshape(-1, self.orden)
+
+    def predict_proba(self, contextos) -> np.ndarray:
+        """
+        Distribución del siguiente sorteo para muchos contextos a la vez.
+
+        `contextos`: matriz (m, orden) de códigos (el último es el más reciente;
+        -1 = desconocido) o lista de secuencias de códigos/textos.
+        Retorna una matriz (m, 38) cuyas filas suman 1.
+        """
+        if isinstance(contextos, np.ndarray) and contextos.ndim == 2 and contextos.shape[1] == self.orden:
+            ctx = contextos.astype(np.int64, copy=False)
+        else:
+            ctx = self._codigos_contexto(contextos)
+        m = len(ctx)
+        unigrama = (self.unigramas + 1.0) / (self.total_sorteos + NUM_CODIGOS)
+        probs = np.broadcast_to(unigrama, (m, NUM_CODIGOS)).copy()
+
+        siguientes = np.arange(NUM_CODIGOS, dtype=np.int64)
+        for j in range(1, self.orden + 1):
+            parte = ctx[:, self.orden - j:]
+            ok = (parte >= 0).all(axis=1)
+            ids = np.zeros(m, dtype=np.int64)
+            for t in range(j):
+                ids = ids * NUM_CODIGOS + np.maximum(parte[:, t], 0)
+
+            contextos_j = self.contextos[j]
+            if len(contextos_j) == 0:
+                continue
+            pos = np.minimum(np.searchsorted(contextos_j, ids), len(contextos_j) - 1)
+            visto = ok & (contextos_j[pos] == ids)
+            if not visto.any():
+                continue
+
+            filas = np.flatnonzero(visto)
+            claves = ids[filas, None] * NUM_CODIGOS + siguientes
+            pos_c = np.searchsorted(self.claves[j], claves)
+            pos_c_ok = np.minimum(pos_c, len(self.claves[j]) - 1)
+            c = np.where(self.claves[j][pos_c_ok] == claves, self.conteos[j][pos_c_ok], 0).astype(float)
+            total = self.totales[j][pos[filas]].astype(float)[:, None]
+
+            if self.suavizado == "interpolado":
+                t_h = self.distintos[j][pos[filas]].astype(float)[:, None]
+                probs[filas] = (c + t_h * probs[filas]) / (total + t_h)
+            else:
+                # Los órdenes se recorren de menor a mayor: gana el más alto observado
+                probs[filas] = c / total
+        return probs
+
+    def next_probs(self, contexto) -> Dict[str, float]:
+        """P(siguiente | contexto) como {animalito: prob} (solo probabilidades > 0)."""
+        fila = self.predict_proba([contexto])[0]
+        return {NOMBRE_POR_CODIGO[i]: float(fila[i]) for i in np.flatnonzero(fila)}
+
+    def top_next(self, contexto, n: int = 5) -> List[Tuple[str, float]]:
+        fila = self.predict_proba([contexto])[0]
+        orden = np.lexsort((np.arange(NUM_CODIGOS), -fila))[:n]
+        return [(NOMBRE_POR_CODIGO[i], float(fila[i])) for i in orden]
+
+    def contextos_de(self, codigos: Sequence[int]) -> np.ndarray:
+        """Contexto previo a cada posición de `codigos` (matriz (n, orden)), para predecir en lote."""
+        seq = np.concatenate([np.full(self.orden, -1, dtype=np.int64), np.asarray(codigos, dtype=np.int64)])
+        n = len(seq) - self.orden
+        return np.stack([seq[t:t + n] for t in range(self.orden)], axis=1)
@@ -0,0 +1,312 @@
+"""
+Sondeo en segundo plano de resultados, guiado por el horario de sorteos.
+
+Uso:
+    python -m src.poller [--loteria "La Granjita" ...] [--db-url postgresql+psycopg2://...]
+
+Proceso independiente de la UI. Fuera de los sorteos duerme hasta el próximo;
+tras cada sorteo consulta la página de resultados en vivo cada
+POLL_INTERVALO_RAPIDO segundos hasta encontrarlo (o hasta que pase
+POLL_VENTANA_POST_SORTEO). Lo nuevo va al archivo local y a la BD, y se
+publica un pequeño archivo de estado por lotería que la UI consulta para
+saber si hay cambios sin descargar nada.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from datetime import time as time_of_day
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+
+from .config import (
+    LOTERIAS,
+    ARCHIVO_DIR,
+    ZONA_HORARIA,
+    POLL_DEMORA_PUBLICACION,
+    POLL_VENTANA_POST_SORTEO,
+    POLL_INTERVALO_RAPIDO,
+    POLL_ESPERA_MAXIMA,
+)
+from .date_utils import hoy_local
+from .historial_archivo import HistorialArchivo, _slug
+from .historial_client import HistorialClient, HistorialData
+from .horas import horario_de, minutos_de_hora, ordenar_horas
+from .http_transport import HttpTransport
+
+logger = logging.getLogger(__name__)
+
+
+# --- Notificación de cambios a la UI ---
+
+def ruta_estado(loteria: str, directorio: str = ARCHIVO_DIR) -> Path:
+    return Path(directorio) / f"{_slug(loteria)}.estado.json"
+
+
+def leer_estado(loteria: str, directorio: str = ARCHIVO_DIR) -> Optional[Dict]:
+    """
+    Estado publicado por el poller: {"version", "latido", "ultimo"}.
+    `version` solo cambia cuando entran sorteos nuevos; `latido` en cada ciclo.
+    """
+    try:
+        with open(ruta_estado(loteria, directorio), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def poller_activo(estado: Optional[Dict], ahora: Optional[float] = None) -> bool:
+    """El poller se considera vivo si su último latido es reciente."""
+    if not estado:
+        return False
+    ahora = time.time() if ahora is None else ahora
+    return ahora - estado.get("latido", 0) <= 2 * POLL_ESPERA_MAXIMA
+
+
+def _escribir_estado(ruta: Path, estado: Dict) -> None:
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=ruta.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(estado, f)
+        os.replace(tmp, ruta)
+    except OSError as e:
+        logger.warning("No se pudo publicar el estado %s: %s", ruta.name, e)
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+# --- Horario ---
+
+class PlanSorteos:
+    """Grilla diaria de sorteos de una lotería en su zona horaria."""
+
+    def __init__(self, horas: List[str], zona: str = ZONA_HORARIA) -> None:
+        self.zona = pytz.timezone(zona)
+        self.horas = ordenar_horas(horas)
+        minutos = [minutos_de_hora(h) for h in self.horas]
+        if None in minutos:
+            raise ValueError(f"Hora de sorteo no válida: {self.horas[minutos.index(None)]}")
+        self._tiempos = [time_of_day(m // 60, m % 60) for m in minutos]
+
+    def sorteos_del_dia(self, dia: date) -> List[Tuple[datetime, str]]:
+        """[(momento del sorteo con zona, hora 'HH:MM AM')] del día."""
+        return [
+            (self.zona.localize(datetime.combine(dia, t)), h)
+            for t, h in zip(self._tiempos, self.horas)
+        ]
+
+    def ultimo_sorteo(self, ahora: datetime) -> Optional[Tuple[datetime, str]]:
+        """Último sorteo ya ocurrido (hoy), o None si aún no hubo ninguno."""
+        ahora = ahora.astimezone(self.zona)
+        previos = [(m, h) for m, h in self.sorteos_del_dia(ahora.date()) if m <= ahora]
+        return previos[-1] if previos else None
+
+    def proximo_sorteo(self, ahora: datetime) -> datetime:
+        """Momento del próximo sorteo estrictamente posterior a `ahora`."""
+        ahora = ahora.astimezone(self.zona)
+        dia = ahora.date()
+        for _ in range(8):
+            for momento, _hora in self.sorteos_del_dia(dia):
+                if momento > ahora:
+                    return momento
+            dia += timedelta(days=1)
+        raise ValueError("Horario de sorteos vacío")
+
+
+# --- Poller ---
+
+@dataclass
+class EstadoLoteria:
+    plan: PlanSorteos
+    cliente: HistorialClient
+    archivo: HistorialArchivo
+    version: int = 0
+
+
+class Poller:
+    """
+    Sondea las loterías según su horario. Cada `ciclo()` revisa qué loterías
+    tienen un sorteo reciente sin resultado, las consulta en paralelo y
+    devuelve cuántos segundos dormir hasta el siguiente ciclo.
+    """
+
+    def __init__(
+        self,
+        loterias: Optional[List[str]] = None,
+        engine=None,
+        archivo_dir: str = ARCHIVO_DIR,
+        transport: Optional[HttpTransport] = None,
+        demora: float = POLL_DEMORA_PUBLICACION,
+        ventana: float = POLL_VENTANA_POST_SORTEO,
+        intervalo_rapido: float = POLL_INTERVALO_RAPIDO,
+        espera_maxima: float = POLL_ESPERA_MAXIMA,
+    ) -> None:
+        self.engine = engine
+        self.archivo_dir = archivo_dir
+        self.demora = demora
+        self.ventana = ventana
+        self.intervalo_rapido = intervalo_rapido
+        self.espera_maxima = espera_maxima
+        self.estados: Dict[str, EstadoLoteria] = {}
+        for nombre in loterias or list(LOTERIAS):
+            cfg = LOTERIAS[nombre]
+            estado = EstadoLoteria(
+                plan=PlanSorteos(horario_de(nombre)),
+                cliente=HistorialClient(base_url=cfg["historial"], transport=transport),
+                archivo=HistorialArchivo(nombre, archivo_dir),
+            )
+            previo = leer_estado(nombre, archivo_dir)
+            estado.version = previo.get("version", 0) if previo else 0
+            self.estados[nombre] = estado
+        self._stop = threading.Event()
+
+    def pendiente(self, nombre: str, ahora: datetime) -> Optional[Tuple[str, str]]:
+        """(fecha, hora) del sorteo reciente que aún no está archivado, si toca buscarlo."""
+        estado = self.estados[nombre]
+        ultimo = estado.plan.ultimo_sorteo(ahora)
+        if ultimo is None:
+            return None
+        momento, hora = ultimo
+        transcurrido = (ahora - momento).total_seconds()
+        if not (self.demora <= transcurrido <= self.demora + self.ventana):
+            return None
+        clave = (momento.strftime("%Y-%m-%d"), hora)
+        if clave in estado.archivo.load().tabla:
+            return None
+        return clave
+
+    def sondear(self, nombre: str) -> int:
+        """Consulta resultados en vivo (o el historial de hoy si falla) y guarda lo nuevo."""
+        estado = self.estados[nombre]
+        cfg = LOTERIAS[nombre]
+        nuevo: Optional[HistorialData] = None
+        try:
+            if cfg.get("resultados"):
+                nuevo = estado.cliente.fetch_resultados_envivo(cfg["resultados"])
+        except Exception as e:
+            logger.warning("[%s] Error scraping en vivo: %s", nombre, e)
+        if nuevo is None or nuevo.total_sorteos == 0:
+            hoy = hoy_local()
+            nuevo = estado.cliente.fetch_historial(hoy, hoy)
+
+        # El archivo relee lo que otro proceso (la UI) haya escrito y fusiona bajo
+        # bloqueo; si no llega hasta ayer se sincroniza antes para no dejar huecos
+        nuevos = estado.archivo.append_en_vivo(nuevo, estado.cliente)
+        if nuevos:
+            logger.info("[%s] %d sorteos nuevos", nombre, nuevos)
+            self._guardar_bd(nombre, nuevo)
+            estado.version += 1
+        return nuevos
+
+    def _guardar_bd(self, nombre: str, data: HistorialData) -> None:
+        if self.engine is None:
+            return
+        import pandas as pd
+        from .repositories import (
+            insertar_sorteos,
+            actualizar_aciertos_predicciones,
+            recalcular_metricas_por_fecha,
+        )
+
+        indice = data.indice
+        rows = [
+            {"fecha": d, "hora": h, "numero": num, "loteria": nombre}
+            for (d, h), num in zip(indice.claves, indice.numeros)
+            if num is not None
+        ]
+        if not rows:
+            return
+        try:
+            insertar_sorteos(self.engine, pd.DataFrame(rows))
+            actualizar_aciertos_predicciones(self.engine)
+            recalcular_metricas_por_fecha(self.engine, "ML_RandomForest")
+            recalcular_metricas_por_fecha(self.engine, "Recomendador")
+        except Exception as e:
+            logger.warning("[%s] Error guardando en BD: %s", nombre, e)
+
+    def _publicar(self, nombre: str) -> None:
+        estado = self.estados[nombre]
+        _escribir_estado(ruta_estado(nombre, self.archivo_dir), {
+            "version": estado.version,
+            "latido": time.time(),
+            "ultimo": estado.archivo.ultimo(),
+        })
+
+    def ciclo(self, ahora: Optional[datetime] = None) -> float:
+        """Un paso del bucle. Retorna los segundos a dormir."""
+        ahora = ahora or datetime.now(pytz.utc)
+        pendientes = {n: p for n in self.estados if (p := self.pendiente(n, ahora)) is not None}
+
+        if pendientes:
+            with ThreadPoolExecutor(max_workers=len(pendientes), thread_name_prefix="poller") as pool:
+                futuros = {n: pool.submit(self.sondear, n) for n in pendientes}
+            for nombre, futuro in futuros.items():
+                try:
+                    futuro.result()
+                except Exception as e:
+                    logger.warning("[%s] Error de sondeo: %s", nombre, e)
+
+        for nombre in self.estados:
+            self._publicar(nombre)
+
+        return self.espera(ahora)
+
+    def espera(self, ahora: datetime) -> float:
+        """Rápido si alguna lotería sigue esperando un sorteo; si no, hasta el próximo."""
+        if any(self.pendiente(n, ahora) is not None for n in self.estados):
+            return self.intervalo_rapido
+        proximo = min(e.plan.proximo_sorteo(ahora) for e in self.estados.values())
+        hasta = (proximo - ahora).total_seconds() + self.demora
+        return max(1.0, min(self.espera_maxima, hasta))
+
+    def run(self) -> None:
+        logger.info("Poller iniciado para: %s", ", ".join(self.estados))
+        while not self._stop.is_set():
+            try:
+                espera = self.ciclo()
+            except Exception as e:
+                logger.exception("Error en el ciclo del poller: %s", e)
+                espera = self.intervalo_rapido
+            logger.debug("Durmiendo %.0fs", espera)
+            self._stop.wait(espera)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s - %(message)s")
+    ap = argparse.ArgumentParser(description="Sondeo de resultados guiado por el horario de sorteos.")
+    ap.add_argument("--loteria", action="append", choices=list(LOTERIAS),
+                    help="Lotería a sondear (repetible). Por defecto todas.")
+    ap.add_argument("--db-url", default=os.environ.get("DATABASE_URL"),
+                    help="URL SQLAlchemy de la BD (o DATABASE_URL). Sin ella solo se actualiza el archivo.")
+    args = ap.parse_args()
+
+    engine = None
+    if args.db_url:
+        from sqlalchemy import create_engine
+        engine = create_engine(args.db_url, pool_pre_ping=True)
+
+    poller = Poller(loterias=args.loteria, engine=engine)
+    try:
+        poller.run()
+    except KeyboardInterrupt:
+        poller.stop()
+
+
+if __name__ == "__main__":
+    main()
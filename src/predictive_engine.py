@@ -3,7 +3,9 @@ import numpy as np
 from datetime import datetime, timedelta
 from collections import Counter, defaultdict
 from sqlalchemy import text
-from src.constantes import ANIMALITOS, SECTORES, COLORES
+from src.codigos import numero_de
+from src.constantes import ANIMALITOS, CODIGO_00, SECTORES, COLORES
+from src.date_utils import fecha_a_ordinal
 from src.model import MarkovModel
 from src.db import get_engine
 
@@ -48,27 +50,20 @@ class PredictiveEngine:
         # 2. Guardar Markov
         if self.markov_model and self.markov_model.transitions:
             markov_data = []
-            # Calcular probabilidades normalizadas por estado origen
-            transitions_by_origin = defaultdict(float)
-            for (prev, _), count in self.markov_model.transitions.items():
-                transitions_by_origin[prev] += count
-            
-            name_to_code = {v: k for k, v in ANIMALITOS.items()}
-
-            for (prev, curr), count in self.markov_model.transitions.items():
-                total = transitions_by_origin[prev]
-                if total > 0:
-                    prob = count / total
-                    code_prev = name_to_code.get(prev)
-                    code_curr = name_to_code.get(curr)
-                    
-                    if code_prev and code_curr:
-                        markov_data.append({
-                            "estado_origen": int(code_prev),
-                            "estado_destino": int(code_curr),
-                            "probabilidad": float(prob),
-                            "fecha_calculo": datetime.now()
-                        })
+            # Probabilidades normalizadas por estado origen (filas de la matriz)
+            model = self.markov_model
+            probs = model.filas_normalizadas()
+            for prev, curr in zip(*np.nonzero(model.conteos)):
+                code_prev = numero_de(model.estados[prev])
+                code_curr = numero_de(model.estados[curr])
+
+                if code_prev and code_curr:
+                    markov_data.append({
+                        "estado_origen": int(code_prev),
+                        "estado_destino": int(code_curr),
+                        "probabilidad": float(probs[prev, curr]),
+                        "fecha_calculo": datetime.now()
+                    })
             
             if markov_data:
                 df_markov = pd.DataFrame(markov_data)
@@ -100,23 +95,23 @@ class PredictiveEngine:
         
         # Vamos a hacer un barrido completo pero solo guardamos filas si fecha >= start_date_limit
         
-        history_events = []
-        for d in sorted_dates:
-            for h in self.data.horas:
-                val = self.data.tabla.get((d, h))
-                if val:
-                    history_events.append({
-                        "fecha": d,
-                        "hora": h,
-                        "animal": val,
-                        "dt": datetime.strptime(f"{d} {h}", "%Y-%m-%d %I:%M %p") # Ajustar formato hora si es necesario
-                    })
-        
-        # Ordenar por datetime
-        # Asumimos formato hora compatible o usamos orden de inserción si ya viene ordenado
-        # self.data.horas suele estar ordenado.
+        # El índice ya viene en orden cronológico y trae el minuto del día
+        indice = self.data.indice
+        history_events = [
+            {
+                "fecha": d,
+                "hora": h,
+                "animal": val,
+                "numero": num,
+                "dt": datetime.fromordinal(o) + timedelta(minutes=m),
+            }
+            for d, h, val, num, o, m in zip(
+                indice.fechas, indice.horas, indice.valores, indice.numeros,
+                indice.dia_ordinal.tolist(), indice.minutos.tolist(),
+            )
+        ]
         
-        name_to_code = {v: k for k, v in ANIMALITOS.items()}
+        codigos_candidatos = list(ANIMALITOS) # "0", "00", "1"...
         
         # Estado incremental
         last_seen = {} # code -> index del evento
@@ -134,8 +129,7 @@ class PredictiveEngine:
         total_events = len(history_events)
         
         for idx, event in enumerate(history_events):
-            current_animal_name = event['animal']
-            current_animal_code = name_to_code.get(current_animal_name)
+            current_animal_code = event['numero']
             
             if not current_animal_code:
                 continue
@@ -149,10 +143,10 @@ class PredictiveEngine:
                 # Pre-calcular totales para Markov
                 total_trans_from_last = 0
                 if last_animal_code:
-                    for target_code in name_to_code.values(): # Iterar posibles destinos
+                    for target_code in codigos_candidatos: # Iterar posibles destinos
                          total_trans_from_last += transitions[(last_animal_code, target_code)]
                 
-                for code_candidate in name_to_code.values(): # "0", "00", "1"...
+                for code_candidate in codigos_candidatos:
                     # Feature: Atraso
                     # Cuántos sorteos han pasado desde la última vez
                     last_idx = last_seen.get(code_candidate)
@@ -253,26 +247,17 @@ class PredictiveEngine:
         # Construir matriz de presencia diaria (filas=días, cols=números)
         # 1 si salió ese día, 0 si no
         dias = sorted(self.data.dias)
-        matrix = []
-        
-        # Mapeo inverso nombre -> codigo
-        name_to_code = {v: k for k, v in ANIMALITOS.items()}
-        
-        for d in dias:
-            row = [0] * 37 # 0-36
-            for h in self.data.horas:
-                val = self.data.tabla.get((d, h))
-                if val:
-                    code_str = name_to_code.get(val)
-                    if code_str:
-                        try:
-                            row[int(code_str)] = 1
-                        except:
-                            pass
-            matrix.append(row)
-            
-        if not matrix:
+        if not dias:
             return pd.DataFrame()
+
+        indice = self.data.indice
+        fila_por_dia = {fecha_a_ordinal(d): i for i, d in enumerate(dias)}
+        matrix = np.zeros((len(dias), 37), dtype=int) # 0-36 ("00" cuenta en la columna 0)
+        validos = indice.codigo_numero >= 0
+        for o, c in zip(indice.dia_ordinal[validos].tolist(), indice.codigo_numero[validos].tolist()):
+            fila = fila_por_dia.get(o)
+            if fila is not None:
+                matrix[fila, c if c < CODIGO_00 else 0] = 1
             
         df_presence = pd.DataFrame(matrix, columns=[str(i) for i in range(37)])
         # Calcular correlación de Pearson
@@ -299,21 +284,18 @@ class PredictiveEngine:
         # Frequencies
         freq_counter = Counter(self.data.tabla.values())
         
+        indice = self.data.indice
+
         # Last 10 days freq (Hotness)
         last_10_days = sorted_dates[-10:]
-        freq_10 = Counter()
-        for d in last_10_days:
-            for h in self.data.horas:
-                val = self.data.tabla.get((d, h))
-                if val: freq_10[val] += 1
+        desde, _ = indice.rango_dia(last_10_days[0])
+        freq_10 = Counter(indice.valores[desde:])
         
-        # Atrasos
-        last_seen = {}
-        for d in reversed(sorted_dates):
-            for h in reversed(self.data.horas):
-                val = self.data.tabla.get((d, h))
-                if val and val not in last_seen:
-                    last_seen[val] = datetime.strptime(d, "%Y-%m-%d")
+        # Atrasos: última fecha en que salió cada valor
+        ultima_fecha = {}
+        for d, val in zip(indice.fechas, indice.valores):
+            ultima_fecha[val] = d
+        last_seen = {val: datetime.strptime(d, "%Y-%m-%d") for val, d in ultima_fecha.items()}
         
         # Calculate features for each number
         for code, name in ANIMALITOS.items():
@@ -447,11 +429,10 @@ class PredictiveEngine:
         sorted_dates = sorted(self.data.dias)
         if sorted_dates:
             last_date = sorted_dates[-1]
-            # Buscar la última hora con dato
-            for h in reversed(self.data.horas):
-                if (last_date, h) in self.data.tabla:
-                    last_animal = self.data.tabla[(last_date, h)]
-                    break
+            # Último sorteo con dato de ese día
+            i, j = self.data.indice.rango_dia(last_date)
+            if j > i:
+                last_animal = self.data.indice.valores[j - 1]
         
         markov_candidates = []
         if last_animal:
@@ -465,9 +446,8 @@ class PredictiveEngine:
             # Ordenar por probabilidad
             probs.sort(key=lambda x: x[1], reverse=True)
             
-            name_to_code = {v: k for k, v in ANIMALITOS.items()}
             for name, prob in probs[:6]:
-                code = name_to_code.get(name)
+                code = numero_de(name)
                 if code:
                     markov_candidates.append(int(code))
 
@@ -507,23 +487,10 @@ class PredictiveEngine:
             # Esto requeriría un análisis rápido del historial para target_time
             
             # Contar frecuencias a esta hora
-            hour_counts = Counter()
-            for d in self.data.dias:
-                # Buscar coincidencia aproximada de hora
-                for h_str in self.data.horas:
-                    # Parsear h_str
-                    try:
-                        h_dt = datetime.strptime(h_str, "%I:%M %p").time()
-                        if h_dt.hour == target_time.hour:
-                            val = self.data.tabla.get((d, h_str))
-                            if val:
-                                # Extraer nombre animal
-                                for k, v in ANIMALITOS.items():
-                                    if val.startswith(f"{k} ") or val == k or v in val:
-                                        hour_counts[k] += 1
-                                        break
-                    except:
-                        pass
+            # Coincidencia aproximada de hora: misma hora del día (minuto // 60)
+            indice = self.data.indice
+            misma_hora = np.flatnonzero((indice.minutos // 60 == target_time.hour) & (indice.codigo_numero >= 0))
+            hour_counts = Counter(indice.numeros[i] for i in misma_hora.tolist())
             
             top_hour = [int(k) for k, v in hour_counts.most_common(3)]
             sexteto_intra.extend(top_hour)
@@ -6,7 +6,7 @@ from collections import Counter
 from datetime import datetime, timedelta
 
 from src.historial_client import HistorialData
-from src.constantes import SECTORES, ANIMALITOS
+from src.constantes import SECTORES
 from src.atrasos import AnalizadorAtrasos
 
 class RadarAnalyzer:
@@ -16,20 +16,7 @@ class RadarAnalyzer:
         self.atrasos_analyzer = AnalizadorAtrasos(historial)
 
     def _prepare_dataframe(self):
-        rows = []
-        for dia in self.historial.dias:
-            for hora in self.historial.horas:
-                key = (dia, hora)
-                if key in self.historial.tabla:
-                    full_str = self.historial.tabla[key]
-                    found = None
-                    for k, v in ANIMALITOS.items():
-                        if full_str.startswith(f"{k} ") or full_str == k or v in full_str:
-                            found = k
-                            break
-                    if found:
-                        rows.append({"fecha": dia, "hora": hora, "numero": found})
-        return pd.DataFrame(rows)
+        return self.historial.indice.dataframe()
 
     def get_sector_metrics(self, df_subset: pd.DataFrame, metric_type: str = "Frecuencia") -> Dict[str, float]:
         """Calcula métricas por sector para el radar."""
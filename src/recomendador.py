@@ -1,17 +1,21 @@
 from __future__ import annotations
+from collections import Counter, deque
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Deque, Dict, List, Optional, Tuple
 import logging
 
 from .constantes import ANIMALITOS, SECTORES, DOCENAS, COLUMNAS
-from .historial_client import HistorialData
-from .atrasos import AnalizadorAtrasos
+from .historial_client import HistorialData, HistorialView
+from .atrasos import AnalizadorAtrasos, AtrasoInfo
 from .model import MarkovModel
 from .tablero import TableroAnalizer
 from .patrones import GestorPatrones
 
 logger = logging.getLogger(__name__)
 
+# Sorteos recientes con los que se mide la cobertura de sectores
+VENTANA_TABLERO = 24
+
 @dataclass
 class ScoreItem:
     numero: str
@@ -32,6 +36,15 @@ class ScoreItem:
     sector_info: str
     patron_info: str
 
+@dataclass
+class EntradasScore:
+    """Insumos del score ya calculados sobre el historial (ver Recomendador.entradas)."""
+    freq_counter: Counter
+    atrasos: List[AtrasoInfo]
+    markov_probs: Dict[str, float]
+    sector_coverage: Dict[str, float]
+    resultados_dia_actual: List[Tuple[str, str]]
+
 class Recomendador:
     def __init__(self, data: HistorialData, gestor_patrones: GestorPatrones):
         self.data = data
@@ -43,14 +56,15 @@ class Recomendador:
                         peso_markov: float = 0.3,
                         peso_sector: float = 0.1,
                         peso_patron: float = 0.1) -> List[ScoreItem]:
-        
-        scores = []
-        
+        return self.puntuar(
+            self.entradas(), self.gestor_patrones,
+            peso_frecuencia, peso_atraso, peso_markov, peso_sector, peso_patron,
+        )
+
+    def entradas(self) -> EntradasScore:
         # 1. Obtener datos base
         # Frecuencias
-        from collections import Counter
         freq_counter = Counter(self.data.tabla.values())
-        max_freq = max(freq_counter.values()) if freq_counter else 1
         
         # Atrasos
         # Necesitamos fecha fin, asumimos la última del historial o hoy
@@ -60,8 +74,6 @@ class Recomendador:
             fecha_fin = "2099-12-31" # Fallback
             
         atrasos = AnalizadorAtrasos.analizar(self.data, fecha_fin)
-        atrasos_map = {item.animal: item for item in atrasos}
-        max_dias_atraso = max((item.dias_sin_salir for item in atrasos if not item.nunca_salio), default=1)
         
         # Markov
         # Necesitamos el último animal salido para predecir el siguiente
@@ -83,7 +95,7 @@ class Recomendador:
 
         # Sectores
         # Analizamos últimos 24 sorteos para ver sectores calientes
-        stats_tablero = TableroAnalizer.analizar_todos(self.data, 24)
+        stats_tablero = TableroAnalizer.analizar_todos(self.data, VENTANA_TABLERO)
         # Mapa de cobertura de sectores: NombreSector -> Cobertura
         sector_coverage = {s.nombre: s.porcentaje_cobertura for s in stats_tablero["Sectores"]}
         
@@ -92,21 +104,31 @@ class Recomendador:
         # Necesitamos los resultados del día actual para ver qué patrones están activos
         resultados_dia_actual = []
         if self.data.dias:
-            dia_actual = self.data.dias[-1]
-            for hora in self.data.horas:
-                key = (dia_actual, hora)
-                if key in self.data.tabla:
-                    val = self.data.tabla[key]
-                    # Extraer número
-                    num = None
-                    for k, v in ANIMALITOS.items():
-                        if val.startswith(f"{k} ") or val == k or v in val:
-                            num = k
-                            break
-                    if num:
-                        resultados_dia_actual.append((hora, num))
-        
-        estados_patrones = self.gestor_patrones.procesar_dia(resultados_dia_actual)
+            resultados_dia_actual = self.data.indice.del_dia(self.data.dias[-1])
+
+        return EntradasScore(freq_counter, atrasos, markov_probs, sector_coverage, resultados_dia_actual)
+
+    @staticmethod
+    def puntuar(entradas: EntradasScore,
+                gestor_patrones: GestorPatrones,
+                peso_frecuencia: float = 0.2,
+                peso_atraso: float = 0.3,
+                peso_markov: float = 0.3,
+                peso_sector: float = 0.1,
+                peso_patron: float = 0.1) -> List[ScoreItem]:
+        """Combina los insumos en el score de cada animalito (ordenado de mayor a menor)."""
+        scores = []
+
+        freq_counter = entradas.freq_counter
+        max_freq = max(freq_counter.values()) if freq_counter else 1
+
+        atrasos = entradas.atrasos
+        atrasos_map = {item.animal: item for item in atrasos}
+        max_dias_atraso = max((item.dias_sin_salir for item in atrasos if not item.nunca_salio), default=1)
+
+        markov_probs = entradas.markov_probs
+        sector_coverage = entradas.sector_coverage
+        estados_patrones = gestor_patrones.procesar_dia(entradas.resultados_dia_actual)
         
         # Mapa de bonus por patrón: Numero -> Bonus
         patron_bonus = {}
@@ -207,3 +229,76 @@ class Recomendador:
         scores.sort(key=lambda x: x.score_total, reverse=True)
         
         return scores
+
+
+class RecomendadorIncremental:
+    """
+    Recomendador que avanza sorteo a sorteo sobre un historial (walk-forward).
+
+    Mantiene en línea lo que `Recomendador` recalcula desde cero en cada
+    llamada: frecuencias, última aparición de cada valor, el modelo de
+    Márkov, los últimos números para la cobertura de sectores y los
+    resultados del día en curso. Tras `avanzar()` hasta el sorteo n,
+    `calcular_scores` da lo mismo que
+    `Recomendador(HistorialView(data, upto=n), gestor).calcular_scores()`.
+    """
+
+    def __init__(self, data: HistorialData, gestor_patrones: GestorPatrones, upto: int = 0):
+        self.data = data
+        self.gestor_patrones = gestor_patrones
+        indice = data.indice
+        self._valores = indice.valores
+        self._numeros = indice.numeros
+        self._fechas = indice.fechas
+        self._horas = indice.horas
+        self._codigos = data.codigos
+
+        self.n = 0
+        self.freq_counter: Counter = Counter()
+        self.ultimas: Dict[str, Tuple[int, str]] = {}
+        self.ultimos: Deque[str] = deque(maxlen=VENTANA_TABLERO)
+        self.resultados_dia: List[Tuple[str, str]] = []
+        self._dia: Optional[str] = None
+
+        self.markov = MarkovModel.from_historial(HistorialView(data, upto=upto), mode="sequential")
+        for i in range(upto):
+            self._registrar(i)
+        self.n = upto
+
+    def _registrar(self, i: int) -> None:
+        valor, fecha, numero = self._valores[i], self._fechas[i], self._numeros[i]
+        self.freq_counter[valor] += 1
+        self.ultimas[valor] = (i, fecha)
+        if fecha != self._dia:
+            self._dia = fecha
+            self.resultados_dia = []
+        if numero is not None:
+            self.ultimos.append(numero)
+            self.resultados_dia.append((self._horas[i], numero))
+
+    def avanzar(self) -> None:
+        """Incorpora el siguiente sorteo del historial."""
+        self._registrar(self.n)
+        self.markov.add_draw(int(self._codigos[self.n]))
+        self.n += 1
+
+    def entradas(self) -> EntradasScore:
+        fecha_fin = self._dia if self._dia is not None else "2099-12-31"
+        atrasos = AnalizadorAtrasos.desde_ultimas(self.ultimas, self.n, fecha_fin)
+
+        markov_probs = {}
+        ultimo_animal_nombre = ANIMALITOS.get(self.ultimos[-1], "") if self.ultimos else ""
+        if ultimo_animal_nombre:
+            try:
+                markov_probs = self.markov.next_probs(ultimo_animal_nombre)
+            except Exception as e:
+                logger.warning(f"Error calculando Markov: {e}")
+
+        stats_tablero = TableroAnalizer.analizar_ultimos(list(self.ultimos))
+        sector_coverage = {s.nombre: s.porcentaje_cobertura for s in stats_tablero["Sectores"]}
+        return EntradasScore(
+            Counter(self.freq_counter), atrasos, markov_probs, sector_coverage, list(self.resultados_dia)
+        )
+
+    def calcular_scores(self, **pesos: float) -> List[ScoreItem]:
+        return Recomendador.puntuar(self.entradas(), self.gestor_patrones, **pesos)
@@ -0,0 +1,316 @@
+"""
+Grabación y reproducción offline de las páginas de Lotoven.
+
+Uso:
+    python -m src.replay grabar --loteria "La Granjita" --start 2025-01-01 --end 2025-03-01 --corpus data/corpus
+    python -m src.replay sintetico --start 2025-01-01 --end 2025-03-01 --corpus data/corpus
+    python -m src.replay servir --corpus data/corpus --latencia 0.05 --errores 0.1
+
+`grabar` descarga historial y resultados en vivo de una lotería y guarda cada
+respuesta en un corpus en disco. `servir` levanta un servidor HTTP local que
+responde desde el corpus, con latencia y errores 503 configurables, para
+probar y medir HistorialClient sin tocar lotoven.com.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from .config import LOTERIAS
+from .constantes import ANIMALITOS
+from .http_transport import HttpTransport
+
+logger = logging.getLogger(__name__)
+
+
+def clave_url(url: str) -> str:
+    """'https://lotoven.com/a/b/' -> 'lotoven.com/a/b/' (sin esquema ni query)."""
+    partes = urlsplit(url)
+    return f"{partes.netloc}{partes.path}"
+
+
+class Corpus:
+    """
+    Páginas grabadas en un directorio: un .html por URL más un index.json
+    que asocia la URL (host + ruta) con su archivo.
+    """
+
+    def __init__(self, directorio: str) -> None:
+        self.directorio = Path(directorio)
+        self._lock = threading.Lock()
+        self._indice: Dict[str, str] = {}
+        ruta_indice = self.directorio / "index.json"
+        if ruta_indice.exists():
+            with open(ruta_indice, "r", encoding="utf-8") as f:
+                self._indice = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self._indice)
+
+    def __contains__(self, url: str) -> bool:
+        return clave_url(url) in self._indice
+
+    def get(self, url: str) -> Optional[str]:
+        nombre = self._indice.get(clave_url(url))
+        if nombre is None:
+            return None
+        return (self.directorio / nombre).read_text(encoding="utf-8")
+
+    def put(self, url: str, html: str) -> None:
+        clave = clave_url(url)
+        nombre = f"{hashlib.sha1(clave.encode('utf-8')).hexdigest()}.html"
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        (self.directorio / nombre).write_text(html, encoding="utf-8")
+        with self._lock:
+            self._indice[clave] = nombre
+            self._guardar_indice()
+
+    def _guardar_indice(self) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._indice, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp, self.directorio / "index.json")
+
+
+class RecordingTransport(HttpTransport):
+    """Transporte que además guarda en el corpus cada respuesta correcta."""
+
+    def __init__(self, corpus: Corpus, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.corpus = corpus
+
+    def get(self, url: str, timeout: Optional[float] = None) -> requests.Response:
+        resp = super().get(url, timeout=timeout)
+        self.corpus.put(url, resp.text)
+        return resp
+
+
+def grabar(loteria: str, start_date: str, end_date: str, corpus: Corpus) -> int:
+    """
+    Descarga historial y resultados en vivo de `loteria` grabándolos. Se graban
+    las páginas de ambos modos (secuencial y concurrente) para poder
+    reproducir los dos. Retorna los sorteos vistos.
+    """
+    from .historial_client import HistorialClient
+
+    cfg = LOTERIAS[loteria]
+    client = HistorialClient(base_url=cfg["historial"], transport=RecordingTransport(corpus))
+    data = client.fetch_historial(start_date, end_date)
+    client.fetch_historial(start_date, end_date, concurrent=True)
+    if cfg.get("resultados"):
+        data.merge(client.fetch_resultados_envivo(cfg["resultados"]))
+    return data.total_sorteos
+
+
+# --- Corpus sintético (mismo formato de página que Lotoven) ---
+
+_HORAS_SINTETICAS = [f"{h:02d}:00 AM" for h in range(8, 12)] + [f"{h:02d}:00 PM" for h in (12, 1, 2, 3, 4, 5, 6, 7)]
+
+
+def _pagina_historial(dias, tabla: Dict) -> str:
+    filas = ["<tr><th>Horario</th>" + "".join(f"<th>{d}</th>" for d in dias) + "</tr>"]
+    for hora in _HORAS_SINTETICAS:
+        celdas = "".join("<td>{} {}</td>".format(*tabla[(d, hora)]) for d in dias)
+        filas.append(f"<tr><td>{hora}</td>{celdas}</tr>")
+    return "<html><body><table>" + "".join(filas) + "</table></body></html>"
+
+
+def _pagina_resultados(rng: random.Random) -> str:
+    animales = list(ANIMALITOS.items())
+    tarjetas = []
+    for hora in _HORAS_SINTETICAS:
+        num, nombre = rng.choice(animales)
+        tarjetas.append(f'<div class="card"><div class="card-body"><h5>{num} {nombre}</h5><p><small>{hora}</small></p></div></div>')
+    return "<html><body><div class=\"resultados\">" + "".join(tarjetas) + "</div></body></html>"
+
+
+def generar_sintetico(corpus: Corpus, loteria: str, start_date: str, end_date: str, semilla: int = 0) -> int:
+    """
+    Genera las páginas que HistorialClient pediría para [start_date, end_date]:
+    la paginación semanal del modo secuencial (desde start_date hasta end_date),
+    las ventanas de 7 días del modo concurrente y la página de resultados.
+    Todas muestran los mismos sorteos. Retorna las páginas generadas.
+    """
+    from .historial_client import HistorialClient
+
+    cfg = LOTERIAS[loteria]
+    rng = random.Random(semilla)
+    animales = list(ANIMALITOS.items())
+    inicio = datetime.strptime(start_date, "%Y-%m-%d").date()
+    fin = datetime.strptime(end_date, "%Y-%m-%d").date()
+    todos = [(inicio + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((fin - inicio).days + 1)]
+    tabla = {(d, h): rng.choice(animales) for d in todos for h in _HORAS_SINTETICAS}
+
+    urls: Dict[str, list] = {}
+    for i in range(0, len(todos), 7):
+        # Secuencial: el sitio devuelve hasta 7 días desde el inicio pedido
+        urls[cfg["historial"].format(start=todos[i], end=end_date)] = todos[i:i + 7]
+    for desde, hasta in HistorialClient._ventanas_semanales(start_date, end_date):
+        urls[cfg["historial"].format(start=desde, end=hasta)] = [d for d in todos if desde <= d <= hasta]
+
+    for url, dias in urls.items():
+        corpus.put(url, _pagina_historial(dias, tabla))
+    paginas = len(urls)
+    if cfg.get("resultados"):
+        corpus.put(cfg["resultados"], _pagina_resultados(rng))
+        paginas += 1
+    return paginas
+
+
+# --- Servidor local ---
+
+class ServidorReplay:
+    """
+    Servidor HTTP local que responde desde un Corpus.
+
+    - latencia (+ jitter uniforme) en segundos antes de cada respuesta.
+    - tasa_error: probabilidad de responder 503 (determinista con `semilla`).
+    Las URLs se traducen con `url()`: https://host/ruta -> http://127.0.0.1:puerto/host/ruta.
+    """
+
+    def __init__(
+        self,
+        corpus: Corpus,
+        latencia: float = 0.0,
+        jitter: float = 0.0,
+        tasa_error: float = 0.0,
+        semilla: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.corpus = corpus
+        self.latencia = latencia
+        self.jitter = jitter
+        self.tasa_error = tasa_error
+        self._rng = random.Random(semilla)
+        self._lock = threading.Lock()
+        self.servidas = 0
+        self.errores = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def base(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def url(self, url_real: str) -> str:
+        """Traduce una URL (o plantilla) de Lotoven a la del servidor local."""
+        partes = url_real.split("://", 1)
+        return self.base + (partes[1] if len(partes) == 2 else partes[0])
+
+    def _sortear(self):
+        with self._lock:
+            demora = self.latencia + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            falla = self.tasa_error > 0 and self._rng.random() < self.tasa_error
+            if falla:
+                self.errores += 1
+        return demora, falla
+
+    def _contar_servida(self) -> None:
+        with self._lock:
+            self.servidas += 1
+
+    def _handler(self):
+        servidor = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                demora, falla = servidor._sortear()
+                if demora > 0:
+                    time.sleep(demora)
+                if falla:
+                    self._responder(503, "Servicio no disponible (inyectado)")
+                    return
+                html = servidor.corpus.get(self.path.lstrip("/"))
+                if html is None:
+                    self._responder(404, "No grabado")
+                    return
+                servidor._contar_servida()
+                self._responder(200, html)
+
+            def _responder(self, status: int, cuerpo: str):
+                datos = cuerpo.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, format, *args):
+                logger.debug("replay: " + format, *args)
+
+        return _Handler
+
+    def start(self) -> ServidorReplay:
+        self._hilo = threading.Thread(target=self._httpd.serve_forever, name="replay", daemon=True)
+        self._hilo.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> ServidorReplay:
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s - %(message)s")
+    ap = argparse.ArgumentParser(description="Grabación/reproducción offline de Lotoven.")
+    sub = ap.add_subparsers(dest="comando", required=True)
+
+    for nombre in ("grabar", "sintetico"):
+        p = sub.add_parser(nombre)
+        p.add_argument("--loteria", default="La Granjita", choices=list(LOTERIAS))
+        p.add_argument("--start", required=True)
+        p.add_argument("--end", required=True)
+        p.add_argument("--corpus", required=True)
+
+    p = sub.add_parser("servir")
+    p.add_argument("--corpus", required=True)
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--latencia", type=float, default=0.0)
+    p.add_argument("--jitter", type=float, default=0.0)
+    p.add_argument("--errores", type=float, default=0.0, help="Probabilidad de responder 503")
+
+    args = ap.parse_args()
+    corpus = Corpus(args.corpus)
+
+    if args.comando == "grabar":
+        total = grabar(args.loteria, args.start, args.end, corpus)
+        print(f"Grabadas {len(corpus)} páginas ({total} sorteos) en {args.corpus}")
+    elif args.comando == "sintetico":
+        paginas = generar_sintetico(corpus, args.loteria, args.start, args.end)
+        print(f"Generadas {paginas} páginas en {args.corpus}")
+    else:
+        servidor = ServidorReplay(corpus, args.latencia, args.jitter, args.errores, port=args.port)
+        print(f"Sirviendo {len(corpus)} páginas en {servidor.base} (Ctrl+C para salir)")
+        with servidor:
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == "__main__":
+    main()
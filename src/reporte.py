@@ -5,6 +5,7 @@ from collections import Counter
 from datetime import datetime
 
 from .historial_client import HistorialData
+from .codigos import numero_de
 from .constantes import ANIMALITOS, SECTORES, DOCENAS, COLUMNAS
 from .atrasos import AnalizadorAtrasos
 from .tablero import TableroAnalizer
@@ -42,7 +43,7 @@ class GeneradorReporte:
         top_calientes = []
         for nombre, count in freq.most_common(5):
             # Buscar numero
-            num = next((k for k, v in ANIMALITOS.items() if v == nombre), "?")
+            num = numero_de(nombre) or "?"
             pct = (count / total * 100) if total > 0 else 0
             top_calientes.append({
                 "numero": num,
@@ -59,7 +60,7 @@ class GeneradorReporte:
         top_frios = []
         for item in atrasos_sorted[:5]:
             if item.nunca_salio: continue
-            num = next((k for k, v in ANIMALITOS.items() if v == item.animal), "?")
+            num = numero_de(item.animal) or "?"
             top_frios.append({
                 "numero": num,
                 "nombre": item.animal,
@@ -72,19 +73,7 @@ class GeneradorReporte:
         patrones_activos = []
         if self.data.dias:
             dia_analisis = self.data.dias[-1]
-            resultados_dia = []
-            for hora in self.data.horas:
-                key = (dia_analisis, hora)
-                if key in self.data.tabla:
-                    val = self.data.tabla[key]
-                    # Extraer número
-                    num = None
-                    for k, v in ANIMALITOS.items():
-                        if val.startswith(f"{k} ") or val == k or v in val:
-                            num = k
-                            break
-                    if num:
-                        resultados_dia.append((hora, num))
+            resultados_dia = self.data.indice.del_dia(dia_analisis)
             
             estados = self.gestor_patrones.procesar_dia(resultados_dia)
             
@@ -123,16 +112,7 @@ class GeneradorReporte:
         sectores_info.sort(key=lambda x: x["cobertura"], reverse=True)
         
         # Construir historial plano para Markov
-        historial_plano = []
-        for dia in self.data.dias:
-            for hora in self.data.horas:
-                key = (dia, hora)
-                if key in self.data.tabla:
-                    val = self.data.tabla[key]
-                    for k, v in ANIMALITOS.items():
-                        if val.startswith(f"{k} ") or val == k or v in val:
-                            historial_plano.append(k)
-                            break
+        historial_plano = [n for n in self.data.indice.numeros if n is not None]
 
         # 6. Markov
         markov_data = {}
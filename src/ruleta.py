@@ -4,7 +4,8 @@ import pandas as pd
 from collections import Counter
 from typing import List, Dict, Optional, Set
 
-from src.constantes import ANIMALITOS, COLORES, SECTORES, DOCENAS, COLUMNAS
+from src.codigos import numero_de
+from src.constantes import COLORES, SECTORES, DOCENAS, COLUMNAS
 from src.historial_client import HistorialData
 
 # Orden de la Ruleta Americana (0 y 00 opuestos)
@@ -21,23 +22,11 @@ class RouletteVisualizer:
 
     def _extract_number(self, full_str: str) -> Optional[str]:
         """Extrae el número de la cadena de resultado (ej: '0 Delfín' -> '0')."""
-        for k, v in ANIMALITOS.items():
-            if full_str.startswith(f"{k} ") or full_str == k or v in full_str:
-                return k
-        return None
+        return numero_de(full_str)
 
     def _prepare_dataframe(self) -> List[str]:
         """Convierte el historial en una lista plana de resultados."""
-        resultados = []
-        for dia in self.historial.dias:
-            for hora in self.historial.horas:
-                key = (dia, hora)
-                if key in self.historial.tabla:
-                    full_str = self.historial.tabla[key]
-                    num = self._extract_number(full_str)
-                    if num:
-                        resultados.append(num)
-        return resultados
+        return [num for num in self.historial.indice.numeros if num is not None]
 
     def _get_daily_hits(self) -> Set[str]:
         """Obtiene los números que han salido en el último día disponible en el historial."""
@@ -46,15 +35,7 @@ class RouletteVisualizer:
         
         # Asumimos que self.historial.dias está ordenado cronológicamente
         last_day = self.historial.dias[-1]
-        hits = set()
-        for hora in self.historial.horas:
-            key = (last_day, hora)
-            if key in self.historial.tabla:
-                val = self.historial.tabla[key]
-                num = self._extract_number(val)
-                if num:
-                    hits.add(num)
-        return hits
+        return {num for _hora, num in self.historial.indice.del_dia(last_day)}
 
     def get_sector_stats(self, last_n: int = 100) -> pd.DataFrame:
         """Calcula estadísticas de rendimiento por sector (A-F)."""
@@ -7,7 +7,7 @@ import pandas as pd
 import streamlit as st
 
 from src.historial_client import HistorialData
-from src.constantes import ANIMALITOS, SECTORES, DOCENAS, COLUMNAS
+from src.constantes import ANIMALITOS, CODIGO_POR_NUMERO, SECTORES, DOCENAS, COLUMNAS
 from src.atrasos import AnalizadorAtrasos
 
 @dataclass
@@ -25,21 +25,7 @@ class TraceabilityAnalyzer:
         
     def _prepare_dataframe(self):
         # Convertir a DataFrame para facilitar filtrado por fecha
-        rows = []
-        for dia in self.historial.dias:
-            for hora in self.historial.horas:
-                key = (dia, hora)
-                if key in self.historial.tabla:
-                    full_str = self.historial.tabla[key]
-                    # Extraer número
-                    found = None
-                    for k, v in ANIMALITOS.items():
-                        if full_str.startswith(f"{k} ") or full_str == k or v in full_str:
-                            found = k
-                            break
-                    if found:
-                        rows.append({"fecha": dia, "hora": hora, "numero": found})
-        return pd.DataFrame(rows)
+        return self.historial.indice.dataframe()
 
     def get_daily_trace(self, fecha: str) -> DailyTrace:
         """Genera la trazabilidad completa para un día específico."""
@@ -79,36 +65,16 @@ class TraceabilityAnalyzer:
     def _calculate_days_since_last(self, numero: str, current_date_str: str) -> int:
         """Calcula cuántos días pasaron desde la última vez que salió el número antes de current_date."""
         current_date = datetime.strptime(current_date_str, "%Y-%m-%d").date()
-        
-        # Filtrar historial anterior a la fecha
-        # Optimización: recorrer hacia atrás los días del historial
-        dias_sorted = sorted(self.historial.dias, reverse=True)
-        
-        days_count = 0
-        found = False
-        
-        # Empezar a buscar desde el día anterior
-        start_counting = False
-        
-        for dia_str in dias_sorted:
-            dia_date = datetime.strptime(dia_str, "%Y-%m-%d").date()
-            
-            if dia_date >= current_date:
-                continue
-                
-            # Estamos en un día anterior
-            # Verificar si el número salió este día
-            salio_hoy = False
-            for hora in self.historial.horas:
-                key = (dia_str, hora)
-                if key in self.historial.tabla:
-                    val = self.historial.tabla[key]
-                    if numero in val or (ANIMALITOS.get(numero) and ANIMALITOS[numero] in val):
-                        salio_hoy = True
-                        break
-            
-            if salio_hoy:
-                return (current_date - dia_date).days
+        codigo = CODIGO_POR_NUMERO.get(numero)
+        if codigo is None:
+            return -1
+
+        # Último día anterior a current_date en que salió el número
+        indice = self.historial.indice
+        antes, _ = indice.rango_dia(current_date_str)
+        dias_con_numero = indice.dia_ordinal[:antes][indice.codigo_numero[:antes] == codigo]
+        if len(dias_con_numero):
+            return current_date.toordinal() - int(dias_con_numero[-1])
             
         return -1 # Nunca salió antes (o no en el rango cargado)
 
@@ -154,25 +154,8 @@ def render_ia_patrones_tab(data, gestor: GestorPatrones, ml_predictor: MLPredict
     # Obtener patrones activos reales
     # Necesitamos procesar el día actual para tener datos reales
     today_str = date.today().strftime("%Y-%m-%d")
-    resultados_dia = []
-    for (d, h), val in data.tabla.items():
-        if d == today_str:
-            # Extraer número
-            num = None
-            for k, v in ANIMALITOS.items():
-                if val.startswith(f"{k} ") or val == k or v in val:
-                    num = k
-                    break
-            if num:
-                resultados_dia.append((h, num))
-    
-    # Ordenar por hora
-    def hora_key(x):
-        try:
-            return datetime.strptime(x[0], "%I:%M %p")
-        except:
-            return datetime.min
-    resultados_dia.sort(key=hora_key)
+    # Resultados de hoy en orden cronológico
+    resultados_dia = data.indice.del_dia(today_str)
     
     estados = gestor.procesar_dia(resultados_dia)
     activos = [e for e in estados if e.aciertos_hoy > 0]
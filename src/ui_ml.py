@@ -64,12 +64,8 @@ def render_ml_tab(data, engine):
             # Usamos la fecha actual y hora actual aproximada para simular "siguiente sorteo"
             
             # Obtener últimos 3 resultados reales
-            # Reutilizamos lógica de obtener lista plana cronológica
-            # (Idealmente esto debería ser una función utilitaria compartida)
-            todos_resultados_nombres = []
-            sorted_keys = sorted(data.tabla.keys(), key=lambda x: (x[0], datetime.strptime(x[1], "%I:%M %p") if "M" in x[1] else x[1]))
-            for k in sorted_keys:
-                todos_resultados_nombres.append(data.tabla[k])
+            # Lista plana cronológica del índice del historial
+            todos_resultados_nombres = data.indice.valores
             
             if len(todos_resultados_nombres) < 3:
                 st.warning("Insuficiente historial para predecir (mínimo 3 sorteos previos).")
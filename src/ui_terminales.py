@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, date
+from datetime import date
+from src.codigos import numero_de
 from src.constantes import ANIMALITOS
+from src.horas import minutos_de_hora
 
 def _format_num(key: str) -> str:
     """Formatea un key tipo '5' -> '05', '15' -> '15', '0' -> '0', '00' -> '00'."""
@@ -29,40 +31,14 @@ def _extraer_numero_key_desde_valor(valor: str) -> str | None:
     """Extrae el key del número (incluye '00') desde un valor tipo '24 Iguana'."""
     if not valor:
         return None
-
-    parts = str(valor).strip().split()
-    if parts:
-        token = parts[0]
-        if token.isdigit():
-            # Preserva '00'
-            if token == "00":
-                return "00"
-            # Normaliza otros a su representación sin ceros a la izquierda
-            try:
-                return str(int(token))
-            except Exception:
-                return None
-
-    # Fallback: buscar coincidencia por nombre oficial
-    v_norm = str(valor)
-    for k, nombre in ANIMALITOS.items():
-        if v_norm.startswith(f"{k} ") or v_norm == k or nombre in v_norm:
-            return k
-    return None
+    return numero_de(str(valor).strip())
 
 
 def _parse_hora_to_minutes(hora_str: str) -> int | None:
     """Convierte '10:00 AM'/'22:00' a minutos para ordenar. Retorna None si no se puede parsear."""
     if not hora_str:
         return None
-    s = str(hora_str).strip()
-    for fmt in ("%I:%M %p", "%H:%M", "%H:%M:%S"):
-        try:
-            dt = datetime.strptime(s, fmt)
-            return dt.hour * 60 + dt.minute
-        except Exception:
-            continue
-    return None
+    return minutos_de_hora(str(hora_str).strip())
 
 
 def _siblings_for_terminal(terminal: int) -> list[str]:
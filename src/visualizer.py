@@ -2,10 +2,11 @@ from __future__ import annotations
 from typing import List, Dict, Any, Tuple
 import pandas as pd
 import altair as alt
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from .historial_client import HistorialData
-from .constantes import ANIMALITOS, COLORES
+from .constantes import COLORES
+from .horas import MINUTO_DESCONOCIDO
 
 class Visualizer:
     """
@@ -21,29 +22,24 @@ class Visualizer:
         Prepara un DataFrame con los últimos N sorteos para visualización.
         Incluye columnas enriquecidas: color, numero, nombre, timestamp.
         """
-        # Obtener claves ordenadas cronológicamente
-        sorted_keys = sorted(
-            self.data.tabla.keys(), 
-            key=lambda x: (x[0], datetime.strptime(x[1], "%I:%M %p") if "M" in x[1] else x[1])
-        )
-        
-        # Recortar a los últimos 'limit'
-        if len(sorted_keys) > limit:
-            sorted_keys = sorted_keys[-limit:]
+        # Últimos 'limit' sorteos del índice cronológico
+        indice = self.data.indice
+        desde = max(0, len(indice) - limit)
+        ordinales = indice.dia_ordinal[desde:].tolist()
+        minutos = indice.minutos[desde:].tolist()
             
         rows = []
-        for i, (fecha, hora) in enumerate(sorted_keys):
-            animal_nombre = self.data.tabla[(fecha, hora)]
-            # Buscar numero
-            num_str = next((k for k, v in ANIMALITOS.items() if v == animal_nombre), "?")
+        for i, (fecha, hora) in enumerate(indice.claves[desde:]):
+            animal_nombre = indice.valores[desde + i]
+            num_str = indice.numeros[desde + i] or "?"
             
             # Color ruleta
             color_ruleta = COLORES.get(num_str, "gray")
             
             # Timestamp aproximado para eje X continuo
-            try:
-                ts = datetime.strptime(f"{fecha} {hora}", "%Y-%m-%d %I:%M %p")
-            except:
+            if minutos[i] < MINUTO_DESCONOCIDO:
+                ts = datetime.fromordinal(ordinales[i]) + timedelta(minutes=minutos[i])
+            else:
                 ts = datetime.now() # Fallback
                 
             rows.append({
@@ -0,0 +1,121 @@
+import os
+import random
+import tempfile
+import unittest
+from collections import Counter
+from unittest import mock
+
+from src.backtesting import Backtester, _AlmacenCambiado, _ejecutar_tarea, _iniciar_trabajador
+from src.codigos import numero_de
+from src.config import HORARIO_SORTEOS
+from src.constantes import ANIMALITOS
+from src.historial_archivo import HistorialArchivo
+from src.historial_client import HistorialData, HistorialView
+from src.patrones import GestorPatrones
+from src.recomendador import Recomendador, RecomendadorIncremental
+
+
+def _historial(semilla=21, n_dias=12):
+    rng = random.Random(semilla)
+    valores = list(ANIMALITOS.values()) + ["24 Iguana", "???"]  # incluye no oficiales
+    dias = [f"2025-02-{d:02d}" for d in range(1, n_dias + 1)]
+    tabla = {(d, h): rng.choice(valores) for d in dias for h in HORARIO_SORTEOS if rng.random() < 0.8}
+    return HistorialData(dias=dias, horas=list(HORARIO_SORTEOS), tabla=tabla)
+
+
+def _top_markov_original(valores, actual, n=5):
+    """Referencia fija: el Top-n del modelo original (Counter de transiciones y sorted estable)."""
+    transiciones = Counter(zip(valores, valores[1:]))
+    sub = Counter({b: c for (a, b), c in transiciones.items() if a == actual})
+    total = float(sum(sub.values()))
+    probs = {b: c / total for b, c in sub.items()}
+    return [b for b, _ in sorted(probs.items(), key=lambda x: x[1], reverse=True)[:n]]
+
+
+class TestWalkForward(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.gestor = GestorPatrones(os.path.join(tmp.name, "patrones.txt"))
+        self.data = _historial()
+
+    def test_recomendador_incremental_equivale_al_recalculo(self):
+        incremental = RecomendadorIncremental(self.data, self.gestor, upto=5)
+        for n in range(5, len(self.data.indice) + 1, 7):
+            while incremental.n < n:
+                incremental.avanzar()
+            esperado = Recomendador(HistorialView(self.data, upto=n), self.gestor).calcular_scores()
+            self.assertEqual(incremental.calcular_scores(), esperado)
+
+    def test_backtest_misma_prediccion_que_el_camino_original(self):
+        resultado = Backtester(self.data, self.gestor).run(
+            "2025-02-04", "2025-02-12", {"Markov": True, "Recomendador": True}
+        )
+        claves = self.data.indice.claves
+        self.assertGreater(len(resultado["raw"]), 50)
+        for paso in resultado["raw"]:
+            i = claves.index((paso["fecha"], paso["hora"]))
+            vista = HistorialView(self.data, upto=i)
+
+            scores = Recomendador(vista, self.gestor).calcular_scores()
+            self.assertEqual(paso["preds"]["Recomendador"], [s.numero for s in scores[:5]])
+
+            top = _top_markov_original(self.data.indice.valores[:i], self.data.indice.valores[i - 1])
+            self.assertEqual(paso["preds"]["Markov"], [numero_de(nombre) or "?" for nombre in top])
+
+    def test_aciertos_markov_vectorizados(self):
+        backtester = Backtester(self.data, self.gestor)
+        resultado = backtester.run("2025-02-01", "2025-02-12", {"Markov": True})
+        aciertos = backtester.aciertos_markov("2025-02-01", "2025-02-12")
+        for metrica in ("Top1", "Top3", "Top5"):
+            self.assertEqual(aciertos[metrica].tolist(), [p["aciertos"]["Markov"][metrica] for p in resultado["raw"]])
+            self.assertEqual(int(aciertos[metrica].sum()), resultado["summary"]["Markov"][metrica])
+
+    def test_paralelo_equivale_al_secuencial(self):
+        backtester = Backtester(self.data, self.gestor)
+        modelos = {"Markov": True, "Recomendador": True}
+        esperado = backtester.run("2025-02-04", "2025-02-12", modelos)
+        self.assertEqual(backtester._tramos(*backtester._rango("2025-02-04", "2025-02-12"), 3)[1][0],
+                         self.data.indice.rango_dia("2025-02-07")[0])
+
+        avances = []
+        en_proceso = backtester.run_parallel(
+            "2025-02-04", "2025-02-12", modelos, workers=1, tramo_dias=3,
+            progress=lambda hechas, total: avances.append((hechas, total)),
+        )
+        self.assertEqual(en_proceso, esperado)
+        self.assertEqual(avances, [(i, 4) for i in range(1, 5)])  # Márkov entero + 3 tramos
+
+        # Pool real (spawn) aunque la máquina tenga una sola CPU
+        with mock.patch("src.backtesting.os.cpu_count", return_value=2):
+            en_pool = backtester.run_parallel("2025-02-04", "2025-02-12", modelos, workers=2, tramo_dias=2)
+        self.assertEqual(en_pool, esperado)
+        self.assertEqual(list(en_pool["raw"][0]["preds"]), ["Markov", "Recomendador"])
+
+    def test_paralelo_lee_el_almacen_mapeado(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        archivo = HistorialArchivo("La Granjita", directorio=tmp.name)
+        archivo.save(self.data)
+        backtester = Backtester(self.data, self.gestor, archivo=archivo)
+        modelos = {"Markov": True, "Recomendador": True}
+        esperado = backtester.run("2025-02-04", "2025-02-12", modelos)
+
+        origen = backtester._origen_mapeado()
+        self.assertIsNotNone(origen)
+        with mock.patch("src.backtesting.os.cpu_count", return_value=2):
+            en_pool = backtester.run_parallel("2025-02-04", "2025-02-12", modelos, workers=2, tramo_dias=3)
+        self.assertEqual(en_pool, esperado)
+
+        # Si el almacén cambió al arrancar el proceso, la tarea lo avisa (y se reintenta serializado)
+        _iniciar_trabajador(None, self.gestor, origen[:-1] + ("otra",))
+        with self.assertRaises(_AlmacenCambiado):
+            _ejecutar_tarea("Markov", 10, 20, None, 10)
+
+        # Historial distinto del archivado: no se usa el almacén
+        archivo.append(HistorialData(dias=["2025-02-05"], horas=["09:00 AM"], tabla={("2025-02-05", "09:00 AM"): "Oso"}))
+        self.assertIsNone(backtester._origen_mapeado())
+
+
+if __name__ == "__main__":
+    unittest.main()
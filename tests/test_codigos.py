@@ -0,0 +1,30 @@
+import unittest
+
+from src.codigos import decodificar, nombre_de, numero_de
+from src.constantes import CODIGO_00, ETIQUETA_POR_CODIGO
+
+
+class TestDecodificar(unittest.TestCase):
+    def test_formas_aceptadas(self):
+        for valor in ("Iguana", "IGUANA", "24", "24 Iguana", "24 - Iguana"):
+            self.assertEqual(decodificar(valor), 24, valor)
+        self.assertEqual(decodificar("00"), CODIGO_00)
+        self.assertEqual(decodificar("Delfin"), 0)
+        self.assertEqual(numero_de("03 Ciempies"), "3")
+        self.assertEqual(nombre_de("CIEMPIES"), "Ciempiés")
+
+    def test_sin_subcadenas(self):
+        # "Rana" está contenido en "Iguana" solo como subcadena: no debe confundirse
+        self.assertEqual(numero_de("Iguana"), "24")
+        self.assertEqual(numero_de("Rana"), "6")
+        self.assertIsNone(decodificar("Ranas"))
+        self.assertIsNone(decodificar("99 Dragón"))
+        self.assertIsNone(decodificar(""))
+
+    def test_etiquetas(self):
+        self.assertEqual(ETIQUETA_POR_CODIGO[24], "24 - Iguana")
+        self.assertEqual(ETIQUETA_POR_CODIGO[CODIGO_00], "00 - Ballena")
+
+
+if __name__ == "__main__":
+    unittest.main()
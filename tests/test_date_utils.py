@@ -1,10 +1,25 @@
 import unittest
 from datetime import date, datetime, timedelta
+from unittest import mock
 
-from src.date_utils import clamp_date, to_date
+import pytz
+
+from src.date_utils import clamp_date, hoy_local, to_date
+
+
+class _RelojUTC(datetime):
+    """Reloj fijo: 02:30 UTC del 11 de marzo (aún 10 de marzo en Caracas)."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return datetime(2025, 3, 11, 2, 30, tzinfo=pytz.utc).astimezone(tz)
 
 
 class TestDateUtils(unittest.TestCase):
+    def test_hoy_local_usa_la_hora_de_caracas(self):
+        with mock.patch("src.date_utils.datetime", _RelojUTC):
+            self.assertEqual(hoy_local(), "2025-03-10")
+
     def test_to_date_accepts_date(self):
         d = date(2025, 12, 12)
         self.assertEqual(to_date(d), d)
@@ -0,0 +1,255 @@
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from src.constantes import ANIMALITOS
+from src.date_utils import hoy_local
+from src.historial_archivo import HistorialArchivo
+from src.historial_cache import HistorialCache
+from src.historial_client import HistorialClient, HistorialData
+
+HORAS = ["09:00 AM", "10:00 AM", "11:00 AM", "12:00 PM", "01:00 PM"]
+NOMBRES = list(ANIMALITOS.items())
+
+
+def _pagina_semanal(start: str, end: str) -> str:
+    """Simula Lotoven: devuelve hasta 7 días desde start (sin pasar de end)."""
+    inicio = datetime.strptime(start, "%Y-%m-%d").date()
+    fin = datetime.strptime(end, "%Y-%m-%d").date()
+    dias = []
+    d = inicio
+    while d <= fin and len(dias) < 7:
+        dias.append(d)
+        d += timedelta(days=1)
+
+    filas = ["<tr><th>Horario</th>" + "".join(f"<th>{x:%Y-%m-%d}</th>" for x in dias) + "</tr>"]
+    for h_idx, hora in enumerate(HORAS):
+        celdas = []
+        for d in dias:
+            # Dejar huecos para comprobar que no se inventan sorteos
+            if (d.toordinal() + h_idx) % 11 == 0:
+                celdas.append("<td></td>")
+                continue
+            num, nombre = NOMBRES[(d.toordinal() * 7 + h_idx) % len(NOMBRES)]
+            celdas.append(f"<td>{num} {nombre}</td>")
+        filas.append(f"<tr><td>{hora}</td>" + "".join(celdas) + "</tr>")
+    return "<html><body><table>" + "".join(filas) + "</table></body></html>"
+
+
+class _FakeResponse:
+    def __init__(self, text: str, status_code: int = 200):
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        pass
+
+
+def _fake_get(url, headers=None, timeout=None):
+    start, end = url.rstrip("/").split("/")[-2:]
+    return _FakeResponse(_pagina_semanal(start, end))
+
+
+class TestHistorialConcurrente(unittest.TestCase):
+    def setUp(self):
+        self.client = HistorialClient(base_url="https://fake/historial/{start}/{end}/")
+
+    def _fetch(self, start, end, concurrent):
+        with mock.patch("src.http_transport.requests.Session.get", side_effect=_fake_get), \
+             mock.patch("time.sleep"):
+            return self.client.fetch_historial(start, end, concurrent=concurrent)
+
+    def test_concurrente_igual_a_secuencial(self):
+        for start, end in [("2025-01-01", "2025-03-15"), ("2025-06-02", "2025-06-04"), ("2025-06-02", "2025-06-08")]:
+            seq = self._fetch(start, end, concurrent=False)
+            conc = self._fetch(start, end, concurrent=True)
+            self.assertEqual(seq.dias, conc.dias)
+            self.assertEqual(seq.horas, conc.horas)
+            self.assertEqual(list(seq.tabla.items()), list(conc.tabla.items()))
+            self.assertGreater(conc.total_sorteos, 0)
+
+    def test_ventanas_semanales_cubren_el_rango(self):
+        ventanas = HistorialClient._ventanas_semanales("2025-01-01", "2025-01-20")
+        self.assertEqual(ventanas, [
+            ("2025-01-01", "2025-01-07"),
+            ("2025-01-08", "2025-01-14"),
+            ("2025-01-15", "2025-01-20"),
+        ])
+        self.assertEqual(HistorialClient._ventanas_semanales("2025-01-02", "2025-01-01"), [])
+
+
+class TestHistorialCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = HistorialCache(directorio=self.tmp.name)
+        self.client = HistorialClient(base_url="https://fake/historial/{start}/{end}/", cache=self.cache)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _fetch(self, start, end):
+        with mock.patch("src.http_transport.requests.Session.get", side_effect=_fake_get) as get, \
+             mock.patch("time.sleep"):
+            data = self.client.fetch_historial(start, end, concurrent=True)
+        return data, get.call_count
+
+    def test_carga_en_caliente_no_descarga_semanas_cerradas(self):
+        fria, llamadas_fria = self._fetch("2025-01-08", "2025-03-03")
+        caliente, llamadas_caliente = self._fetch("2025-01-08", "2025-03-03")
+        self.assertGreater(llamadas_fria, 0)
+        self.assertEqual(llamadas_caliente, 0)
+        self.assertEqual(fria.tabla, caliente.tabla)
+        self.assertEqual(fria.dias[0], "2025-01-08")
+        self.assertEqual(fria.dias[-1], "2025-03-03")
+
+        # Un sub-rango reutiliza las mismas semanas
+        sub, llamadas_sub = self._fetch("2025-02-01", "2025-02-10")
+        self.assertEqual(llamadas_sub, 0)
+        self.assertEqual(sub.tabla, {k: v for k, v in fria.tabla.items() if "2025-02-01" <= k[0] <= "2025-02-10"})
+
+    def test_semana_en_curso_vence(self):
+        hoy = hoy_local()
+        self.cache.put("u", hoy, hoy, [([hoy], ["09:00 AM"], [(hoy, "09:00 AM", "Toro")])])
+        self.assertIsNotNone(self.cache.get("u", hoy, hoy))
+        self.cache.ttl_actual = -1
+        self.assertIsNone(self.cache.get("u", hoy, hoy))
+
+        self.cache.put("u", "2020-01-06", "2020-01-12", [])
+        self.assertEqual(self.cache.get("u", "2020-01-06", "2020-01-12"), [])
+
+        # "Hoy" es el de Caracas: en un servidor UTC ya pasada la medianoche
+        # la semana del 10 de marzo sigue abierta
+        with mock.patch("src.historial_cache.hoy_local", return_value="2025-03-10"):
+            self.cache.put("u", "2025-03-10", "2025-03-10", [])
+        self.assertIsNone(self.cache.get("u", "2025-03-10", "2025-03-10"))
+
+        # El lunes la semana que terminó el domingo sigue revalidándose (sorteos
+        # publicados tarde); desde el martes queda cerrada
+        with mock.patch("src.historial_cache.hoy_local", return_value="2025-03-10"):
+            self.cache.put("u", "2025-03-03", "2025-03-09", [])
+        self.assertIsNone(self.cache.get("u", "2025-03-03", "2025-03-09"))
+        with mock.patch("src.historial_cache.hoy_local", return_value="2025-03-11"):
+            self.cache.put("u", "2025-03-03", "2025-03-09", [])
+        self.assertEqual(self.cache.get("u", "2025-03-03", "2025-03-09"), [])
+
+    def test_recorte_por_tamano(self):
+        self.cache.max_bytes = 0
+        self.cache.put("u", "2020-01-06", "2020-01-12", [])
+        self.assertIsNone(self.cache.get("u", "2020-01-06", "2020-01-12"))
+
+
+class TestHistorialArchivo(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archivo = HistorialArchivo("Guácharo Activo", directorio=self.tmp.name)
+        self.client = HistorialClient(base_url="https://fake/historial/{start}/{end}/", archivo=self.archivo)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _fetch(self, start, end):
+        with mock.patch("src.http_transport.requests.Session.get", side_effect=_fake_get) as get, \
+             mock.patch("time.sleep"):
+            data = self.client.fetch_historial(start, end)
+        return data, [c.args[0] for c in get.call_args_list]
+
+    def test_lee_del_archivo_y_descarga_solo_el_delta(self):
+        completo, _ = self._fetch("2025-01-01", "2025-01-20")
+        self.assertTrue(self.archivo.ruta.name.startswith("guacharo_activo"))
+
+        # Reabrir desde disco en otro "proceso"
+        reabierto = HistorialArchivo("Guácharo Activo", directorio=self.tmp.name)
+        self.assertEqual(reabierto.load().tabla, completo.tabla)
+        self.assertEqual(reabierto.load().horas, completo.horas)
+
+        # Rango ya cubierto por el archivo: no hay descargas
+        parcial, urls = self._fetch("2025-01-05", "2025-01-10")
+        self.assertEqual(urls, [])
+        self.assertEqual(parcial.tabla, {k: v for k, v in completo.tabla.items() if "2025-01-05" <= k[0] <= "2025-01-10"})
+
+        _, urls = self._fetch("2025-01-05", "2025-01-25")
+        self.assertEqual(urls, ["https://fake/historial/2025-01-20/2025-01-25/"])
+        self.assertEqual(self.archivo.rango(), ("2025-01-01", "2025-01-25"))
+        self.assertEqual(self.archivo.ultimo()[1], "01:00 PM")
+
+    def test_sync_desde_ultimo_dia(self):
+        plano = HistorialClient(base_url="https://fake/historial/{start}/{end}/")
+        with mock.patch("src.http_transport.requests.Session.get", side_effect=_fake_get), mock.patch("time.sleep"):
+            with self.assertRaises(ValueError):
+                self.archivo.sync(plano, hasta="2025-01-10")
+            nuevos = self.archivo.sync(plano, hasta="2025-01-10", desde_inicial="2025-01-01")
+            self.assertEqual(nuevos, self.archivo.total_sorteos)
+            self.assertEqual(self.archivo.sync(plano, hasta="2025-01-10"), 0)
+            self.assertGreater(self.archivo.sync(plano, hasta="2025-01-12"), 0)
+        self.assertEqual(self.archivo.rango(), ("2025-01-01", "2025-01-12"))
+
+    def test_hueco_en_el_archivo_se_descarga(self):
+        plano = HistorialClient(base_url="https://fake/historial/{start}/{end}/")
+        with mock.patch("src.http_transport.requests.Session.get", side_effect=_fake_get), mock.patch("time.sleep"):
+            esperado = plano.fetch_historial("2025-01-01", "2025-01-12")
+            suelto = plano.fetch_historial("2025-01-12", "2025-01-12")
+        self._fetch("2025-01-01", "2025-01-05")
+        # Un lote suelto (p.ej. en vivo) tras varios días sin archivar deja un hueco
+        self.archivo.append(suelto)
+        self.assertEqual(self.archivo.faltantes("2025-01-01", "2025-01-12"), [
+            ("2025-01-06", "2025-01-11"), ("2025-01-12", "2025-01-12"),
+        ])
+
+        leido, urls = self._fetch("2025-01-01", "2025-01-12")
+        self.assertIn("https://fake/historial/2025-01-06/2025-01-11/", urls)
+        self.assertEqual(leido.tabla, esperado.tabla)
+        self.assertEqual(self.archivo.faltantes("2025-01-01", "2025-01-12"), [("2025-01-12", "2025-01-12")])
+
+    def test_append_en_vivo_sincroniza_antes(self):
+        plano = HistorialClient(base_url="https://fake/historial/{start}/{end}/")
+        with mock.patch("src.http_transport.requests.Session.get", side_effect=_fake_get), mock.patch("time.sleep"):
+            esperado = plano.fetch_historial("2025-01-01", "2025-01-12")
+            suelto = plano.fetch_historial("2025-01-12", "2025-01-12")
+            self._fetch("2025-01-01", "2025-01-05")
+            with mock.patch("src.historial_archivo.hoy_local", return_value="2025-01-12"):
+                nuevos = self.archivo.append_en_vivo(suelto, plano)
+        self.assertEqual(nuevos, esperado.total_sorteos - self.archivo.leer("2025-01-01", "2025-01-05").total_sorteos)
+        self.assertEqual(self.archivo.load().tabla, esperado.tabla)
+
+    def test_append_escribe_solo_el_lote_y_no_pierde_lo_de_otro_proceso(self):
+        self._fetch("2025-01-01", "2025-01-10")
+        base = self.archivo.ruta.stat()
+        otro = HistorialArchivo("Guácharo Activo", directorio=self.tmp.name)  # p.ej. el poller
+        otro.load()
+        previo = self.archivo.load()
+        total_previo = previo.total_sorteos
+
+        # Hora nueva: va al registro de cambios; la rejilla necesita otra columna
+        self.archivo.append(HistorialData(dias=["2025-01-10"], horas=["02:00 PM"], tabla={("2025-01-10", "02:00 PM"): "Oso"}))
+        self.assertEqual(self.archivo.ruta.stat().st_mtime_ns, base.st_mtime_ns)
+        self.assertTrue(self.archivo.ruta_delta.exists())
+        self.assertEqual(self.archivo.mapeado().valor("2025-01-10", "02:00 PM"), "Oso")
+        # Quien tenía la copia anterior (p.ej. `leer` en otro hilo) no la ve cambiar
+        self.assertEqual(previo.total_sorteos, total_previo)
+        self.assertNotIn(("2025-01-10", "02:00 PM"), previo.tabla)
+
+        # Corrección dentro de la rejilla: se escribe en sitio, sin reemplazar el archivo
+        grid = self.archivo.ruta_mapeada.stat()
+        self.archivo.append(HistorialData(dias=["2025-01-10"], horas=["12:00 PM"], tabla={("2025-01-10", "12:00 PM"): "Gato"}))
+        self.assertEqual(self.archivo.ruta_mapeada.stat().st_ino, grid.st_ino)
+        self.assertEqual(self.archivo.mapeado().valor("2025-01-10", "12:00 PM"), "Gato")
+
+        # La copia vieja del otro proceso se relee antes de fusionar: nada se pierde
+        otro.append(HistorialData(dias=["2025-01-11"], horas=["09:00 AM"], tabla={("2025-01-11", "09:00 AM"): "Toro"}))
+        releido = HistorialArchivo("Guácharo Activo", directorio=self.tmp.name).load()
+        self.assertEqual(releido.tabla[("2025-01-10", "02:00 PM")], "Oso")
+        self.assertEqual(releido.tabla[("2025-01-10", "12:00 PM")], "Gato")
+        self.assertEqual(releido.tabla[("2025-01-11", "09:00 AM")], "Toro")
+        self.assertEqual(self.archivo.load().tabla, releido.tabla)
+
+        # Al superar el tope, el registro se compacta en el .npz
+        with mock.patch("src.historial_archivo.ARCHIVO_DELTA_MAX", 3):
+            self.archivo.append(HistorialData(dias=["2025-01-11"], horas=["10:00 AM"], tabla={("2025-01-11", "10:00 AM"): "Oso"}))
+        self.assertFalse(self.archivo.ruta_delta.exists())
+        self.assertEqual(HistorialArchivo("Guácharo Activo", directorio=self.tmp.name).load().tabla, self.archivo.load().tabla)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import pickle
+import unittest
+
+import numpy as np
+
+from src.constantes import CODIGO_00
+from src.historial_client import HistorialData, HistorialView
+from src.model import MarkovModel
+
+
+def _data():
+    return HistorialData(
+        dias=["2025-01-01", "2025-01-02"],
+        horas=["01:00 PM", "12:00 PM"],
+        tabla={
+            ("2025-01-02", "12:00 PM"): "Ballena",
+            ("2025-01-01", "01:00 PM"): "Perico",
+            ("2025-01-01", "12:00 PM"): "Delfín",
+            ("2025-01-02", "01:00 PM"): "24 Iguana",  # texto no oficial: se conserva tal cual
+        },
+    )
+
+
+class TestHistorialDataCompacto(unittest.TestCase):
+    def test_columnas_cronologicas(self):
+        data = _data()
+        self.assertEqual(data.codigos.dtype, np.int8)
+        self.assertEqual(data.dia_ordinal.dtype, np.int32)
+        self.assertEqual(data.slot.dtype, np.int16)
+        # 12 PM va antes que 1 PM aunque el vocabulario de horas diga lo contrario
+        self.assertEqual(data.codigos[:3].tolist(), [0, 7, CODIGO_00])
+        self.assertEqual(data.valor_de_codigo(int(data.codigos[3])), "24 Iguana")
+        # El texto no oficial se decodifica una vez al cargar
+        self.assertEqual(data.canonicos.tolist(), [0, 7, CODIGO_00, 24])
+        self.assertFalse(data.codigos.flags.writeable)
+
+    def test_vistas_equivalentes(self):
+        data = _data()
+        self.assertEqual(data.dias, ["2025-01-01", "2025-01-02"])
+        self.assertEqual(data.horas, ["12:00 PM", "01:00 PM"])  # orden cronológico, no el del sitio
+        self.assertEqual(list(data.tabla), [
+            ("2025-01-01", "12:00 PM"),
+            ("2025-01-01", "01:00 PM"),
+            ("2025-01-02", "12:00 PM"),
+            ("2025-01-02", "01:00 PM"),
+        ])
+        self.assertEqual(data.tabla[("2025-01-02", "01:00 PM")], "24 Iguana")
+        with self.assertRaises(TypeError):
+            data.tabla[("2025-01-02", "01:00 PM")] = "Toro"  # vista de solo lectura
+        self.assertEqual(data.total_sorteos, 4)
+
+        copia = HistorialData.from_arrays(
+            list(data.dias), list(data.horas),
+            data.dia_ordinal[::-1], data.slot[::-1], data.codigos[::-1], data.extras,
+        )
+        self.assertEqual(copia, data)
+
+    def test_copia_independiente(self):
+        data = _data()
+        data.tabla, data.indice  # vistas ya construidas
+        copia = data.copia()
+        copia.ingestar([[("2025-01-03", "12:00 PM", "Gato")]])
+        self.assertEqual(copia.total_sorteos, 5)
+        self.assertEqual(data.total_sorteos, 4)
+        self.assertNotIn(("2025-01-03", "12:00 PM"), data.tabla)
+        self.assertEqual(data.dias, ["2025-01-01", "2025-01-02"])
+        self.assertEqual(len(data.indice), 4)
+
+    def test_pickle_portable(self):
+        data = _data()
+        copia = pickle.loads(pickle.dumps(data))
+        self.assertEqual(copia, data)
+        self.assertEqual(copia.canonicos.tolist(), data.canonicos.tolist())
+        self.assertFalse(copia.codigos.flags.writeable)
+
+    def test_merge(self):
+        data = _data()
+        otro = HistorialData(
+            dias=["2025-01-02", "2025-01-03"],
+            horas=["12:00 PM"],
+            tabla={("2025-01-02", "12:00 PM"): "Toro", ("2025-01-03", "12:00 PM"): "Gato"},
+        )
+        self.assertEqual(data.merge(otro), 1)
+        self.assertEqual(data.dias, ["2025-01-01", "2025-01-02", "2025-01-03"])
+        self.assertEqual(data.tabla[("2025-01-02", "12:00 PM")], "Toro")
+        self.assertEqual(data.total_sorteos, 5)
+
+    def test_ingestar_lotes(self):
+        data = _data()
+        data.tabla  # vista ya construida: se actualiza en sitio
+        lote = HistorialData(
+            dias=["2025-01-03"], horas=["12:00 PM"], tabla={("2025-01-03", "12:00 PM"): "Gato"},
+        )
+        filas = [
+            ("2025-01-01", "12:00 PM", "Delfín"),     # sin cambios
+            ("2025-01-02", "12:00 PM", "Toro"),       # corrección
+            ("2025-01-03", "12:00 PM", "Zorro"),      # pisa al lote anterior
+            ("2025-01-03", "01:00 PM", "Ciempiés"),
+        ]
+        resultado = data.ingestar([lote, filas])
+        self.assertEqual((resultado.insertados, resultado.actualizados, resultado.sin_cambios), (2, 1, 1))
+        self.assertEqual(data.dias, ["2025-01-01", "2025-01-02", "2025-01-03"])
+        self.assertEqual(data.tabla[("2025-01-03", "12:00 PM")], "Zorro")
+        self.assertEqual(data.tabla[("2025-01-02", "12:00 PM")], "Toro")
+        self.assertEqual(list(data.tabla)[-2:], [("2025-01-03", "12:00 PM"), ("2025-01-03", "01:00 PM")])
+
+        # Un día intermedio se inserta en orden
+        data.ingestar([[("2024-12-31", "08:00 AM", "Oso")]])
+        self.assertEqual(data.dias[0], "2024-12-31")
+        self.assertEqual(list(data.tabla)[0], ("2024-12-31", "08:00 AM"))
+        self.assertIn("08:00 AM", data.horas)
+
+
+class TestIndiceCronologico(unittest.TestCase):
+    def test_orden_y_decodificacion(self):
+        indice = _data().indice
+        self.assertEqual(indice.claves[:2], [("2025-01-01", "12:00 PM"), ("2025-01-01", "01:00 PM")])
+        self.assertEqual(indice.numeros, ["0", "7", "00", "24"])
+        self.assertEqual(indice.minutos.tolist(), [720, 780, 720, 780])
+        self.assertEqual(indice.del_dia("2025-01-02"), [("12:00 PM", "00"), ("01:00 PM", "24")])
+        self.assertEqual(indice.del_dia("2025-01-05"), [])
+
+    def test_merge_extiende_o_invalida(self):
+        data = _data()
+        data.indice
+        data.merge(HistorialData(
+            dias=["2025-01-03"], horas=["12:00 PM"], tabla={("2025-01-03", "12:00 PM"): "Gato"},
+        ))
+        self.assertIsNotNone(data._indice)  # solo se agregó al final: se extendió
+        self.assertEqual(data.indice.claves, list(data.tabla))
+        self.assertEqual(data.indice.numeros[-1], "11")
+
+        # Una corrección en medio obliga a reconstruir
+        data.merge(HistorialData(
+            dias=["2025-01-01"], horas=["12:00 PM"], tabla={("2025-01-01", "12:00 PM"): "Toro"},
+        ))
+        self.assertIsNone(data._indice)
+        self.assertEqual(data.indice.valores, list(data.tabla.values()))
+
+
+class TestHistorialView(unittest.TestCase):
+    def test_prefijo_sin_copias(self):
+        data = _data()
+        vista = HistorialView(data, upto=3)
+        self.assertEqual(vista.total_sorteos, 3)
+        self.assertEqual(list(vista.dias), ["2025-01-01", "2025-01-02"])
+        self.assertEqual(list(vista.tabla.values()), ["Delfín", "Perico", "Ballena"])
+        self.assertEqual(vista.tabla[("2025-01-02", "12:00 PM")], "Ballena")
+        self.assertNotIn(("2025-01-02", "01:00 PM"), vista.tabla)
+        self.assertTrue(np.shares_memory(vista.codigos, data.codigos))
+        self.assertEqual(vista.indice.valores[-1], "Ballena")
+
+    def test_equivale_a_un_historial_recortado(self):
+        data = _data()
+        recorte = HistorialData(
+            dias=["2025-01-01"], horas=["12:00 PM", "01:00 PM"],
+            tabla={("2025-01-01", "12:00 PM"): "Delfín", ("2025-01-01", "01:00 PM"): "Perico"},
+        )
+        vista = HistorialView(data, upto=2)
+        self.assertEqual(dict(vista.tabla), recorte.tabla)
+        self.assertEqual(MarkovModel.from_historial(vista), MarkovModel.from_historial(recorte))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.historial_archivo import HistorialArchivo
+from src.historial_client import HistorialData
+from src.historial_mmap import VACIO, HistorialMapeado
+
+
+def _data():
+    return HistorialData(
+        dias=["2025-01-01", "2025-01-03"],
+        horas=["01:00 PM", "12:00 PM"],
+        tabla={
+            ("2025-01-01", "12:00 PM"): "Delfín",
+            ("2025-01-01", "01:00 PM"): "Perico",
+            ("2025-01-03", "12:00 PM"): "Ballena",
+            ("2025-01-03", "01:00 PM"): "24 Iguana",
+        },
+    )
+
+
+class TestHistorialMapeado(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.ruta = os.path.join(self.tmp.name, "granjita.grid")
+
+    def test_ida_y_vuelta(self):
+        data = _data()
+        HistorialMapeado.escribir(self.ruta, data)
+        mapa = HistorialMapeado(self.ruta)
+
+        self.assertIsInstance(mapa.rejilla, np.memmap)
+        self.assertEqual(mapa.rejilla.shape, (3, 2))  # el día 2 queda como fila vacía
+        self.assertEqual(mapa.horas, ["12:00 PM", "01:00 PM"])
+        self.assertEqual(mapa.rango(), ("2025-01-01", "2025-01-03"))
+        self.assertEqual(mapa.total_sorteos, 4)
+        self.assertEqual(mapa.leer().tabla, data.tabla)
+        self.assertEqual(mapa.leer("2025-01-02", "2025-01-09").tabla, {
+            ("2025-01-03", "12:00 PM"): "Ballena",
+            ("2025-01-03", "01:00 PM"): "24 Iguana",
+        })
+
+    def test_busqueda_por_celda(self):
+        HistorialMapeado.escribir(self.ruta, _data())
+        mapa = HistorialMapeado(self.ruta)
+        self.assertEqual(mapa.valor("2025-01-01", "01:00 PM"), "Perico")
+        self.assertEqual(mapa.valor("2025-01-03", "01:00 PM"), "24 Iguana")
+        self.assertIsNone(mapa.valor("2025-01-02", "12:00 PM"))
+        self.assertEqual(mapa.codigo("2024-12-31", "12:00 PM"), VACIO)
+        self.assertEqual(mapa.codigo("2025-01-01", "09:00 AM"), VACIO)
+
+        filas = mapa.dias("2025-01-02", "2025-02-01")
+        self.assertEqual(filas.shape, (2, 2))
+        self.assertTrue(np.shares_memory(filas, mapa.rejilla))
+
+    def test_vacio_y_recarga(self):
+        HistorialMapeado.escribir(self.ruta, HistorialData(dias=[], horas=[], tabla={}))
+        mapa = HistorialMapeado(self.ruta)
+        self.assertIsNone(mapa.rango())
+        self.assertEqual(mapa.leer().total_sorteos, 0)
+
+        HistorialMapeado.escribir(self.ruta, _data())
+        self.assertTrue(mapa.recargar())
+        self.assertFalse(mapa.recargar())
+        self.assertEqual(mapa.total_sorteos, 4)
+
+    def test_archivo_mantiene_la_copia_mapeada(self):
+        archivo = HistorialArchivo("La Granjita", self.tmp.name)
+        self.assertIsNone(archivo.mapeado())
+        archivo.append(_data())
+        self.assertEqual(archivo.mapeado().leer().tabla, archivo.load().tabla)
+
+        archivo.append(HistorialData(
+            dias=["2025-01-04"], horas=["12:00 PM"], tabla={("2025-01-04", "12:00 PM"): "Oso"},
+        ))
+        self.assertEqual(archivo.mapeado().valor("2025-01-04", "12:00 PM"), "Oso")
+
+
+if __name__ == "__main__":
+    unittest.main()
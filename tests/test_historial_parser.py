@@ -0,0 +1,88 @@
+import unittest
+from pathlib import Path
+
+from src.exceptions import ScrapingError
+from src.historial_parser import (
+    HAS_LXML,
+    buscar_animal,
+    get_parser,
+    parse_historial_bs4,
+    parse_historial_lxml,
+    parse_resultados_envivo,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "historial"
+FIXTURES_ENVIVO = Path(__file__).parent / "fixtures" / "resultados"
+
+
+@unittest.skipUnless(HAS_LXML, "lxml no está instalado")
+class TestParserParidad(unittest.TestCase):
+    def test_lxml_igual_a_bs4_en_fixtures(self):
+        paginas = sorted(FIXTURES.glob("*.html"))
+        self.assertTrue(paginas)
+        for ruta in paginas:
+            html = ruta.read_text(encoding="utf-8")
+            with self.subTest(fixture=ruta.name):
+                self.assertEqual(parse_historial_lxml(html), parse_historial_bs4(html))
+
+    def test_semana_completa(self):
+        html = (FIXTURES / "semana_completa.html").read_text(encoding="utf-8")
+        page_dias, page_horas, celdas = parse_historial_lxml(html)
+        self.assertEqual(page_dias[0], "2025-12-01")
+        self.assertEqual(len(page_dias), 7)
+        self.assertEqual(page_horas[0], "08:00 AM")
+        self.assertEqual(len(celdas), len(page_dias) * len(page_horas))
+        # "12 CABALLO" y "Jirafa" se normalizan al nombre oficial
+        self.assertIn(("2025-12-04", "08:00 AM", "Caballo"), celdas)
+        self.assertIn(("2025-12-01", "08:00 AM", "Jirafa"), celdas)
+
+    def test_sin_tabla_y_cabecera_invalida(self):
+        html = (FIXTURES / "sin_tabla.html").read_text(encoding="utf-8")
+        self.assertIsNone(parse_historial_lxml(html))
+
+        mala = "<table><tr><th>Hora</th><th>2025-12-01</th></tr></table>"
+        for parser in (parse_historial_bs4, parse_historial_lxml):
+            with self.assertRaises(ScrapingError):
+                parser(mala)
+
+
+class TestGetParser(unittest.TestCase):
+    def test_seleccion(self):
+        self.assertIs(get_parser("bs4"), parse_historial_bs4)
+        with self.assertRaises(ValueError):
+            get_parser("regex")
+
+
+class TestResultadosEnVivo(unittest.TestCase):
+    def test_fixture(self):
+        html = (FIXTURES_ENVIVO / "envivo.html").read_text(encoding="utf-8")
+        self.assertEqual(
+            parse_resultados_envivo(html),
+            [
+                ("08:00 AM", "Perico"),
+                ("09:00 AM", "Ciempiés"),
+                ("10:00 AM", "Ballena"),
+                ("01:00 PM", "Perro"),
+            ],
+        )
+
+    def test_contenedor_mas_cercano(self):
+        html = (
+            "<div><div><h5>7 <b>Perico</b></h5><small>08:00 AM</small></div>"
+            "<div><small>09:00 AM</small><!-- <small>10:00 AM</small> --></div>"
+            "<span>00 Ballena</span></div>"
+        )
+        # El nombre partido en dos etiquetas se reconoce; la hora comentada no cuenta
+        # y la de las 9 sube hasta el contenedor que tiene a Ballena
+        self.assertEqual(parse_resultados_envivo(html), [("08:00 AM", "Perico"), ("09:00 AM", "Ballena")])
+
+    def test_buscar_animal(self):
+        self.assertIsNone(buscar_animal("PROXIMO SORTEO 02:00 PM"))
+        # Con varios candidatos gana el primero de ANIMALITOS ("00" antes que "7")
+        self.assertEqual(buscar_animal("7 PERICO 00 BALLENA"), "Ballena")
+        # "10 TIGRE" no se confunde con el "0" (Delfín)
+        self.assertEqual(buscar_animal("10 TIGRE"), "Tigre")
+
+
+if __name__ == "__main__":
+    unittest.main()
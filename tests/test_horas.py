@@ -0,0 +1,26 @@
+import unittest
+
+from src.horas import clave_hora, horario_de, minutos_de_hora, ordenar_horas, slot_de
+
+
+class TestRegistroHoras(unittest.TestCase):
+    def test_minutos_y_formatos(self):
+        self.assertEqual(minutos_de_hora("02:00 PM"), 14 * 60)
+        self.assertEqual(minutos_de_hora("12:00 AM"), 0)
+        self.assertEqual(minutos_de_hora("22:30"), 22 * 60 + 30)
+        self.assertIsNone(minutos_de_hora("mediodía"))
+        self.assertEqual(slot_de("02:00 PM"), slot_de("02:00 PM"))
+
+    def test_orden_independiente_del_sitio(self):
+        publicadas = ["01:00 PM", "10:00 AM", "sin hora", "12:00 PM", "10:00 AM"]
+        self.assertEqual(ordenar_horas(publicadas), ["10:00 AM", "12:00 PM", "01:00 PM", "sin hora"])
+        self.assertLess(clave_hora("11:00 AM"), clave_hora("12:00 PM"))
+
+    def test_horario_de_loteria(self):
+        horario = horario_de("La Granjita")
+        self.assertEqual(horario[0], "08:00 AM")
+        self.assertEqual(list(horario), ordenar_horas(horario))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from unittest import mock
+
+import requests
+
+from src.http_transport import HttpTransport, TokenBucket
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int, text: str = "ok"):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+
+class TestHttpTransport(unittest.TestCase):
+    def setUp(self):
+        self.transport = HttpTransport(rate=0, retries=2, backoff_base=0.5)
+
+    def test_reintenta_5xx_y_timeouts_con_backoff(self):
+        respuestas = [_FakeResponse(503, "error"), requests.Timeout("lento"), _FakeResponse(200, "hola")]
+        with mock.patch.object(self.transport.session, "get", side_effect=respuestas) as get, \
+             mock.patch("src.http_transport.time.sleep") as sleep:
+            resp = self.transport.get("https://lotoven.com/x/")
+
+        self.assertEqual(resp.text, "hola")
+        self.assertEqual(get.call_count, 3)
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [0.5, 1.0])
+
+        st = self.transport.stats()["lotoven.com"]
+        self.assertEqual(st.peticiones, 3)
+        self.assertEqual(st.reintentos, 2)
+        self.assertEqual(st.errores, 2)
+        self.assertEqual(st.bytes, len("error") + len("hola"))
+
+    def test_agota_reintentos(self):
+        with mock.patch.object(self.transport.session, "get", return_value=_FakeResponse(502)), \
+             mock.patch("src.http_transport.time.sleep"):
+            with self.assertRaises(requests.HTTPError):
+                self.transport.get("https://lotoven.com/x/")
+        self.assertEqual(self.transport.stats()["lotoven.com"].peticiones, 3)
+
+    def test_4xx_no_se_reintenta(self):
+        with mock.patch.object(self.transport.session, "get", return_value=_FakeResponse(404)) as get:
+            with self.assertRaises(requests.HTTPError):
+                self.transport.get("https://lotoven.com/x/")
+        self.assertEqual(get.call_count, 1)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_rafaga_y_ritmo(self):
+        reloj = [100.0]
+        esperas = []
+        with mock.patch("src.http_transport.time.monotonic", side_effect=lambda: reloj[0]), \
+             mock.patch("src.http_transport.time.sleep", side_effect=esperas.append):
+            bucket = TokenBucket(rate=2.0, capacity=2)
+            for _ in range(4):
+                bucket.acquire()
+
+        # Las dos primeras salen de la ráfaga; luego una ficha cada 0.5 s
+        self.assertEqual(esperas, [0.5, 1.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from src.historial_client import HistorialData
+from src.ingesta import Ingestor
+
+LOTERIAS = {
+    "Rapida": {"historial": "https://rapida/historial/{start}/{end}/"},
+    "Lenta": {"historial": "https://lenta/historial/{start}/{end}/"},
+    "Caida": {"historial": "https://caida/historial/{start}/{end}/"},
+}
+
+
+class TestIngestor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ingestor = Ingestor(loterias=LOTERIAS, archivo_dir=self.tmp.name)
+        self.liberar_lenta = threading.Event()
+
+        def fake_fetch(cliente, start, end, concurrent=False, max_workers=None):
+            if "lenta" in cliente.base_url:
+                self.liberar_lenta.wait(5)
+            if "caida" in cliente.base_url:
+                raise ConnectionError("sitio caído")
+            return HistorialData(dias=[start], horas=["09:00 AM"], tabla={(start, "09:00 AM"): cliente.base_url})
+
+        patcher = mock.patch("src.historial_client.HistorialClient.fetch_historial", autospec=True, side_effect=fake_fetch)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(self.ingestor.shutdown)
+
+    def test_una_loteria_lenta_no_bloquea_a_las_demas(self):
+        futuros = self.ingestor.submit_all("2025-01-01", "2025-01-01")
+
+        rapida = futuros["Rapida"].result(timeout=5)
+        self.assertTrue(rapida.ok)
+        self.assertEqual(self.ingestor.get("Rapida").total_sorteos, 1)
+        self.assertEqual(self.ingestor.rango("Rapida"), ("2025-01-01", "2025-01-01"))
+
+        caida = futuros["Caida"].result(timeout=5)
+        self.assertFalse(caida.ok)
+        self.assertIsNone(self.ingestor.get("Caida"))
+
+        # La lenta sigue en curso y no se duplica al volver a pedirla
+        self.assertFalse(futuros["Lenta"].done())
+        self.assertIs(self.ingestor.submit("Lenta", "2025-01-01", "2025-01-01"), futuros["Lenta"])
+        self.assertIsNone(self.ingestor.get("Lenta"))
+
+        self.liberar_lenta.set()
+        self.assertTrue(futuros["Lenta"].result(timeout=5).ok)
+        self.assertIsNotNone(self.ingestor.get("Lenta"))
+
+    def test_refresh_all_respeta_el_orden_de_configuracion(self):
+        self.liberar_lenta.set()
+        vistos = []
+        resultados = self.ingestor.refresh_all("2025-01-01", "2025-01-01", on_done=lambda r: vistos.append(r.loteria))
+        self.assertEqual(list(resultados), list(LOTERIAS))
+        self.assertCountEqual(vistos, list(LOTERIAS))
+
+
+    def test_otro_rango_no_reutiliza_la_carga_en_curso(self):
+        viejo = self.ingestor.submit("Lenta", "2025-01-01", "2025-01-01")
+        nuevo = self.ingestor.submit("Lenta", "2025-01-02", "2025-01-02")
+        self.assertIsNot(viejo, nuevo)
+        self.liberar_lenta.set()
+        nuevo.result(timeout=5)
+        viejo.result(timeout=5)
+        # El refresco más viejo no pisa al más nuevo aunque termine después
+        self.assertEqual(self.ingestor.rango("Lenta"), ("2025-01-02", "2025-01-02"))
+        self.assertEqual(self.ingestor.get("Lenta").dias, ["2025-01-02"])
+
+    def test_get_entrega_una_copia_propia(self):
+        self.ingestor.submit("Rapida", "2025-01-01", "2025-01-01").result(timeout=5)
+        sesion = self.ingestor.get("Rapida")
+        sesion.merge(HistorialData(dias=["2025-01-02"], horas=["09:00 AM"], tabla={("2025-01-02", "09:00 AM"): "Oso"}))
+        self.assertEqual(sesion.total_sorteos, 2)
+        self.assertEqual(self.ingestor.get("Rapida").total_sorteos, 1)
+        self.assertEqual(self.ingestor.get("Rapida").dias, ["2025-01-01"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+import unittest
+from collections import Counter
+
+import numpy as np
+
+from src.historial_client import HistorialData, HistorialView
+from src.model import MarkovDecaido, MarkovModel, MarkovOrdenK, MarkovPorHora
+
+
+def _data():
+    # Secuencia cronológica: Delfín, Perico, Delfín, Perico, Delfín, 24 Iguana
+    return HistorialData(
+        dias=["2025-01-01", "2025-01-02", "2025-01-03"],
+        horas=["01:00 PM", "12:00 PM"],
+        tabla={
+            ("2025-01-01", "12:00 PM"): "Delfín",
+            ("2025-01-01", "01:00 PM"): "Perico",
+            ("2025-01-02", "12:00 PM"): "Delfín",
+            ("2025-01-02", "01:00 PM"): "Perico",
+            ("2025-01-03", "12:00 PM"): "Delfín",
+            ("2025-01-03", "01:00 PM"): "24 Iguana",
+        },
+    )
+
+
+class TestMarkovModel(unittest.TestCase):
+    def test_matriz_y_vistas(self):
+        model = MarkovModel.from_historial(_data())
+        self.assertEqual(model.conteos.shape, (39, 39))  # 38 códigos + 1 valor no oficial
+        self.assertEqual(model.transitions, Counter({
+            ("Delfín", "Perico"): 2, ("Perico", "Delfín"): 2, ("Delfín", "24 Iguana"): 1,
+        }))
+        self.assertEqual(model.freq["Delfín"], 3)
+        self.assertEqual(model.next_probs("Delfín"), {"Perico": 2 / 3, "24 Iguana": 1 / 3})
+        self.assertEqual(model.next_probs("24 Iguana"), {})
+        self.assertEqual(model.next_probs("Zorro"), {})
+        self.assertEqual(model.prob("Perico", "Delfín"), 1.0)
+        self.assertEqual(model.top_next("Delfín", 1), [("Perico", 2 / 3)])
+        self.assertEqual(model.top_global(2), [("Delfín", 0.5), ("Perico", 1 / 3)])
+
+    def test_misma_hora_y_compatibilidad(self):
+        model = MarkovModel.from_historial(_data(), mode="same_hour")
+        self.assertEqual(model.transitions, Counter({
+            ("Delfín", "Delfín"): 2, ("Perico", "Perico"): 1, ("Perico", "24 Iguana"): 1,
+        }))
+        # El constructor con Counter sigue disponible y equivale al denso
+        self.assertEqual(MarkovModel(model.freq, model.transitions), model)
+        with self.assertRaises(ValueError):
+            MarkovModel.from_historial(_data(), mode="otro")
+
+    def test_actualizacion_en_linea(self):
+        data = _data()
+        model = MarkovModel.from_historial(HistorialView(data, upto=2))
+        model.next_probs("Delfín")  # filas ya normalizadas: deben refrescarse
+        model.add_draw(int(data.codigos[2]))
+        model.extend(["Perico", "Delfín", "24 Iguana"])
+        self.assertEqual(model, MarkovModel.from_historial(data))
+        self.assertEqual(model.next_probs("Delfín"), {"Perico": 2 / 3, "24 Iguana": 1 / 3})
+
+        # Ventana: quitar los dos más antiguos equivale a contar solo los 4 últimos
+        self.assertEqual(model.remove_oldest(), "Delfín")
+        self.assertEqual(model.remove_oldest(), "Perico")
+        self.assertEqual(model.total_sorteos, 4)
+        self.assertEqual(model.transitions, Counter({
+            ("Delfín", "Perico"): 1, ("Perico", "Delfín"): 1, ("Delfín", "24 Iguana"): 1,
+        }))
+        self.assertEqual(model.next_probs("Delfín"), {"Perico": 0.5, "24 Iguana": 0.5})
+
+        model.add_draw("Zorro nuevo")  # texto desconocido: nuevo estado
+        self.assertEqual(model.next_probs("24 Iguana"), {"Zorro nuevo": 1.0})
+
+        with self.assertRaises(ValueError):
+            MarkovModel.from_historial(data, mode="same_hour").add_draw("Perico")
+
+    def test_ventanas_y_decaimiento(self):
+        data = _data()
+        ventanas = MarkovModel.por_ventanas(data, [3, 100])
+        # Últimos 3: Perico, Delfín, 24 Iguana
+        self.assertEqual(ventanas[3].transitions, Counter({("Perico", "Delfín"): 1, ("Delfín", "24 Iguana"): 1}))
+        self.assertEqual(ventanas[100], MarkovModel.from_historial(data))
+
+        model = MarkovModel.from_historial(HistorialView(data, upto=4), ventana=3)
+        model.extend(["Delfín", "24 Iguana"])
+        self.assertEqual(model, ventanas[3])
+
+        decaido = MarkovDecaido.from_historial(data, vida_media=1)
+        # Delfín salió hace 1, 3 y 5 sorteos: 1/2 + 1/8 + 1/32
+        self.assertAlmostEqual(decaido.freq["Delfín"], 0.65625)
+        self.assertEqual(decaido.total_sorteos, data.total_sorteos)
+        self.assertAlmostEqual(decaido.peso_total, sum(decaido.freq.values()))
+        # Tras Delfín: Perico pesa 1/4 + 1/16, 24 Iguana pesa 1
+        self.assertAlmostEqual(decaido.next_probs("Delfín")["24 Iguana"], 1 / 1.3125)
+        decaido.add_draw("Perico")
+        self.assertAlmostEqual(decaido.freq["24 Iguana"], 0.5)
+        self.assertEqual(decaido.total_sorteos, data.total_sorteos + 1)
+        with self.assertRaises(ValueError):
+            decaido.remove_oldest()
+
+    def test_horizonte_varios_sorteos(self):
+        # Cadena determinista Delfín -> Perico -> Delfín ...
+        model = MarkovModel(Counter(), Counter({("Delfín", "Perico"): 3, ("Perico", "Delfín"): 3}))
+        pred = model.predict_horizon(["Delfín", 7], k=3)
+        delfin, perico = 0, 7
+        self.assertEqual(pred.pasos.shape, (2, 3, 38))
+        self.assertAlmostEqual(pred.pasos[0, 0, perico], 1.0)
+        self.assertAlmostEqual(pred.pasos[0, 1, delfin], 1.0)
+        self.assertAlmostEqual(pred.dentro_de[0, delfin], 1.0)
+        self.assertAlmostEqual(pred.dentro_de[1, perico], 1.0)  # vuelve en el segundo paso
+        self.assertEqual(pred.top_dentro_de(0, 2), [("Delfín", 1.0), ("Perico", 1.0)])
+
+        # Con dos sucesores equiprobables: P(Toro dentro de 2) = 1 - (1/2)^2
+        model = MarkovModel(Counter(), Counter({("Toro", "Toro"): 1, ("Toro", "Oso"): 1, ("Oso", "Oso"): 1, ("Oso", "Toro"): 1}))
+        pred = model.predict_horizon(["Oso"], k=2)
+        self.assertAlmostEqual(pred.dentro_de[0, 2], 0.75)
+        np.testing.assert_allclose(pred.pasos.sum(axis=-1), 1.0)
+
+    def test_tensor_por_hora(self):
+        data = _data()
+        model = MarkovPorHora.from_historial(data)
+        self.assertEqual(model.horas, ["12:00 PM", "01:00 PM"])
+        self.assertEqual(model.secuencial.shape, (2, 39, 39))
+        # A la 1 PM, después de Delfín: Perico dos veces y 24 Iguana una
+        self.assertAlmostEqual(model.prob("Delfín", "Perico", "01:00 PM"), 2 / 3)
+        # A las 12 PM solo se llega desde Perico
+        self.assertEqual(model.next_probs("Perico", "12:00 PM"), {"Delfín": 1.0})
+        self.assertEqual(model.next_probs("Delfín", "12:00 PM"), {})
+        for mode in ("sequential", "same_hour"):
+            self.assertEqual(model.marginal(mode), MarkovModel.from_historial(data, mode=mode))
+
+        parcial = MarkovPorHora.from_historial(HistorialView(data, upto=4))
+        parcial.add_draw("Delfín", "12:00 PM")
+        parcial.add_draw("24 Iguana", "01:00 PM")
+        np.testing.assert_array_equal(parcial.secuencial, model.secuencial)
+        np.testing.assert_array_equal(parcial.misma_hora, model.misma_hora)
+
+    def test_empates_por_orden_de_llegada(self):
+        # Como el modelo original (sorted estable sobre un Counter): gana el que se insertó antes
+        model = MarkovModel(Counter(), Counter({("Delfín", "Gallo"): 1, ("Delfín", "Perico"): 1, ("Delfín", "Oso"): 1}))
+        self.assertEqual([a for a, _ in model.top_next("Delfín", 2)], ["Gallo", "Perico"])
+
+        # Tras Delfín: Toro, Carnero, Toro, Ballena, Carnero (y el último paso cierra con Toro)
+        valores = ["Delfín", "Toro", "Delfín", "Carnero", "Delfín", "Toro", "Delfín", "Ballena", "Delfín", "Carnero", "Delfín", "Toro"]
+        dias = [f"2025-01-{d:02d}" for d in range(1, len(valores) + 1)]
+        data = HistorialData(dias=dias, horas=["12:00 PM"], tabla={(d, "12:00 PM"): v for d, v in zip(dias, valores)})
+        model = MarkovModel.from_historial(HistorialView(data, upto=11))
+        self.assertEqual(model.top_next("Delfín", 3), [("Toro", 0.4), ("Carnero", 0.4), ("Ballena", 0.2)])
+        self.assertEqual(list(model.next_probs("Delfín")), ["Toro", "Carnero", "Ballena"])
+        self.assertEqual([a for a, _ in model.top_global(3)], ["Delfín", "Toro", "Carnero"])
+        top = MarkovModel.top_por_paso(data, 11, 12, n=3)
+        self.assertEqual([model.estados[c] for c in top[0]], ["Toro", "Carnero", "Ballena"])
+
+        # Al quitar los más antiguos manda la primera aparición dentro de la ventana
+        for _ in range(3):
+            model.remove_oldest()
+        self.assertEqual([a for a, _ in model.top_next("Delfín", 3)], ["Toro", "Ballena", "Carnero"])
+        ventana = MarkovModel.from_historial(HistorialView(data, upto=11), ventana=8)
+        self.assertEqual(ventana.top_next("Delfín", 3), model.top_next("Delfín", 3))
+        model.add_draw("Ballena")
+        ventana.add_draw("Ballena")
+        self.assertEqual(model.top_next("Delfín", 3), [("Ballena", 0.5), ("Toro", 0.25), ("Carnero", 0.25)])
+        self.assertEqual(ventana.top_next("Delfín", 3), model.top_next("Delfín", 3))
+
+
+class TestMarkovOrdenK(unittest.TestCase):
+    def test_contextos_dispersos_y_backoff(self):
+        # 1 2 3 1 2 4 1 2 3: tras (1, 2) salió 3 dos veces y 4 una
+        model = MarkovOrdenK([1, 2, 3, 1, 2, 4, 1, 2, 3], orden=2, suavizado="backoff")
+        self.assertEqual(model.contextos[2].tolist(), [1 * 38 + 2, 2 * 38 + 3, 2 * 38 + 4, 3 * 38 + 1, 4 * 38 + 1])
+        probs = model.predict_proba([[1, 2]])[0]
+        self.assertAlmostEqual(probs[3], 2 / 3)
+        self.assertAlmostEqual(probs[4], 1 / 3)
+        # Contexto de orden 2 no visto: baja al orden 1 (tras 2 -> 3, 4, 3)
+        self.assertAlmostEqual(model.predict_proba([[9, 2]])[0][3], 2 / 3)
+        # Nada conocido: frecuencia global suavizada
+        self.assertAlmostEqual(model.predict_proba([[-1, 30]])[0].sum(), 1.0)
+        self.assertEqual(model.top_next(["Carnero", "Toro"], 1)[0][0], "Ciempiés")
+
+    def test_interpolado_en_lote(self):
+        codigos = [1, 2, 3, 1, 2, 4, 1, 2, 3, -1, 5]
+        model = MarkovOrdenK(codigos, orden=3)
+        lote = model.predict_proba(model.contextos_de(codigos))
+        self.assertEqual(lote.shape, (len(codigos), 38))
+        np.testing.assert_allclose(lote.sum(axis=1), 1.0)
+        # Interpolado: lo visto pesa más pero nada queda en cero
+        self.assertGreater(lote[8, 3], lote[8, 4])
+        self.assertTrue((lote > 0).all())
+        np.testing.assert_allclose(lote[3], model.predict_proba([[1, 2, 3]])[0])
+        with self.assertRaises(ValueError):
+            MarkovOrdenK(codigos, orden=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
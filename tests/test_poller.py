@@ -0,0 +1,87 @@
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import pytz
+
+from src.historial_client import HistorialData
+from src.poller import PlanSorteos, Poller, leer_estado, poller_activo
+
+CARACAS = pytz.timezone("America/Caracas")
+
+
+def _caracas(y, m, d, hh, mm):
+    return CARACAS.localize(datetime(y, m, d, hh, mm))
+
+
+class TestPlanSorteos(unittest.TestCase):
+    def setUp(self):
+        self.plan = PlanSorteos(["01:00 PM", "08:00 AM", "12:00 PM"])
+
+    def test_ultimo_y_proximo(self):
+        ahora = _caracas(2025, 3, 10, 12, 5)
+        self.assertEqual(self.plan.ultimo_sorteo(ahora)[1], "12:00 PM")
+        self.assertEqual(self.plan.proximo_sorteo(ahora), _caracas(2025, 3, 10, 13, 0))
+        # Tras el último del día, el próximo es mañana a primera hora
+        self.assertEqual(self.plan.proximo_sorteo(_caracas(2025, 3, 10, 20, 0)), _caracas(2025, 3, 11, 8, 0))
+        self.assertIsNone(self.plan.ultimo_sorteo(_caracas(2025, 3, 10, 7, 0)))
+
+
+class TestPoller(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.poller = Poller(
+            loterias=["La Granjita"], archivo_dir=self.tmp.name,
+            demora=60, ventana=600, intervalo_rapido=30, espera_maxima=900,
+        )
+
+    def test_espera_fuera_de_ventana_hasta_el_proximo_sorteo(self):
+        # 09:30: el sorteo de las 9 ya salió de la ventana; próximo a las 10:00 (+60 s de demora)
+        ahora = _caracas(2025, 3, 10, 9, 30)
+        self.assertIsNone(self.poller.pendiente("La Granjita", ahora))
+        self.assertEqual(self.poller.espera(ahora), 900)
+        self.assertEqual(self.poller.espera(_caracas(2025, 3, 10, 9, 55)), 6 * 60)
+
+    def test_sondeo_rapido_hasta_encontrar_el_sorteo(self):
+        ahora = _caracas(2025, 3, 10, 10, 2)
+        self.assertEqual(self.poller.pendiente("La Granjita", ahora), ("2025-03-10", "10:00 AM"))
+
+        vacio = HistorialData(dias=[], horas=[], tabla={})
+        with mock.patch("src.historial_client.HistorialClient.fetch_resultados_envivo", return_value=vacio), \
+             mock.patch("src.historial_client.HistorialClient.fetch_historial", return_value=vacio):
+            self.assertEqual(self.poller.ciclo(ahora), 30)
+        self.assertEqual(leer_estado("La Granjita", self.tmp.name)["version"], 0)
+
+        llegado = HistorialData(dias=["2025-03-10"], horas=["10:00 AM"], tabla={("2025-03-10", "10:00 AM"): "Perico"})
+        with mock.patch("src.historial_client.HistorialClient.fetch_resultados_envivo", return_value=llegado):
+            espera = self.poller.ciclo(_caracas(2025, 3, 10, 10, 3))
+
+        self.assertGreater(espera, 30)
+        estado = leer_estado("La Granjita", self.tmp.name)
+        self.assertEqual(estado["version"], 1)
+        self.assertEqual(estado["ultimo"], ["2025-03-10", "10:00 AM"])
+        self.assertTrue(poller_activo(estado))
+        self.assertIsNone(self.poller.pendiente("La Granjita", _caracas(2025, 3, 10, 10, 4)))
+
+    def test_sincroniza_antes_de_agregar_si_el_archivo_quedo_atras(self):
+        archivo = self.poller.estados["La Granjita"].archivo
+        archivo.append(HistorialData(dias=["2025-03-03"], horas=["09:00 AM"], tabla={("2025-03-03", "09:00 AM"): "Oso"}))
+
+        atrasados = HistorialData(
+            dias=["2025-03-03", "2025-03-05"], horas=["09:00 AM"],
+            tabla={("2025-03-03", "09:00 AM"): "Oso", ("2025-03-05", "09:00 AM"): "Toro"},
+        )
+        llegado = HistorialData(dias=["2025-03-10"], horas=["10:00 AM"], tabla={("2025-03-10", "10:00 AM"): "Perico"})
+        with mock.patch("src.historial_client.HistorialClient.fetch_resultados_envivo", return_value=llegado), \
+             mock.patch("src.historial_client.HistorialClient.fetch_historial", return_value=atrasados) as historial, \
+             mock.patch("src.historial_archivo.hoy_local", return_value="2025-03-10"):
+            self.assertEqual(self.poller.sondear("La Granjita"), 2)
+        self.assertEqual(historial.call_args.args, ("2025-03-03", "2025-03-10"))
+        self.assertEqual(archivo.load().tabla[("2025-03-05", "09:00 AM")], "Toro")
+        self.assertEqual(archivo.load().tabla[("2025-03-10", "10:00 AM")], "Perico")
+
+
+if __name__ == "__main__":
+    unittest.main()
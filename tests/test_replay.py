@@ -0,0 +1,61 @@
+import tempfile
+import unittest
+
+import requests
+
+from src.config import LOTERIAS
+from src.historial_client import HistorialClient
+from src.http_transport import HttpTransport
+from src.replay import Corpus, ServidorReplay, generar_sintetico
+
+LOTERIA = "La Granjita"
+
+
+class TestReplay(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.corpus = Corpus(cls.tmp.name)
+        generar_sintetico(cls.corpus, LOTERIA, "2025-01-01", "2025-02-10", semilla=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def _cliente(self, servidor):
+        transport = HttpTransport(rate=0, retries=5, backoff_base=0.0)
+        self.addCleanup(transport.close)
+        return HistorialClient(base_url=servidor.url(LOTERIAS[LOTERIA]["historial"]), transport=transport)
+
+    def test_corpus_persistente(self):
+        self.assertEqual(len(Corpus(self.tmp.name)), len(self.corpus))
+
+    def test_secuencial_y_concurrente_contra_el_servidor(self):
+        with ServidorReplay(self.corpus) as servidor:
+            client = self._cliente(servidor)
+            seq = client.fetch_historial("2025-01-01", "2025-02-10")
+            conc = client.fetch_historial("2025-01-01", "2025-02-10", concurrent=True)
+            envivo = client.fetch_resultados_envivo(servidor.url(LOTERIAS[LOTERIA]["resultados"]))
+
+        self.assertEqual(len(seq.dias), 41)
+        self.assertEqual(seq.tabla, conc.tabla)
+        self.assertEqual(envivo.total_sorteos, 12)
+
+    def test_errores_inyectados_se_reintentan(self):
+        with ServidorReplay(self.corpus, tasa_error=0.3, semilla=3) as servidor:
+            client = self._cliente(servidor)
+            data = client.fetch_historial("2025-01-01", "2025-02-10", concurrent=True)
+            self.assertGreater(servidor.errores, 0)
+            host = next(iter(client.transport.stats().values()))
+
+        self.assertEqual(len(data.dias), 41)
+        self.assertEqual(host.reintentos, servidor.errores)
+
+    def test_pagina_no_grabada(self):
+        with ServidorReplay(self.corpus) as servidor:
+            with self.assertRaises(requests.HTTPError):
+                requests.get(servidor.url("https://lotoven.com/no/existe/"), timeout=5).raise_for_status()
+
+
+if __name__ == "__main__":
+    unittest.main()